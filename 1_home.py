@@ -1,7 +1,9 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
+import datetime
+import graficos
+import painel
 import utils
+import cubo
 
 # --- Configuração da Página ---
 st.set_page_config(
@@ -19,77 +21,78 @@ supabase = st.session_state["supabase"]
 st.title("Painel de Controle da Empresa 🏗️")
 st.markdown("Bem-vindo ao sistema de gestão unificada de obras.")
 
-# --- 1. Carregamento de Dados ---
-# Buscamos TUDO de uma vez para processar as estatísticas
+# Período analisado (compartilhado com as outras páginas de consulta)
+inicio, fim = utils.seletor_periodo()
+
+# --- 1. Carregamento e Processamento de Dados ---
+# Todo o histórico: KPIs e agregados vêm prontos do snapshot do painel (painel.py),
+# reconstruído em segundo plano periodicamente e depois de cada gravação.
+# Um período: só as movimentações dele são lidas do banco.
 try:
-    # Busca Obras
-    tab_obras = supabase.table("obras").select("*").execute()
-    df_obras = pd.DataFrame(tab_obras.data)
-    
-    # Busca Movimentações
-    tab_mov = supabase.table("movimentacoes").select("*").execute()
-    df_mov = pd.DataFrame(tab_mov.data)
+    snapshot = painel.obter(supabase, inicio, fim)
 
 except Exception as e:
     st.error(f"Erro de conexão: {e}")
     st.stop()
 
-# Verificação se existem dados para não quebrar o dashboard
-if df_obras.empty:
-    st.warning("Nenhuma obra cadastrada. Utilize o menu lateral para começar.")
-    st.stop()
+df_resumo = snapshot["obras"]
+gastos_por_categoria = snapshot["categorias"]
+kpis = snapshot["kpis"]
 
-# --- 2. Processamento de Dados ---
-
-# Garantir tipos numéricos
-df_obras["Orçamento"] = pd.to_numeric(df_obras["Orçamento"], errors="coerce").fillna(0)
-
-if not df_mov.empty:
-    df_mov["Valor"] = pd.to_numeric(df_mov["Valor"], errors="coerce").fillna(0)
-    
-    # Agrupar gastos por Obra
-    gastos_por_obra = df_mov.groupby("obra_id")["Valor"].sum().reset_index()
-    gastos_por_obra.rename(columns={"Valor": "total_gasto"}, inplace=True)
-    
-    # Agrupar gastos por Categoria (Visão Empresa)
-    gastos_por_categoria = df_mov.groupby("Categoria")["Valor"].sum().reset_index()
+# Idade do snapshot e atualização manual
+col_idade, col_atualizar = st.columns([4, 1], vertical_alignment="center")
+if inicio is None:
+    texto_idade = f"Dados atualizados {painel.idade(snapshot['gerado_em'])}"
 else:
-    # Se não tiver gastos ainda, cria dataframes vazios com as colunas certas
-    gastos_por_obra = pd.DataFrame(columns=["obra_id", "total_gasto"])
-    gastos_por_categoria = pd.DataFrame(columns=["Categoria", "Valor"])
-
-# Juntar (Merge) os dados das obras com os gastos
-# Left Join: Queremos todas as obras, mesmo as que não têm gastos
-df_resumo = pd.merge(df_obras, gastos_por_obra, left_on="id", right_on="obra_id", how="left")
+    texto_idade = f"Movimentações de {utils.descrever_periodo(inicio, fim)}"
+if snapshot["desatualizado"]:
+    texto_idade += " · atualização em andamento"
+col_idade.caption(texto_idade)
+if snapshot["erro"]:
+    # A reconstrução em segundo plano está falhando: os números acima podem estar parados
+    erro_em = datetime.datetime.fromtimestamp(snapshot["erro"]["em"])
+    col_idade.error(
+        f"Atualização automática falhando {painel.idade(erro_em)}: {snapshot['erro']['mensagem']}",
+        icon=":material/sync_problem:",
+    )
+if col_atualizar.button("Atualizar agora", icon=":material/refresh:", width="stretch"):
+    with st.spinner("Atualizando..."):
+        painel.construir(supabase, recarregar=True)
+        cubo.reconstruir(supabase)
+    st.rerun()
 
-# Preencher obras sem gastos com 0
-df_resumo["total_gasto"] = df_resumo["total_gasto"].fillna(0)
-
-# Calcular Saldo e Percentual
-df_resumo["saldo"] = df_resumo["Orçamento"] - df_resumo["total_gasto"]
-df_resumo["percentual_uso"] = (df_resumo["total_gasto"] / df_resumo["Orçamento"]) * 100
-# Evitar divisão por zero ou infinitos
-df_resumo["percentual_uso"] = df_resumo["percentual_uso"].fillna(0)
+# Verificação se existem dados para não quebrar o dashboard
+if df_resumo.empty:
+    st.warning("Nenhuma obra cadastrada. Utilize o menu lateral para começar.")
+    st.stop()
 
 # --- 3. Layout do Dashboard ---
 
 # SEÇÃO A: Métricas Globais (Big Numbers)
 st.divider()
-total_orcado_empresa = df_resumo["Orçamento"].sum()
-total_gasto_empresa = df_resumo["total_gasto"].sum()
-saldo_geral = total_orcado_empresa - total_gasto_empresa
+total_orcado_empresa = kpis["orcamento"]
+total_gasto_empresa = kpis["gasto"]
+saldo_geral = kpis["saldo"]
 
 col1, col2, col3, col4 = st.columns(4)
 
-col1.metric("Obras Ativas", len(df_resumo))
+col1.metric("Obras Ativas", kpis["obras"])
 col2.metric("Orçamento Global", f"R$ {total_orcado_empresa:,.2f}")
-col3.metric("Total Gasto (Empresa)", f"R$ {total_gasto_empresa:,.2f}")
-col4.metric(
-    "Saldo em Caixa", 
-    f"R$ {saldo_geral:,.2f}", 
-    delta="Lucro Previsto" if saldo_geral > 0 else "Prejuízo",
-    delta_color="normal" if saldo_geral > 0 else "inverse"
-)
+if inicio is None:
+    col3.metric("Total Gasto (Empresa)", f"R$ {total_gasto_empresa:,.2f}")
+    col4.metric(
+        "Saldo em Caixa", 
+        f"R$ {saldo_geral:,.2f}", 
+        delta="Lucro Previsto" if saldo_geral > 0 else "Prejuízo",
+        delta_color="normal" if saldo_geral > 0 else "inverse"
+    )
+else:
+    # O saldo depende de todo o histórico: no período mostramos o gasto e quanto ele representa do orçamento
+    col3.metric("Gasto no Período", f"R$ {total_gasto_empresa:,.2f}")
+    col4.metric(
+        "% do Orçamento Global",
+        f"{(total_gasto_empresa / total_orcado_empresa) * 100:.1f}%" if total_orcado_empresa > 0 else "-",
+    )
 
 st.divider()
 
@@ -99,36 +102,16 @@ col_graf1, col_graf2 = st.columns(2) # O primeiro gráfico ocupa mais espaço
 with col_graf1:
     st.subheader("Orçamento vs. Realizado (Por Obra)")
     if not df_resumo.empty:
-        # Transformar dados para formato "longo" que o Plotly gosta para barras agrupadas
         # Queremos comparar duas barras: Azul (Orçamento) e Vermelho (Gasto)
-        fig_barras = px.bar(
-            df_resumo,
-            x="Nome",
-            y=["Orçamento", "total_gasto"],
-            barmode="group",
-            title="Comparativo Financeiro por Obra",
-            labels={"value": "Valor (R$)", "Nome": "Obra", "variable": "Tipo"},
-            color_discrete_map={"Orçamento": "#2E86C1", "total_gasto": "#E74C3C"} # Azul e Vermelho
-        )
-        # Ajuste de nomes na legenda
-        new_names = {"Orçamento": "Orçamento Total", "total_gasto": "Já Gasto"}
-        fig_barras.for_each_trace(lambda t: t.update(name = new_names[t.name]))
-        fig_barras.update_layout(plot_bgcolor='rgba(0, 0, 0, 0)',  paper_bgcolor='rgba(0, 0, 0, 0)', legend=dict(bgcolor='rgba(0, 0, 0, 0)'))
+        fig_barras = graficos.barras_orcamento(df_resumo[["Nome", "Orçamento", "total_gasto"]])
 
         st.plotly_chart(fig_barras, width="stretch")
 
 with col_graf2:
     st.subheader("Para onde vai o dinheiro?")
     if not gastos_por_categoria.empty:
-        # CORREÇÃO: Usamos px.pie com o argumento hole=0.4 para virar uma rosca
-        fig_pizza = px.pie(
-            gastos_por_categoria,
-            values="Valor",
-            names="Categoria",
-            title="Distribuição de Custos",
-            hole=0.4  # Isso transforma a pizza em uma rosca
-        )
-        fig_pizza.update_layout(plot_bgcolor='rgba(0, 0, 0, 0)',  paper_bgcolor='rgba(0, 0, 0, 0)', legend=dict(bgcolor='rgba(0, 0, 0, 0)'))
+        # hole=0.4 transforma a pizza em uma rosca
+        fig_pizza = graficos.pizza(gastos_por_categoria, "Valor", "Categoria", "Distribuição de Custos", buraco=0.4)
 
         st.plotly_chart(fig_pizza, width="stretch")
     else:
@@ -140,6 +123,9 @@ st.subheader("Resumo Detalhado das Obras")
 
 # Selecionar e ordenar colunas para exibição
 colunas_exibicao = ["Nome", "Cliente_Nome", "Data_Início", "Orçamento", "total_gasto", "saldo", "percentual_uso"]
+if inicio is not None:
+    # Saldo só faz sentido com todo o histórico
+    colunas_exibicao.remove("saldo")
 
 st.dataframe(
     df_resumo[colunas_exibicao].sort_values("percentual_uso", ascending=False),
@@ -148,7 +134,7 @@ st.dataframe(
         "Cliente_Nome": "Cliente",
         "Data_Início": st.column_config.DateColumn("Início", format="DD/MM/YYYY"),
         "Orçamento": st.column_config.NumberColumn("Orçamento", format="R$ %.2f"),
-        "total_gasto": st.column_config.NumberColumn("Gasto Real", format="R$ %.2f"),
+        "total_gasto": st.column_config.NumberColumn("Gasto Real" if inicio is None else "Gasto no Período", format="R$ %.2f"),
         "saldo": st.column_config.NumberColumn("Saldo", format="R$ %.2f"),
         "percentual_uso": st.column_config.ProgressColumn(
             "% Consumido", 
@@ -159,4 +145,55 @@ st.dataframe(
     },
     width="stretch",
     hide_index=True
-)
\ No newline at end of file
+)
+
+# SEÇÃO D: Análise por Categoria (fatias do cubo de gastos pré-agregado, ver cubo.py)
+st.divider()
+st.subheader("Análise de Gastos")
+
+try:
+    df_cubo = cubo.obter(supabase)
+except Exception as e:
+    st.error(f"Erro ao carregar a análise de gastos: {e}")
+    st.stop()
+
+nomes_obras = dict(zip(df_resumo["id"], df_resumo["Nome"]))
+
+col_obra, col_categoria = st.columns(2)
+obra_analise = col_obra.selectbox(
+    "Obra", [None] + list(nomes_obras), format_func=lambda obra_id: "Todas" if obra_id is None else nomes_obras[obra_id]
+)
+categoria_analise = col_categoria.selectbox(
+    "Categoria", [None] + utils.CATEGORIAS, format_func=lambda categoria: "Todas" if categoria is None else categoria
+)
+
+fatia = cubo.fatiar(df_cubo, inicio, fim, obra_id=obra_analise, categoria=categoria_analise)
+if inicio is not None and (inicio.day != 1 or (fim + datetime.timedelta(days=1)).day != 1):
+    st.caption("A análise é mensal: o período inclui os meses inteiros que ele toca.")
+
+if fatia.empty:
+    st.info("Sem gastos para esta seleção.")
+else:
+    # Todas as categorias: uma cor por categoria; uma categoria escolhida: desce para as subcategorias
+    dimensao = "Categoria" if categoria_analise is None else "Subcategoria"
+    por_mes = cubo.somar_por(fatia, "Mes", dimensao)
+    por_mes[dimensao] = por_mes[dimensao].fillna("Sem subcategoria").astype("string")
+    fig_meses = graficos.barras(por_mes, "Mes", "Valor", f"Gastos por Mês e {dimensao}", cor=dimensao)
+    st.plotly_chart(fig_meses, width="stretch")
+
+    # Pivô obra × mês (ou subcategoria × mês, com uma obra escolhida)
+    linhas_pivo = "obra_id" if obra_analise is None else dimensao
+    pivo = cubo.somar_por(fatia, linhas_pivo, "Mes").pivot_table(
+        index=linhas_pivo, columns="Mes", values="Valor", aggfunc="sum", fill_value=0, dropna=False
+    )
+    if linhas_pivo == "obra_id":
+        pivo.index = pivo.index.map(lambda obra_id: nomes_obras.get(obra_id, f"Obra {obra_id}"))
+    else:
+        pivo.index = pivo.index.fillna("Sem subcategoria")
+    pivo.index.name = "Obra" if linhas_pivo == "obra_id" else dimensao
+    pivo.columns = [mes.strftime("%m/%Y") for mes in pivo.columns]
+    st.dataframe(
+        pivo,
+        column_config={coluna: st.column_config.NumberColumn(format="R$ %.2f") for coluna in pivo.columns},
+        width="stretch",
+    )
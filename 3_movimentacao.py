@@ -5,6 +5,7 @@ import sys
 import os
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import dados
 import utils
 
 st.set_page_config(page_title="Lançar Movimentação")
@@ -21,121 +22,205 @@ supabase = st.session_state["supabase"]
 st.title("Lançar Movimentações 💸")
 
 # 1. Buscar Obras para a Lista Suspensa
-# Buscamos apenas ID e Nome para preencher o selectbox
-response = supabase.table("obras").select("id, Nome").execute()
-obras_dict = {row["Nome"]: row["id"] for row in response.data} # Cria um mapa {Nome: ID}
+# Buscamos apenas ID e Nome para preencher o selectbox (do cache compartilhado)
+obras_dict = {row["Nome"]: row["id"] for row in dados.consultar_obras(supabase)} # Cria um mapa {Nome: ID}
 
 if not obras_dict:
     st.warning("Nenhuma obra cadastrada. Cadastre uma obra antes de lançar gastos.")
     st.stop()
 
-# Selectbox retorna o Nome, mas nós queremos o ID para salvar no banco
-obra_selecionada_nome = st.selectbox("Selecione a Obra", list(obras_dict.keys()))
-obra_id = obras_dict[obra_selecionada_nome]
+tab_individual, tab_lote = st.tabs(["Lançamento Individual", "Lançamento em Lote"])
 
-# 2. Seleção de Categoria
+with tab_individual:
+    # Selectbox retorna o Nome, mas nós queremos o ID para salvar no banco
+    obra_selecionada_nome = st.selectbox("Selecione a Obra", list(obras_dict.keys()))
+    obra_id = obras_dict[obra_selecionada_nome]
 
-categoria = st.pills(
-    "Tipo de Movimentação",
-    ["Depósito", "Mão de Obra", "Material", "Outros"],
-    selection_mode="single",
-)
+    # 2. Seleção de Categoria
 
-if categoria != None:
+    categoria = st.pills(
+        "Tipo de Movimentação",
+        utils.CATEGORIAS,
+        selection_mode="single",
+    )
 
-    # Formulário visual
-    with st.container(border=True):
-        col1, col2, col3 = st.columns(3)
-        data_mov = col1.date_input(label="Data", value=datetime.date.today())
-        descricao = col3.text_input(label="Descrição", placeholder="Ex: Pagamento pedreiro, Compra Tintas")
+    if categoria != None:
 
-        # --- Lógica Específica para MATERIAIS ---
-        if categoria == "Material":
+        # Formulário visual
+        with st.container(border=True):
+            col1, col2, col3 = st.columns(3)
+            data_mov = col1.date_input(label="Data", value=datetime.date.today())
+            descricao = col3.text_input(label="Descrição", placeholder="Ex: Pagamento pedreiro, Compra Tintas")
+
+            # --- Lógica Específica para MATERIAIS ---
+            if categoria == "Material":
             
-            # Criamos um DataFrame vazio para servir de template
-            df_template = pd.DataFrame({
-                "Item": pd.Series(dtype="string"),
-                "Subcategoria": pd.Series(dtype="string"),
-                "Quantidade": pd.Series(dtype="float"),
-                "Valor (R$)": pd.Series(dtype="float")
-            })
-
-            itens_compra = st.data_editor(
-                df_template,
-                num_rows="dynamic",
-                column_config={
-                    "Item": st.column_config.TextColumn(required=True),
-                    "Subcategoria": st.column_config.SelectboxColumn(options=utils.SUBCATEGORIAS_MATERIAIS),
-                    "Quantidade": st.column_config.NumberColumn(min_value=0.1, step=1.0, required=True),
-                    "Valor (R$)": st.column_config.NumberColumn(min_value=0.0, format="R$ %.2f", required=True)
-                },
-                hide_index=True,
-                width="stretch"
-            )
-
-            total_calculado = 0.0
-
-            if not itens_compra['Valor (R$)'].empty:
-                total_calculado = itens_compra["Valor (R$)"].sum()
-
-            valor = col2.number_input("Valor Total (R$)", value=total_calculado, format="%.2f", disabled=True)
+                itens_compra = utils.editor_itens(key="itens_individual")
 
-        else:
-            valor = col2.number_input("Valor Total (R$)", min_value=0.0, format="%.2f")
+                total_calculado = 0.0
 
-        # Botão de Salvar
-        if st.button(f"Confirmar Lançamento em '{categoria}'"):
-            try:
-                if valor <= 0:
-                    st.error("O valor deve ser maior que zero.")
+                if not itens_compra['Valor (R$)'].empty:
+                    total_calculado = itens_compra["Valor (R$)"].sum()
+
+                valor = col2.number_input("Valor Total (R$)", value=total_calculado, format="%.2f", disabled=True)
+
+            else:
+                valor = col2.number_input("Valor Total (R$)", min_value=0.0, format="%.2f")
+
+            # Botão de Salvar
+            if st.button(f"Confirmar Lançamento em '{categoria}'"):
+                try:
+                    if valor <= 0:
+                        st.error("O valor deve ser maior que zero.")
                 
-                elif categoria == "Material":
-                    if itens_compra.empty:
-                        st.error("Adicione pelo menos um item na tabela.")
-                    else:
-                        # Transformamos o DataFrame em uma lista de itens para o JSON
-                        itens_list = []
-                        for index, row in itens_compra.iterrows():
-                            if not row["Item"].strip():
+                    elif categoria == "Material":
+                        if itens_compra.empty:
+                            st.error("Adicione pelo menos um item na tabela.")
+                        else:
+                            if itens_compra["Item"].fillna("").str.strip().eq("").any():
                                 st.error("Por favor, preencha todos os campos.")
-                                st.stop()
-
-                            itens_list.append({
-                                "Item": row["Item"],
-                                "Subcategoria": row["Subcategoria"],
-                                "Quantidade": row["Quantidade"],
-                                "Valor": row["Valor (R$)"]
-                            })
-                        
-                        lista_envio = [{
-                            "Data": data_mov.isoformat(),
-                            "Detalhes": None,
-                            "obra_id": obra_id,
-                            "Categoria": categoria,
-                            "Valor": valor,
-                            "Descrição": descricao,
-                            "Itens": itens_list
-                        }]
-                        
-                        # Salvar movimentação
-                        utils.salvar_movimentacao(supabase, lista_envio)
+                            else:
+                                # Transformamos o DataFrame em uma lista de itens para o JSON
+                                itens_list = utils.montar_itens(itens_compra)
+
+                                lista_envio = [{
+                                    "Data": data_mov.isoformat(),
+                                    "Detalhes": None,
+                                    "obra_id": obra_id,
+                                    "Categoria": categoria,
+                                    "Valor": valor,
+                                    "Descrição": descricao,
+                                    "Itens": itens_list
+                                }]
+
+                                # Salvar movimentação
+                                utils.salvar_movimentacao(supabase, lista_envio)
                 
-                # Se for OUTRAS categorias, salvamos UMA linha
-                else:
-                    if not descricao.strip():
-                        st.error("Por favor, preencha todos os campos.")
+                    # Se for OUTRAS categorias, salvamos UMA linha
                     else:
-                        lista_envio = [{
-                            "Data": data_mov.isoformat(),
-                            "Detalhes": None,
-                            "obra_id": obra_id,
-                            "Categoria": categoria,
-                            "Valor": valor,
-                            "Descrição": descricao,
-                        }]
+                        if not descricao.strip():
+                            st.error("Por favor, preencha todos os campos.")
+                        else:
+                            lista_envio = [{
+                                "Data": data_mov.isoformat(),
+                                "Detalhes": None,
+                                "obra_id": obra_id,
+                                "Categoria": categoria,
+                                "Valor": valor,
+                                "Descrição": descricao,
+                            }]
                         
-                        # Salvar movimentações em lote
-                        utils.salvar_movimentacao(supabase, lista_envio)
+                            # Salvar movimentações em lote
+                            utils.salvar_movimentacao(supabase, lista_envio)
                         
+                except Exception as e:
+                    st.error(f"Erro ao salvar: {e}")
+
+# --- Lançamento em Lote ---
+# Várias movimentações digitadas em uma grade, validadas juntas e gravadas em um único upsert
+with tab_lote:
+    st.markdown("Digite uma movimentação por linha. Linhas de **Material** pedem o detalhamento dos itens logo abaixo da grade.")
+
+    # A versão entra nas chaves dos editores: ao salvar, a grade volta vazia
+    versao = st.session_state.setdefault("lote_versao", 0)
+
+    # Cada linha da grade tem um id próprio (coluna oculta "id_linha"), que dá a chave do
+    # editor de itens dela: excluir uma linha não passa os itens de outra para a de baixo
+    df_lote = st.session_state.get("lote_grade")
+    if df_lote is None or st.session_state.get("lote_grade_versao") != versao:
+        df_lote = pd.DataFrame({
+            "id_linha": pd.Series(dtype="Int64"),
+            "Obra": pd.Series(dtype="string"),
+            "Categoria": pd.Series(dtype="string"),
+            "Data": pd.Series(dtype="datetime64[ns]"),
+            "Valor": pd.Series(dtype="float"),
+            "Descrição": pd.Series(dtype="string"),
+        })
+
+    grade = st.data_editor(
+        df_lote,
+        num_rows="dynamic",
+        column_config={
+            "id_linha": None,
+            "Obra": st.column_config.SelectboxColumn(label="Obra", options=list(obras_dict.keys()), required=True),
+            "Categoria": st.column_config.SelectboxColumn(label="Categoria", options=utils.CATEGORIAS, required=True),
+            "Data": st.column_config.DateColumn(label="Data", format="DD/MM/YYYY", default=datetime.date.today(), required=True),
+            "Valor": st.column_config.NumberColumn(label="Valor (R$)", min_value=0.0, format="R$ %.2f", help="Em Material, deixe vazio para usar a soma dos itens."),
+            "Descrição": st.column_config.TextColumn(label="Descrição", required=True),
+        },
+        hide_index=True,
+        width="stretch",
+        key=f"grade_lote_{versao}",
+    )
+
+    # Linhas novas recebem um id e passam a fazer parte da grade guardada na sessão. A grade
+    # muda, então o editor recomeça a partir dela (com as edições já incorporadas)
+    novas = grade["id_linha"].isna()
+    if novas.any():
+        proximo_id = st.session_state.get("lote_proximo_id", 0)
+        grade.loc[novas, "id_linha"] = range(proximo_id, proximo_id + int(novas.sum()))
+        st.session_state["lote_proximo_id"] = proximo_id + int(novas.sum())
+        st.session_state["lote_grade"] = grade.reset_index(drop=True)
+        st.session_state["lote_grade_versao"] = versao
+        st.rerun()
+
+    # Ignora linhas totalmente vazias
+    colunas_lote = ["Obra", "Categoria", "Data", "Valor", "Descrição"]
+    grade = grade.replace(r"^\s*$", pd.NA, regex=True).dropna(how="all", subset=colunas_lote).reset_index(drop=True)
+
+    # Detalhamento dos itens de cada linha de Material
+    itens_por_linha = {}
+    for posicao, linha in grade[grade["Categoria"].isin(["Material"])].iterrows():
+        st.markdown(f"**Itens da linha {posicao + 1}** · {linha['Obra'] if pd.notna(linha['Obra']) else 'Obra não definida'} · {linha['Descrição'] if pd.notna(linha['Descrição']) else ''}")
+        itens_por_linha[posicao] = utils.editor_itens(key=f"lote_itens_{versao}_{linha['id_linha']}")
+
+    col_btn, col_info = st.columns([1, 4])
+
+    if col_btn.button("Salvar Lote", type="primary", disabled=grade.empty):
+        # 1. Validação de todas as linhas de uma vez
+        erros = [] # (posição da linha, mensagem)
+        faltando = grade[["Obra", "Categoria", "Data", "Descrição"]].isna().any(axis=1)
+        for posicao in grade.index[faltando]:
+            erros.append((posicao, "preencha Obra, Categoria, Data e Descrição."))
+
+        valores = dados.para_centavos(grade["Valor"])
+        for posicao, itens_compra in itens_por_linha.items():
+            if itens_compra.empty or itens_compra["Item"].fillna("").str.strip().eq("").any():
+                erros.append((posicao, "adicione os itens da compra de Material, todos com nome."))
+                continue
+            # Sem valor digitado, o total da linha é a soma dos itens; com valor, os dois precisam bater
+            total_itens = dados.para_centavos(itens_compra["Valor (R$)"]).sum()
+            if pd.isna(grade.at[posicao, "Valor"]):
+                valores.at[posicao] = total_itens
+            elif total_itens != valores.at[posicao]:
+                erros.append((posicao, f"a soma dos itens (R\\$ {total_itens / 100:.2f}) é diferente do valor informado (R\\$ {valores.at[posicao] / 100:.2f})."))
+
+        for posicao in grade.index[(valores <= 0) & ~faltando]:
+            erros.append((posicao, "o valor deve ser maior que zero."))
+
+        if erros:
+            with col_info:
+                for posicao, mensagem in sorted(erros):
+                    st.error(f"Linha {posicao + 1}: {mensagem}")
+        else:
+            # 2. Monta e grava todas as movimentações em um único upsert
+            lista_envio = []
+            for posicao, linha in grade.iterrows():
+                movimentacao = {
+                    "Data": pd.Timestamp(linha["Data"]).date().isoformat(),
+                    "Detalhes": None,
+                    "obra_id": obras_dict[linha["Obra"]],
+                    "Categoria": linha["Categoria"],
+                    "Valor": int(valores.at[posicao]) / 100,
+                    "Descrição": linha["Descrição"],
+                }
+                if posicao in itens_por_linha:
+                    movimentacao["Itens"] = utils.montar_itens(itens_por_linha[posicao])
+                lista_envio.append(movimentacao)
+
+            try:
+                utils.salvar_movimentacao(supabase, lista_envio, col_info)
+                # Próximo rerun começa com a grade vazia
+                st.session_state["lote_versao"] = versao + 1
             except Exception as e:
-                st.error(f"Erro ao salvar: {e}")
+                col_info.error(f"Erro ao salvar: {e}")
@@ -5,6 +5,9 @@ import sys
 import os
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import importacao
+import conciliacao
+import dados
 import utils
 
 st.set_page_config(page_title="Importar Extrato")
@@ -19,67 +22,68 @@ supabase = st.session_state["supabase"]
 # --- Título da Página ---
 
 st.title("Importar Extrato Bancário 📥")
-st.markdown("Carregue uma planilha Excel para classificar e lançar múltiplas movimentações de uma vez.")
+st.markdown("Carregue uma ou mais planilhas Excel (uma por conta) para classificar e lançar múltiplas movimentações de uma vez.")
 
 # --- 1. Carregar Dados Auxiliares (Obras) ---
 # Precisamos disso para criar o menu suspenso dentro da tabela
 try:
-    res_obras = supabase.table("obras").select("id, Nome").execute()
-    # Criamos dois dicionários:
-    # 1. Lista de nomes para o Dropdown
-    lista_nomes_obras = [row["Nome"] for row in res_obras.data]
-    # 2. Mapa para descobrir o ID depois que o usuário escolher o Nome
-    mapa_obras_id = {row["Nome"]: row["id"] for row in res_obras.data}
+    # Índice que resolve o nome digitado (sem acentos/espaços extras) para o ID da obra
+    indice_obras = dados.IndiceObras(dados.consultar_obras(supabase))
 except Exception as e:
     st.error(f"Erro ao carregar obras: {e}")
     st.stop()
 
-# --- 2. Upload do Arquivo ---
-arquivo = st.file_uploader("Selecione o arquivo Excel (.xlsx)", type=["xlsx"])
+# --- 2. Upload dos Arquivos ---
+arquivos = st.file_uploader("Selecione os arquivos Excel (.xlsx)", type=["xlsx"], accept_multiple_files=True)
+
+# Espaço reservado para o andamento das importações (preenchido no fim do script,
+# para já incluir uma importação enviada neste mesmo rerun)
+area_importacoes = st.container()
+
+# Depois do cadastro das obras desconhecidas, as linhas pendentes são reprocessadas sozinhas
+reprocessar = st.session_state.pop("reprocessar_extrato", False)
+
+# Depois da conciliação, o reprocessamento segue direto para o lançamento
+conciliado = st.session_state.pop("extrato_conciliado", False)
+
+if arquivos:
+    # Identifica a importação (os arquivos carregados) entre os reruns
+    importacao_atual = "_".join(arquivo.file_id for arquivo in arquivos)
 
-if arquivo:
     try:
-        # Lê o arquivo Excel
-        df_raw = pd.read_excel(arquivo)
+        # Lê e normaliza os Excel em paralelo e junta tudo em uma tabela só (em cache pelo
+        # hash dos conteúdos: os reruns causados pelas edições na tabela não releem os arquivos)
+        df_extrato, duplicadas = importacao.ler_extratos(arquivos)
 
-        # Verifica se as colunas esperadas existem
-        colunas_esperadas = ["Data", "Detalhes", "Valor"]
-        
-        df_cols = [c.lower() for c in df_raw.columns]
-        if not all(col.lower() in df_cols for col in colunas_esperadas):
-            st.error(f"O arquivo precisa ter as colunas: {colunas_esperadas}. Colunas encontradas: {list(df_raw.columns)}")
-            st.stop()
-
-        # Remove linhas desnecessárias
-        df_extrato = df_raw.copy()[df_raw["Detalhes"] != " "]
-
-        # Remove colunas desnecessárias
-        # Formata as colunas
-        # Adiciona colunas vazias para Obra, Categoria e Descrição
-        df_extrato = pd.DataFrame({
-            "Data": pd.to_datetime(df_extrato["Data"], dayfirst=True).dt.date,
-            "Detalhes": df_extrato["Detalhes"].astype("string"),
-            "Obra": pd.Series(dtype="string"),
-            "Categoria": pd.Series(dtype="string"),
-            "Valor": df_extrato["Valor"].astype(str).str.replace(".", "", regex=False).str.replace(",", ".", regex=False).astype(float),
-            "Descrição": pd.Series(dtype="string"),
-        })
-
-        # Preenche Categoria automaticamente com "Depósito" para valores positivos
-        df_extrato.loc[df_extrato["Valor"] > 0, "Categoria"] = "Depósito"
-
-        # Transforma todos os valores em positivos
-        df_extrato.loc[:, "Valor"] = df_extrato["Valor"].abs()
+        # Se a planilha trouxe uma coluna de Obra, resolvemos os nomes pelo índice
+        obras_planilha = df_extrato["Obra"].dropna().unique()
+        mapa_resolvidas = {nome: indice_obras.resolver(nome) or nome.upper() for nome in obras_planilha}
+        df_extrato["Obra"] = df_extrato["Obra"].map(mapa_resolvidas).astype("string")
+        obras_fora_do_indice = sorted(set(mapa_resolvidas.values()) - set(indice_obras.nomes))
 
         # --- 4. Tabela Editável ---
         st.info("Classifique as movimentações abaixo.")
+        if duplicadas:
+            st.caption(f"{duplicadas} linha(s) repetida(s) entre os arquivos foram removidas.")
+
+        # Obras da planilha que não estão cadastradas: sugerimos as mais parecidas
+        for nome in obras_fora_do_indice:
+            sugestoes = indice_obras.sugerir(nome)
+            if sugestoes:
+                st.warning(f"A obra '{nome}' não está cadastrada. Você quis dizer: {', '.join(sugestoes)}?")
+            else:
+                st.warning(f"A obra '{nome}' não está cadastrada e será oferecida para cadastro ao salvar.")
 
         df_editado = st.data_editor(
             df_extrato,
             column_config={
                 "Data": st.column_config.DateColumn(label="Data", disabled=True),
                 "Detalhes": st.column_config.TextColumn(label="Detalhes", disabled=True),
-                "Obra": st.column_config.TextColumn(label="Obra", required=True),
+                "Obra": st.column_config.SelectboxColumn(
+                    label="Obra",
+                    options=indice_obras.nomes + obras_fora_do_indice,
+                    required=True,
+                ),
                 "Categoria": st.column_config.SelectboxColumn(
                     label="Categoria",
                     options=["Material", "Mão de Obra", "Depósito", "Outros"],
@@ -87,10 +91,15 @@ if arquivo:
                 ),
                 "Valor": st.column_config.NumberColumn(label="Valor (R$)", format="R$ %.2f", disabled=True),
                 "Descrição": st.column_config.TextColumn(label="Descrição", required=True),
+                "Arquivo": st.column_config.TextColumn(label="Arquivo", disabled=True),
             },
             hide_index=True,
             width="stretch",
-            num_rows="fixed" # Não deixa adicionar linhas, apenas editar as existentes
+            num_rows="fixed", # Não deixa adicionar linhas, apenas editar as existentes
+            # Chave fixa para os arquivos carregados: com ela (e num_rows="fixed") a identidade do
+            # editor não depende das opções de Obra, que mudam quando as obras novas são cadastradas,
+            # e as classificações feitas continuam valendo no reprocessamento
+            key=f"editor_extrato_{importacao_atual}",
         )
 
         # --- 5. Processamento e Salvamento ---
@@ -100,26 +109,45 @@ if arquivo:
         df_valido = df_editado.replace(r'^\s*$', pd.NA, regex=True).dropna(subset=["Obra", "Categoria", "Descrição"])
 
         with col_btn:
-            if st.button("Salvar Lançamentos", type="primary", disabled=(len(df_valido) == 0)):
+            if st.button("Salvar Lançamentos", type="primary", disabled=(len(df_valido) == 0)) or reprocessar:
                 try:
                     lista_envio = []
                     obras_desconhecidas = []
                     lista_material = []
-                    
+                    linhas_conciliacao = []
+
+                    # Linhas desta importação já vinculadas a lançamentos manuais não são lançadas de novo
+                    vinculadas = st.session_state.get("extrato_vinculadas", {}).get(importacao_atual, set())
+
                     for index, row in df_valido.iterrows():
+                        if index in vinculadas:
+                            continue
+
                         # Verifica se a Obra existe
-                        obra = row["Obra"].upper()
-                        if obra not in mapa_obras_id:
-                            obras_desconhecidas.append(obra)
+                        obra = indice_obras.resolver(row["Obra"])
+                        if obra is None:
+                            if row["Obra"].upper() not in obras_desconhecidas:
+                                obras_desconhecidas.append(row["Obra"].upper())
                             continue
 
+                        linhas_conciliacao.append({
+                            "indice": index,
+                            "Data": row["Data"],
+                            "Detalhes": row["Detalhes"],
+                            "Obra": obra,
+                            "obra_id": indice_obras.ids[obra],
+                            "Categoria": row["Categoria"],
+                            "Valor": float(row["Valor"]),
+                        })
+
                         # Verifica se é Material para detalhar
                         if row["Categoria"] == "Material":
+                            row["Obra"] = obra
                             lista_material.append(row)
                             continue
 
                         # Busca o ID da Obra pelo Nome
-                        obra_id = mapa_obras_id[obra]
+                        obra_id = indice_obras.ids[obra]
 
                         # Monta o objeto para o Supabase
                         item = {
@@ -132,15 +160,30 @@ if arquivo:
                         }
                         lista_envio.append(item)
                     
-                    if len(obras_desconhecidas) == 0:
+                    # Linhas que parecem ser lançamentos já digitados à mão: oferece o vínculo antes de lançar
+                    sugestoes = pd.DataFrame()
+                    if len(obras_desconhecidas) == 0 and not conciliado:
+                        sugestoes = conciliacao.sugerir(supabase, linhas_conciliacao)
+
+                    if not sugestoes.empty:
+                        extrato = pd.DataFrame(linhas_conciliacao).drop(columns=["obra_id", "Categoria"])
+                        utils.popup_conciliacao(
+                            supabase,
+                            extrato.iloc[sugestoes["linha"]].reset_index(drop=True).join(sugestoes.drop(columns="linha")),
+                            importacao_atual,
+                        )
+                    elif len(obras_desconhecidas) == 0:
                         # Detalhar e salvar movimentações de "Material"
                         if len(lista_material) > 0:
                             st.session_state["modal"] = "Selecionar"
                             utils.popup_detalhar_material(supabase, lista_material)
                             
-                        # Salvar as outras movimentações
+                        # Salvar as outras movimentações em segundo plano
                         if len(lista_envio) > 0:
-                            utils.salvar_movimentacao(supabase, lista_envio, col_info)
+                            importacao.enviar_importacao(lista_envio)
+                            # Importação enviada: as linhas vinculadas não valem para as próximas
+                            st.session_state.pop("extrato_vinculadas", None)
+                            col_info.info(f"{len(lista_envio)} lançamentos enviados para gravação. Acompanhe o andamento acima.")
                     else:
                         # Cadastrar novas obra
                         utils.popup_cadastro_obras(supabase, obras_desconhecidas)
@@ -149,4 +192,8 @@ if arquivo:
                     st.error(f"Erro ao gravar no banco: {e}")
 
     except Exception as e:
-        st.error(f"Erro ao ler o arquivo: {e}. Verifique se é um Excel válido.")
\ No newline at end of file
+        st.error(f"Erro ao ler os arquivos: {e}. Verifique se são planilhas Excel válidas.")
+
+# Andamento das importações enviadas nesta sessão (continua entre reruns)
+with area_importacoes:
+    importacao.painel_importacoes()
\ No newline at end of file
@@ -1,10 +1,11 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 import sys
 import os
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import graficos
+import dados
 import utils
 
 st.set_page_config(page_title="Consultar Obra")
@@ -21,8 +22,7 @@ supabase = st.session_state["supabase"]
 st.title("Painel da Obra 📊")
 
 # 1. Carregar Lista de Obras
-response = supabase.table("obras").select("id, Nome").execute()
-obras_dict = {row["Nome"]: row["id"] for row in response.data}
+obras_dict = {row["Nome"]: row["id"] for row in dados.consultar_obras(supabase)}
 
 if not obras_dict:
     st.warning("Nenhuma obra encontrada.")
@@ -32,11 +32,15 @@ if not obras_dict:
 obra_nome = st.selectbox("Selecione a Obra para analisar:", list(obras_dict.keys()))
 obra_id = obras_dict[obra_nome]
 
-# 2. Buscar Detalhes da Obra Selecionada
-dados_obra = supabase.table("obras").select("*").eq("id", obra_id).execute().data[0]
+# Período analisado (compartilhado com as outras páginas de consulta)
+inicio, fim = utils.seletor_periodo()
 
-# 3. Buscar Todas as Movimentações dessa Obra
-movimentacoes = supabase.table("movimentacoes").select("*").eq("obra_id", obra_id).execute().data
+# 2. Buscar Detalhes da Obra Selecionada e 3. Movimentações dessa Obra no período
+# As duas consultas são independentes, então são feitas em paralelo
+dados_obra, df = dados.buscar_em_paralelo(
+    lambda: dados.consultar_obra(supabase, obra_id),
+    lambda: dados.consultar_movimentacoes(supabase, obra_id=obra_id, inicio=inicio, fim=fim),
+)
 
 # --- Exibir Informações da Obra ---
 
@@ -56,25 +60,27 @@ col1, col2, col3 = st.columns(3)
 
 orcamento_total = float(dados_obra["Orçamento"]) if dados_obra["Orçamento"] else 0.0
 
-if movimentacoes:
-    df = pd.DataFrame(movimentacoes)
-    # Garante que a coluna valor é numérica
-    df["Valor"] = pd.to_numeric(df["Valor"])
-    
-    total_gasto = df["Valor"].sum()
+if not df.empty:
+    # Categorias, datas já convertidas e valores em centavos inteiros
+    total_gasto = dados.para_reais(df["Valor_Centavos"].sum())
     saldo = orcamento_total - total_gasto
     
     # Cálculos por Categoria (para gráficos)
-    gastos_por_cat = df.groupby("Categoria")["Valor"].sum().reset_index()
+    gastos_por_cat = df.groupby("Categoria", observed=True)["Valor_Centavos"].sum().reset_index()
+    gastos_por_cat["Valor"] = dados.para_reais(gastos_por_cat.pop("Valor_Centavos"))
+    gastos_por_cat["Categoria"] = gastos_por_cat["Categoria"].astype("string")
 else:
-    df = pd.DataFrame() # Tabela vazia
     total_gasto = 0.0
     saldo = orcamento_total
 
 # Métricas Visuais (KPIs)
 col1.metric("Orçamento Total", f"R$ {orcamento_total:,.2f}")
-col2.metric("Total Gasto", f"R$ {total_gasto:,.2f}", delta=f"-{(total_gasto/orcamento_total)*100:.1f}%" if orcamento_total > 0 else "")
-col3.metric("Saldo Disponível", f"R$ {saldo:,.2f}")
+col2.metric("Total Gasto" if inicio is None else "Gasto no Período", f"R$ {total_gasto:,.2f}", delta=f"-{(total_gasto/orcamento_total)*100:.1f}%" if orcamento_total > 0 else "")
+if inicio is None:
+    col3.metric("Saldo Disponível", f"R$ {saldo:,.2f}")
+else:
+    # O saldo depende de todo o histórico da obra
+    col3.metric("Lançamentos no Período", len(df))
 
 # --- Conteúdo Detalhado (Tabs conforme Item 2.d e 4.a do PDF) ---
 tab_tabela, tab_graficos = st.tabs(["📝 Extrato Detalhado", "📈 Visão Gráfica"])
@@ -83,11 +89,12 @@ with tab_tabela:
     if not df.empty:
         st.subheader("Extrato de Lançamentos")
         # Filtros rápidos
-        filtro_cat = st.multiselect("Filtrar Categoria:", df["Categoria"].unique())
+        filtro_cat = st.multiselect("Filtrar Categoria:", sorted(df["Categoria"].dropna().unique()))
         
         df_show = df.copy()
         if filtro_cat:
             df_show = df_show[df_show["Categoria"].isin(filtro_cat)]
+        df_show["Valor"] = dados.para_reais(df_show["Valor_Centavos"])
             
         # Limpeza visual da tabela
         colunas_visiveis = ["Data", "Detalhes", "Valor", "Categoria", "Descrição"]
@@ -107,8 +114,9 @@ with tab_tabela:
             idx = event.selection["rows"][0]
             row_selecionada = df_show.iloc[idx]
             
-            # Verifica se tem itens detalhados (JSON)
-            if "Itens" in row_selecionada and row_selecionada["Itens"]:
+            # Verifica se tem itens detalhados (tabela movimentacao_itens)
+            itens = dados.consultar_itens(supabase, int(row_selecionada["id"])) if row_selecionada["Categoria"] == "Material" else []
+            if itens:
                 @st.dialog("Detalhes da Compra")
                 def mostrar_detalhes(itens):
                     df_itens = pd.DataFrame(itens)
@@ -121,25 +129,27 @@ with tab_tabela:
                         width="stretch"
                     )
                 
-                mostrar_detalhes(row_selecionada["Itens"])
+                mostrar_detalhes(itens)
 
 with tab_graficos:
     if not df.empty:
         col_g1, col_g2 = st.columns(2)
         
         # Gráfico de Pizza (Gastos por Categoria)
-        fig_pizza = px.pie(gastos_por_cat, values='Valor', names='Categoria', title='Gastos por Categoria')
-        fig_pizza.update_layout(plot_bgcolor='rgba(0, 0, 0, 0)',  paper_bgcolor='rgba(0, 0, 0, 0)', legend=dict(bgcolor='rgba(0, 0, 0, 0)'))
+        fig_pizza = graficos.pizza(gastos_por_cat, "Valor", "Categoria", "Gastos por Categoria")
 
         col_g1.plotly_chart(fig_pizza, width="stretch")
         
         # Gráfico de Barras (Evolução no Tempo se houver data)
         if "Data" in df.columns:
-            df_temp = df.sort_values("Data")
-            fig_barras = px.bar(df_temp, x="Data", y="Valor", color="Categoria", title="Gastos ao Longo do Tempo")
-            fig_barras.update_layout(plot_bgcolor='rgba(0, 0, 0, 0)',  paper_bgcolor='rgba(0, 0, 0, 0)', legend=dict(bgcolor='rgba(0, 0, 0, 0)'))
+            df_temp = df[["Data", "Categoria"]].assign(Valor=dados.para_reais(df["Valor_Centavos"])).sort_values("Data")
+            df_temp["Categoria"] = df_temp["Categoria"].astype("string")
+            fig_barras = graficos.barras(df_temp, "Data", "Valor", "Gastos ao Longo do Tempo", cor="Categoria")
 
             col_g2.plotly_chart(fig_barras, width="stretch")
 
 if df.empty:
-    st.info("Nenhuma movimentação lançada nesta obra ainda.")
\ No newline at end of file
+    if inicio is None:
+        st.info("Nenhuma movimentação lançada nesta obra ainda.")
+    else:
+        st.info(f"Nenhuma movimentação desta obra de {utils.descrever_periodo(inicio, fim)}.")
\ No newline at end of file
@@ -0,0 +1,94 @@
+import streamlit as st
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import dados
+import utils
+
+st.set_page_config(page_title="Buscar Movimentações")
+
+utils.sidebar_config()
+utils.reduzir_espaco_topo()
+utils.adicionar_watermark()
+
+# --- Conexão com Supabase ---
+supabase = st.session_state["supabase"]
+
+# Resultados por página
+POR_PAGINA = 25
+
+# Tamanho mínimo do termo: abaixo de 3 letras os índices de trigramas não ajudam
+MINIMO_CARACTERES = 3
+
+# --- Título da Página ---
+
+st.title("Buscar Movimentações 🔎")
+st.markdown("Procure um lançamento em todas as obras pelos detalhes do extrato, pela descrição ou pelo nome de um item de material.")
+
+# Nova busca volta para a primeira página
+def nova_busca():
+    st.session_state["busca_pagina"] = 0
+
+termo = st.text_input(
+    "Buscar",
+    placeholder="Ex.: número do documento, fornecedor, cimento...",
+    key="busca_termo",
+    on_change=nova_busca,
+    label_visibility="collapsed",
+).strip()
+
+if not termo:
+    st.stop()
+
+if len(termo) < MINIMO_CARACTERES:
+    st.info(f"Digite pelo menos {MINIMO_CARACTERES} caracteres.")
+    st.stop()
+
+pagina = st.session_state.setdefault("busca_pagina", 0)
+
+try:
+    mapa_obras = {row["id"]: row["Nome"] for row in dados.consultar_obras(supabase)}
+    df, total = dados.buscar_movimentacoes(supabase, termo, pagina=pagina, por_pagina=POR_PAGINA)
+except Exception as e:
+    st.error(f"Erro ao buscar: {e}")
+    st.stop()
+
+if total == 0:
+    st.warning(f"Nenhuma movimentação encontrada para '{termo}'.")
+    st.stop()
+
+paginas = (total + POR_PAGINA - 1) // POR_PAGINA
+inicio = pagina * POR_PAGINA
+st.caption(f"{total} movimentação(ões) encontrada(s) · mostrando {inicio + 1}–{inicio + len(df)}")
+
+# --- Resultados ---
+for row in df.itertuples(index=False):
+    with st.container(border=True):
+        col_texto, col_valor = st.columns([4, 1])
+
+        descricao = getattr(row, "Descrição")
+        col_texto.markdown(dados.destacar(descricao, termo) or "_Sem descrição_")
+        linha_info = [
+            row.Data.strftime("%d/%m/%Y"),
+            mapa_obras.get(row.obra_id, f"Obra {row.obra_id}"),
+            row.Categoria,
+        ]
+        if isinstance(row.Detalhes, str) and row.Detalhes:
+            linha_info.append(dados.destacar(row.Detalhes, termo))
+        col_texto.caption(" · ".join(str(parte) for parte in linha_info))
+        if isinstance(row.Itens, str) and row.Itens:
+            col_texto.caption("Itens: " + dados.destacar(row.Itens, termo))
+
+        col_valor.markdown(f"**R$ {dados.para_reais(row.Valor_Centavos):,.2f}**")
+
+# --- Paginação ---
+if paginas > 1:
+    col_anterior, col_pagina, col_proxima = st.columns([1, 2, 1], vertical_alignment="center")
+    if col_anterior.button("Anterior", icon=":material/chevron_left:", disabled=pagina == 0, width="stretch"):
+        st.session_state["busca_pagina"] = pagina - 1
+        st.rerun()
+    col_pagina.caption(f"Página {pagina + 1} de {paginas}")
+    if col_proxima.button("Próxima", icon=":material/chevron_right:", disabled=pagina + 1 >= paginas, width="stretch"):
+        st.session_state["busca_pagina"] = pagina + 1
+        st.rerun()
@@ -0,0 +1,92 @@
+import streamlit as st
+import pandas as pd
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import cache_compartilhado
+import memoria_sessao
+import utils
+
+st.set_page_config(page_title="Instrumentação")
+
+utils.sidebar_config()
+utils.reduzir_espaco_topo()
+utils.adicionar_watermark()
+
+# --- Título da Página ---
+
+st.title("Instrumentação ⚙️")
+st.markdown("Uso de recursos deste processo do servidor (cada réplica tem os seus números).")
+
+# --- Cache de Consultas ---
+st.subheader("Cache de Consultas")
+st.caption("Consultas pedidas ao mesmo tempo por várias sessões são feitas uma única vez (coalescidas).")
+
+estatisticas = cache_compartilhado.estatisticas()
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("Chamadas", estatisticas["chamadas"])
+col2.metric(
+    "Acertos no cache",
+    estatisticas["acertos"],
+    delta=f"{estatisticas['acertos'] / estatisticas['chamadas'] * 100:.0f}%" if estatisticas["chamadas"] else None,
+    delta_color="off",
+)
+col3.metric("Consultas ao banco", estatisticas["consultas"])
+col4.metric("Coalescidas", estatisticas["coalescidas"])
+
+# --- Memória das Sessões ---
+st.subheader("Memória das Sessões")
+st.caption(
+    f"Objetos de dados acima de {memoria_sessao.LIMITE_BYTES / 1024 / 1024:.0f} MB das sessões sem atividade "
+    f"há mais de {memoria_sessao.INATIVIDADE // 60} min são liberados quando a sessão volta a rodar. "
+    "Os tamanhos das outras sessões são os do fim do último run de cada uma."
+)
+
+if st.button("Marcar sessões inativas agora", icon=":material/cleaning_services:"):
+    marcadas = memoria_sessao.marcar_inativas()
+    st.toast(f"{marcadas} sessão(ões) marcada(s): os objetos grandes saem no próximo acesso de cada uma.")
+
+df_memoria = pd.DataFrame(memoria_sessao.relatorio(), columns=["sessao", "inativa_ha", "chave", "tipo", "bytes", "liberados"])
+
+col1, col2, col3 = st.columns(3)
+col1.metric("Sessões", df_memoria["sessao"].nunique())
+col2.metric("Memória em session_state", f"{df_memoria['bytes'].sum() / 1024 / 1024:,.2f} MB")
+col3.metric("Já liberado", f"{df_memoria.drop_duplicates('sessao')['liberados'].sum() / 1024 / 1024:,.2f} MB")
+
+if df_memoria.empty:
+    st.info("Nenhuma sessão registrada.")
+else:
+    # Total por sessão, da que mais ocupa para a que menos ocupa
+    por_sessao = (
+        df_memoria.groupby("sessao")
+        .agg(bytes=("bytes", "sum"), chaves=("chave", "count"), inativa_ha=("inativa_ha", "first"), liberados=("liberados", "first"))
+        .sort_values("bytes", ascending=False)
+        .reset_index()
+    )
+    st.dataframe(
+        por_sessao,
+        column_config={
+            "sessao": "Sessão",
+            "bytes": st.column_config.NumberColumn("Bytes"),
+            "chaves": st.column_config.NumberColumn("Chaves"),
+            "inativa_ha": st.column_config.NumberColumn("Inativa há (s)"),
+            "liberados": st.column_config.NumberColumn("Liberados (bytes)"),
+        },
+        hide_index=True,
+        width="stretch",
+    )
+
+    with st.expander("Bytes por chave"):
+        st.dataframe(
+            df_memoria.drop(columns="liberados").sort_values("bytes", ascending=False),
+            column_config={
+                "sessao": "Sessão",
+                "inativa_ha": st.column_config.NumberColumn("Inativa há (s)"),
+                "chave": "Chave",
+                "tipo": "Tipo",
+                "bytes": st.column_config.NumberColumn("Bytes"),
+            },
+            hide_index=True,
+            width="stretch",
+        )
@@ -1,16 +1,23 @@
 import streamlit as st
+import memoria_sessao
+import fila_escrita
+import painel
 import utils
 
-from supabase import create_client
-
 # --- Configuração Inicial ---
 st.set_page_config(
     page_title="Mino Manager", 
     layout="wide"
 )
 
+# Marca a sessão como ativa (e libera objetos grandes de sessões paradas há muito tempo)
+memoria_sessao.registrar()
+
 # --- Inicialização do Supabase (Global) ---
 if "supabase" not in st.session_state:
+    # Importado só aqui: nos reruns seguintes o cliente já está na sessão
+    from supabase import create_client
+
     url = st.secrets["supabase"]["url"]
     key = st.secrets["supabase"]["key"]
     st.session_state["supabase"] = create_client(url, key)
@@ -29,6 +36,11 @@ usuario = utils.recuperar_sessao(supabase)
 if not usuario:
     pg = st.navigation([st.Page(lambda: utils.tela_login(supabase), title="Login", icon=":material/login:")])
 else:
+    # Descarrega o diário de gravações pendentes (inclusive as que sobraram de uma execução anterior)
+    fila_escrita.iniciar()
+    # Mantém o snapshot do Painel de Controle atualizado em segundo plano
+    painel.agendar()
+
     # Se ESTIVER logado, carrega a estrutura completa
     pg = st.navigation(
         {
@@ -41,8 +53,16 @@ else:
             "Consulta": [
                 st.Page("5_consulta_obra.py", title="Consulta de Obra", icon=":material/manage_search:"),
                 st.Page("6_consulta_material.py", title="Consulta de Material", icon=":material/construction:"),
-            ]
+                st.Page("7_busca.py", title="Buscar Movimentações", icon=":material/search:"),
+            ],
+            "Sistema": [
+                st.Page("8_instrumentacao.py", title="Instrumentação", icon=":material/monitoring:"),
+            ],
         }
     )
 
-pg.run()
\ No newline at end of file
+try:
+    pg.run()
+finally:
+    # Também quando a página para com st.stop() ou st.rerun(): o tamanho das chaves no fim do run
+    memoria_sessao.medir()
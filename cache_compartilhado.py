@@ -0,0 +1,216 @@
+import functools
+import threading
+import hashlib
+import sqlite3
+import pickle
+import time
+import os
+
+# --- Cache Compartilhado entre Processos ---
+# Guarda resultados de consultas e agregados em um arquivo SQLite local.
+# Todas as réplicas do Streamlit na mesma máquina (ou no mesmo volume) apontam
+# para o mesmo arquivo, então o que uma réplica aquece serve para as outras,
+# e uma gravação invalida o cache de todas ao mesmo tempo.
+
+CAMINHO_PADRAO = os.path.join(os.path.dirname(__file__), ".cache", "mino_cache.sqlite3")
+
+# Tempo de vida padrão das entradas (segundos)
+TTL_PADRAO = 300
+
+_local = threading.local()
+
+def _caminho():
+    return os.environ.get("MINO_CACHE_PATH", CAMINHO_PADRAO)
+
+def _conexao():
+    # sqlite3 não compartilha conexões entre threads: uma conexão por thread (e por arquivo)
+    caminho = _caminho()
+    conexao = getattr(_local, "conexao", None)
+    if conexao is None or _local.caminho != caminho:
+        os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+        conexao = sqlite3.connect(caminho, timeout=5, isolation_level=None)
+        conexao.execute("PRAGMA journal_mode=WAL")
+        conexao.execute("PRAGMA synchronous=NORMAL")
+        conexao.execute("""
+            CREATE TABLE IF NOT EXISTS cache (
+                chave TEXT PRIMARY KEY,
+                valor BLOB NOT NULL,
+                tabelas TEXT NOT NULL,
+                expira_em REAL NOT NULL
+            )
+        """)
+        # Quantas vezes cada tabela foi invalidada: uma consulta que começou antes
+        # de uma invalidação não grava o resultado (ver memoizar)
+        conexao.execute("""
+            CREATE TABLE IF NOT EXISTS versoes (
+                tabela TEXT PRIMARY KEY,
+                versao INTEGER NOT NULL
+            )
+        """)
+        _local.conexao = conexao
+        _local.caminho = caminho
+    return conexao
+
+def obter(chave, padrao=None):
+    """Retorna o valor guardado na chave, ou 'padrao' se não existir ou tiver expirado."""
+    linha = _conexao().execute(
+        "SELECT valor FROM cache WHERE chave = ? AND expira_em > ?", (chave, time.time())
+    ).fetchone()
+    return pickle.loads(linha[0]) if linha else padrao
+
+def gravar(chave, valor, ttl=TTL_PADRAO, tabelas=()):
+    """
+    Guarda o valor na chave por 'ttl' segundos.
+    'tabelas' lista as tabelas do banco das quais o valor depende, para a invalidação.
+    """
+    _gravar_serializado(chave, pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL), ttl, tabelas)
+
+def _gravar_serializado(chave, serializado, ttl, tabelas):
+    conexao = _conexao()
+    agora = time.time()
+    conexao.execute(
+        "INSERT OR REPLACE INTO cache (chave, valor, tabelas, expira_em) VALUES (?, ?, ?, ?)",
+        (chave, serializado, _marcar_tabelas(tabelas), agora + ttl),
+    )
+    conexao.execute("DELETE FROM cache WHERE expira_em <= ?", (agora,))
+
+def invalidar(*tabelas):
+    """
+    Remove, em todas as réplicas, as entradas que dependem de alguma das tabelas,
+    e impede que consultas já em andamento gravem resultados anteriores à gravação.
+    """
+    conexao = _conexao()
+    conexao.execute("BEGIN IMMEDIATE")
+    try:
+        for tabela in tabelas:
+            conexao.execute(
+                "INSERT INTO versoes (tabela, versao) VALUES (?, 1)"
+                " ON CONFLICT (tabela) DO UPDATE SET versao = versao + 1",
+                (tabela,),
+            )
+            conexao.execute("DELETE FROM cache WHERE tabelas LIKE ?", (f"%|{tabela}|%",))
+        conexao.execute("COMMIT")
+    except BaseException:
+        conexao.execute("ROLLBACK")
+        raise
+
+    # Quem pedir a consulta daqui em diante não espera a que está em andamento neste processo
+    with _lock_voos:
+        for chave, voo in list(_voos.items()):
+            if set(voo.tabelas) & set(tabelas):
+                del _voos[chave]
+
+def _versoes(conexao, tabelas):
+    linhas = conexao.execute(
+        f"SELECT tabela, versao FROM versoes WHERE tabela IN ({','.join('?' * len(tabelas))})",
+        list(tabelas),
+    ).fetchall()
+    return dict(linhas)
+
+def _gravar_se_atual(chave, serializado, ttl, tabelas, versoes):
+    """Grava só se nenhuma das tabelas foi invalidada desde que a consulta começou."""
+    conexao = _conexao()
+    conexao.execute("BEGIN IMMEDIATE")
+    try:
+        if _versoes(conexao, tabelas) == versoes:
+            _gravar_serializado(chave, serializado, ttl, tabelas)
+        conexao.execute("COMMIT")
+    except BaseException:
+        conexao.execute("ROLLBACK")
+        raise
+
+def limpar():
+    _conexao().execute("DELETE FROM cache")
+
+def _marcar_tabelas(tabelas):
+    # "|obras|movimentacoes|": delimitado para o LIKE não casar nomes parciais
+    return "|" + "|".join(tabelas) + "|"
+
+_AUSENTE = object()
+
+# --- Consultas em Andamento (single-flight) ---
+# Sessões que pedem a mesma consulta ao mesmo tempo (ex.: vários usuários abrindo o
+# painel juntos) não disparam uma requisição cada: a primeira busca no banco e as
+# outras esperam e recebem o mesmo resultado já decodificado. Vale dentro do processo;
+# entre réplicas, quem chega depois encontra o resultado no cache.
+
+class _Voo:
+    """Uma consulta em andamento: quem chegar depois espera o evento e lê o resultado."""
+
+    def __init__(self, tabelas):
+        self.tabelas = tabelas
+        self.pronto = threading.Event()
+        self.serializado = None
+        self.erro = None
+
+_voos = {}
+_lock_voos = threading.Lock()
+
+# Contadores deste processo (mostrados na página de Instrumentação)
+_contadores = {"chamadas": 0, "acertos": 0, "consultas": 0, "coalescidas": 0}
+
+def _contar(nome):
+    with _lock_voos:
+        _contadores[nome] += 1
+
+def estatisticas():
+    """
+    Contadores das funções memoizadas neste processo: chamadas, acertos (no cache),
+    consultas (feitas ao banco) e coalescidas (que aproveitaram uma consulta em andamento).
+    """
+    with _lock_voos:
+        return dict(_contadores)
+
+def memoizar(tabelas, ttl=TTL_PADRAO):
+    """
+    Decorador para funções de consulta no formato f(supabase, *args, **kwargs).
+    O cliente não entra na chave (é diferente em cada sessão); os demais argumentos sim.
+    Chamadas simultâneas com a mesma chave compartilham uma única consulta.
+    """
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def envoltorio(supabase, *args, **kwargs):
+            assinatura = repr((args, sorted(kwargs.items()))).encode("utf-8")
+            chave = f"{funcao.__module__}.{funcao.__qualname__}:{hashlib.sha1(assinatura).hexdigest()}"
+            _contar("chamadas")
+
+            valor = obter(chave, _AUSENTE)
+            if valor is not _AUSENTE:
+                _contar("acertos")
+                return valor
+
+            with _lock_voos:
+                voo = _voos.get(chave)
+                lider = voo is None
+                if lider:
+                    voo = _voos[chave] = _Voo(tabelas)
+                    _contadores["consultas"] += 1
+                else:
+                    _contadores["coalescidas"] += 1
+
+            if not lider:
+                voo.pronto.wait()
+                if voo.serializado is None:
+                    raise voo.erro
+                # Cada sessão recebe a sua cópia (as páginas alteram os DataFrames recebidos)
+                return pickle.loads(voo.serializado)
+
+            try:
+                # Lidas antes da consulta: se alguma tabela for invalidada no meio,
+                # o resultado pode ser anterior à gravação e não vai para o cache
+                versoes = _versoes(_conexao(), tabelas)
+                valor = funcao(supabase, *args, **kwargs)
+                voo.serializado = pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL)
+                _gravar_se_atual(chave, voo.serializado, ttl, tabelas, versoes)
+                return valor
+            except BaseException as e:
+                voo.erro = e
+                raise
+            finally:
+                with _lock_voos:
+                    # invalidar() pode já ter tirado este voo (e outro líder ter começado)
+                    if _voos.get(chave) is voo:
+                        del _voos[chave]
+                voo.pronto.set()
+        return envoltorio
+    return decorador
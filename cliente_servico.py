@@ -0,0 +1,55 @@
+import threading
+
+import streamlit as st
+
+# --- Cliente de Serviço ---
+# As threads de segundo plano do processo (fila de gravação, snapshot do painel)
+# não pertencem a nenhuma sessão. Elas usam um cliente próprio, criado com a chave
+# service_role dos secrets: não dependem do login de quem abriu o app por último,
+# não param quando esse usuário sai (sign_out) e não enxergam o banco pelas regras
+# de acesso (RLS) de um usuário específico.
+#
+#   [supabase]
+#   url = "..."
+#   key = "..."          # chave anon, usada pelas sessões
+#   service_key = "..."  # chave service_role, usada só no servidor
+
+_lock = threading.Lock()
+_cliente = None
+
+def erro_configuracao():
+    """Mensagem se faltar a configuração do cliente de serviço nos secrets (None se estiver ok)."""
+    with _lock:
+        if _cliente is not None:
+            return None
+    try:
+        secao = st.secrets["supabase"]
+        faltando = [chave for chave in ("url", "service_key") if not secao.get(chave)]
+    except Exception:
+        # Sem secrets.toml ou sem a seção [supabase]
+        faltando = ["url", "service_key"]
+    if not faltando:
+        return None
+    return (
+        f"Configure {', '.join(f'supabase.{chave}' for chave in faltando)} nos secrets do app "
+        "(chave service_role): sem isso as gravações não chegam ao banco."
+    )
+
+def obter():
+    """O cliente de serviço do processo (criado na primeira chamada). Sem configuração, levanta RuntimeError."""
+    global _cliente
+    erro = erro_configuracao()
+    if erro:
+        raise RuntimeError(erro)
+    with _lock:
+        if _cliente is None:
+            from supabase import create_client
+
+            _cliente = create_client(st.secrets["supabase"]["url"], st.secrets["supabase"]["service_key"])
+        return _cliente
+
+def definir(cliente):
+    """Usa outro cliente nas threads de segundo plano (ex.: o Supabase local dos scripts de teste)."""
+    global _cliente
+    with _lock:
+        _cliente = cliente
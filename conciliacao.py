@@ -0,0 +1,104 @@
+import collections
+import datetime
+
+import pandas as pd
+
+import dados
+
+# --- Conciliação do Extrato ---
+# Lançamentos digitados em 3_movimentacao.py ficam com "Detalhes" vazio; quando o
+# mesmo pagamento chega depois pelo extrato, a chave do upsert é outra e ele seria
+# contado duas vezes. Aqui as linhas do extrato são emparelhadas com esses
+# lançamentos manuais (mesma obra, mesmo valor em centavos, mesmo sentido, data
+# próxima) para a página oferecer o vínculo no lugar de um novo lançamento.
+
+# Diferença máxima entre a data do extrato e a do lançamento manual (dias)
+TOLERANCIA_DIAS = 5
+
+# Chave dos grupos: só se emparelham linhas da mesma obra, do mesmo valor e do mesmo sentido
+# (o extrato guarda o valor sem sinal; uma entrada é a linha classificada como Depósito)
+CHAVES = ["obra_id", "Valor_Centavos", "Entrada"]
+
+def entrada(categorias):
+    """Sentido do dinheiro pela categoria: True para Depósito (entrada), False para gastos."""
+    return pd.Series(categorias).astype("string").eq("Depósito").fillna(False).to_numpy()
+
+def emparelhar(df_extrato, df_manuais, tolerancia_dias=TOLERANCIA_DIAS):
+    """
+    Emparelha, um para um, linhas do extrato e lançamentos manuais da mesma obra, do
+    mesmo valor e do mesmo sentido, com datas a no máximo 'tolerancia_dias' de distância.
+    df_extrato: colunas linha, Data e CHAVES; df_manuais: id, Data e CHAVES.
+    Retorna um DataFrame com linha, id e dias (diferença entre as datas).
+
+    Uma ordenação (por grupo e data) e uma passada: dentro de cada grupo, os dois lados
+    são percorridos juntos em ordem de data, e cada linha fica com a pendente mais antiga
+    do outro lado que ainda está dentro da tolerância. Esse emparelhamento em ordem é o de
+    mais pares possível para uma janela de datas, e custa O(n log n) pela ordenação,
+    mesmo com muitas linhas de mesma obra e valor.
+    """
+    eventos = pd.concat([
+        pd.DataFrame({"lado": 0, "ref": df_extrato["linha"].to_numpy(), "Data": df_extrato["Data"].to_numpy(), **{c: df_extrato[c].to_numpy() for c in CHAVES}}),
+        pd.DataFrame({"lado": 1, "ref": df_manuais["id"].to_numpy(), "Data": df_manuais["Data"].to_numpy(), **{c: df_manuais[c].to_numpy() for c in CHAVES}}),
+    ], ignore_index=True)
+    eventos = eventos.astype({"ref": "int64", "obra_id": "int64", "Valor_Centavos": "int64", "Entrada": "bool"})
+    eventos["Data"] = pd.to_datetime(eventos["Data"]).astype("datetime64[ns]")
+    eventos = eventos.sort_values([*CHAVES, "Data", "lado"], kind="stable")
+
+    # Percorrido como listas de inteiros (datas em dias): a passada é em Python puro
+    grupos = eventos.groupby(CHAVES, sort=False).ngroup().tolist()
+    dias = eventos["Data"].to_numpy().astype("datetime64[D]").astype("int64").tolist()
+
+    pares = []
+    pendentes = collections.deque()  # (lado, ref, data), todos do mesmo lado
+    grupo_atual = None
+    for grupo, lado, ref, data in zip(grupos, eventos["lado"].tolist(), eventos["ref"].tolist(), dias):
+        if grupo != grupo_atual:
+            pendentes.clear()
+            grupo_atual = grupo
+        # As próximas datas só aumentam: uma pendente fora da tolerância não casa mais com nada
+        while pendentes and data - pendentes[0][2] > tolerancia_dias:
+            pendentes.popleft()
+
+        if pendentes and pendentes[0][0] != lado:
+            _, ref_outro, data_outro = pendentes.popleft()
+            linha, movimentacao_id = (ref, ref_outro) if lado == 0 else (ref_outro, ref)
+            pares.append((linha, movimentacao_id, data - data_outro))
+        else:
+            pendentes.append((lado, ref, data))
+
+    resultado = pd.DataFrame(pares, columns=["linha", "id", "dias"]).astype("int64")
+    return resultado.sort_values("linha").reset_index(drop=True)
+
+def sugerir(supabase, linhas, tolerancia_dias=TOLERANCIA_DIAS):
+    """
+    Vínculos sugeridos para as linhas do extrato (dicts com Data, Detalhes, Categoria, Valor e obra_id).
+    Só lê do banco os lançamentos manuais das obras e do intervalo de datas das linhas.
+    Retorna um DataFrame com a linha do extrato (posição em 'linhas'), o lançamento
+    manual (id, Data_Manual, Descrição_Manual, Categoria_Manual) e a diferença em dias.
+    """
+    df_extrato = pd.DataFrame(linhas)
+    if df_extrato.empty:
+        return pd.DataFrame()
+    df_extrato["linha"] = range(len(df_extrato))
+    df_extrato["Data"] = pd.to_datetime(df_extrato["Data"])
+    df_extrato["Valor_Centavos"] = dados.para_centavos(df_extrato["Valor"])
+    df_extrato["Entrada"] = entrada(df_extrato["Categoria"])
+
+    margem = datetime.timedelta(days=tolerancia_dias)
+    df_manuais = dados.consultar_lancamentos_manuais(
+        supabase,
+        sorted(int(obra_id) for obra_id in df_extrato["obra_id"].unique()),
+        df_extrato["Data"].min().date() - margem,
+        df_extrato["Data"].max().date() + margem,
+    )
+    if df_manuais.empty:
+        return pd.DataFrame()
+    df_manuais = df_manuais.assign(Entrada=entrada(df_manuais["Categoria"]))
+
+    pares = emparelhar(df_extrato, df_manuais, tolerancia_dias)
+    if pares.empty:
+        return pd.DataFrame()
+
+    manuais = df_manuais.rename(columns={"Data": "Data_Manual", "Descrição": "Descrição_Manual", "Categoria": "Categoria_Manual"})
+    manuais = manuais[["id", "Data_Manual", "Descrição_Manual", "Categoria_Manual"]].astype({"id": "int64"})
+    return pares.merge(manuais, on="id", how="left")
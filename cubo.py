@@ -0,0 +1,220 @@
+import time
+import io
+
+import pandas as pd
+
+import cache_compartilhado
+import dados
+import painel
+
+# --- Cubo de Gastos ---
+# Gasto pré-agregado por obra × categoria × subcategoria × mês, guardado no cache
+# compartilhado. As análises do painel (drill-down por categoria/subcategoria,
+# pivôs obra × mês) são fatias desse cubo, sem voltar a agrupar as movimentações.
+# O cubo é atualizado de forma incremental: só as movimentações com id acima da
+# marca d'água são lidas e somadas às células existentes. Os itens chegam em um
+# insert separado, depois da movimentação: os itens já somados das movimentações
+# recentes ficam guardados, e os que mudaram desde então são corrigidos no cubo.
+
+CHAVE = "cubo:gastos"
+
+# Muda quando o formato do cubo mudar (cubos antigos são reconstruídos)
+VERSAO = 2
+
+DIMENSOES = ["obra_id", "Categoria", "Subcategoria", "Mes"]
+
+# Ids recentes lembrados: uma gravação com id menor que a marca, mas confirmada depois
+# (transações concorrentes), ainda é incluída, e nenhuma linha é somada duas vezes
+MARGEM_IDS = 1000
+
+# Sem gravações pelo app, confere se há linhas novas de outras origens (segundos)
+INTERVALO = 5 * 60
+
+# Reconstrução completa (corrige exclusões e edições de linhas antigas, que o incremental não vê)
+RECONSTRUCAO = 24 * 60 * 60
+
+# O cubo não expira junto com as consultas: continua servindo até ser substituído
+TTL = 7 * 24 * 60 * 60
+
+def _para_bytes(df):
+    buffer = io.BytesIO()
+    df.reset_index(drop=True).to_feather(buffer, compression="zstd")
+    return buffer.getvalue()
+
+def _de_bytes(conteudo):
+    df = pd.read_feather(io.BytesIO(conteudo))
+    df["Mes"] = pd.to_datetime(df["Mes"])
+    return df
+
+def _ler(supabase, acima_de):
+    """Movimentações com id > acima_de e os itens de material delas."""
+    consulta_mov = supabase.table("movimentacoes").select("id, obra_id, Data, Valor, Categoria")
+    consulta_itens = supabase.table("movimentacao_itens").select("movimentacao_id, Subcategoria, Valor")
+    if acima_de is not None:
+        consulta_mov = consulta_mov.gt("id", acima_de)
+        consulta_itens = consulta_itens.gt("movimentacao_id", acima_de)
+    return dados.buscar_em_paralelo(
+        lambda: dados.ler_tabela(consulta_mov),
+        lambda: dados.ler_tabela(consulta_itens),
+    )
+
+def _agregar(df_mov, df_itens):
+    """
+    Soma as movimentações nas células do cubo (valores em centavos).
+    Compras de Material são divididas pelas subcategorias dos itens; o que os itens
+    não cobrem (ou movimentações sem itens) fica com a subcategoria vazia, de modo que
+    o total de cada categoria é sempre o das movimentações.
+    """
+    if df_mov.empty:
+        return pd.DataFrame({
+            "obra_id": pd.Series(dtype="int64"),
+            "Categoria": pd.Series(dtype="string"),
+            "Subcategoria": pd.Series(dtype="string"),
+            "Mes": pd.Series(dtype="datetime64[ns]"),
+            "Valor_Centavos": pd.Series(dtype="int64"),
+        })
+
+    mov = pd.DataFrame({
+        "id": df_mov["id"].astype("int64"),
+        "obra_id": df_mov["obra_id"].astype("int64"),
+        "Categoria": df_mov["Categoria"].astype("string"),
+        "Mes": pd.to_datetime(df_mov["Data"]).dt.to_period("M").dt.to_timestamp(),
+        "Valor_Centavos": dados.para_centavos(df_mov["Valor"]),
+    })
+
+    if df_itens.empty:
+        itens = pd.DataFrame({"movimentacao_id": pd.Series(dtype="int64"), "Subcategoria": pd.Series(dtype="string"), "Valor_Centavos": pd.Series(dtype="int64")})
+    else:
+        itens = pd.DataFrame({
+            "movimentacao_id": df_itens["movimentacao_id"].astype("int64"),
+            "Subcategoria": df_itens["Subcategoria"].astype("string"),
+            "Valor_Centavos": dados.para_centavos(df_itens["Valor"]),
+        })
+        itens = itens[itens["movimentacao_id"].isin(mov["id"])]
+
+    linhas_itens = itens.merge(mov.drop(columns="Valor_Centavos"), left_on="movimentacao_id", right_on="id")
+    residuo = mov["Valor_Centavos"] - mov["id"].map(itens.groupby("movimentacao_id")["Valor_Centavos"].sum()).fillna(0).astype("int64")
+    linhas_residuo = mov.assign(Valor_Centavos=residuo, Subcategoria=pd.Series(pd.NA, index=mov.index, dtype="string"))
+
+    linhas = pd.concat([linhas_itens[DIMENSOES + ["Valor_Centavos"]], linhas_residuo.loc[residuo != 0, DIMENSOES + ["Valor_Centavos"]]])
+    return linhas.groupby(DIMENSOES, dropna=False)["Valor_Centavos"].sum().reset_index()
+
+def _somar(cubo, delta):
+    if delta.empty:
+        return cubo
+    juntos = pd.concat([cubo, delta], ignore_index=True)
+    return juntos.groupby(DIMENSOES, dropna=False)["Valor_Centavos"].sum().reset_index()
+
+def _assinatura(df_itens):
+    """Quantidade e total (centavos) dos itens de cada movimentação, para ver quais mudaram."""
+    if df_itens.empty:
+        return pd.DataFrame({"quantidade": pd.Series(dtype="int64"), "total": pd.Series(dtype="int64")})
+    return pd.DataFrame({
+        "movimentacao_id": df_itens["movimentacao_id"].astype("int64"),
+        "Valor_Centavos": dados.para_centavos(df_itens["Valor"]),
+    }).groupby("movimentacao_id")["Valor_Centavos"].agg(quantidade="size", total="sum")
+
+def _publicar(df_cubo, ids_aplicados, df_itens, estado=None):
+    agora = time.time()
+    ids_recentes = sorted(set(ids_aplicados) | set(estado["ids_recentes"] if estado else ()))[-MARGEM_IDS:]
+    # Itens somados das movimentações recentes (df_itens cobre todas elas: foi lido a partir da menor)
+    if df_itens.empty:
+        df_itens = pd.DataFrame({"movimentacao_id": pd.Series(dtype="int64"), "Subcategoria": pd.Series(dtype="string"), "Valor": pd.Series(dtype="float64")})
+    df_itens = df_itens.loc[df_itens["movimentacao_id"].isin(ids_recentes), ["movimentacao_id", "Subcategoria", "Valor"]]
+    novo = {
+        "versao": VERSAO,
+        "marca": ids_recentes[-1] if ids_recentes else None,
+        "ids_recentes": ids_recentes,
+        "itens_recentes": _para_bytes(df_itens),
+        "atualizado_em": agora,
+        "completo_em": estado["completo_em"] if estado else agora,
+        "dados": _para_bytes(df_cubo),
+    }
+    cache_compartilhado.gravar(CHAVE, novo, ttl=TTL)
+    return novo
+
+def reconstruir(supabase):
+    """Recalcula o cubo inteiro a partir do banco."""
+    df_mov, df_itens = _ler(supabase, None)
+    ids = df_mov["id"].astype("int64").tolist() if not df_mov.empty else []
+    return _publicar(_agregar(df_mov, df_itens), ids, df_itens)
+
+def _corrigir_itens(df_mov, df_itens, itens_aplicados):
+    """
+    Diferença no cubo das movimentações já somadas cujos itens mudaram (itens inseridos
+    depois da movimentação): tira a divisão que foi somada e soma a com os itens atuais.
+    """
+    ids = df_mov["id"].astype("int64")
+    atuais = _assinatura(df_itens).reindex(ids).fillna(0)
+    aplicados = _assinatura(itens_aplicados).reindex(ids).fillna(0)
+    mudaram = atuais.ne(aplicados).any(axis=1).to_numpy()
+    if not mudaram.any():
+        return pd.DataFrame()
+
+    mov = df_mov[mudaram]
+    antes = _agregar(mov, itens_aplicados)
+    depois = _agregar(mov, df_itens)
+    return pd.concat([depois, antes.assign(Valor_Centavos=-antes["Valor_Centavos"])], ignore_index=True)
+
+def atualizar(supabase, estado):
+    """
+    Soma ao cubo as movimentações que chegaram depois da última atualização e corrige as
+    recentes cujos itens foram gravados (ou mudaram) depois que elas foram somadas.
+    """
+    recentes = estado["ids_recentes"]
+    df_mov, df_itens = _ler(supabase, recentes[0] - 1 if recentes else None)
+    if df_mov.empty:
+        return _publicar(_de_bytes(estado["dados"]), [], df_itens, estado)
+
+    ja_somadas = df_mov["id"].isin(recentes)
+    novas = df_mov[~ja_somadas]
+    df_cubo = _somar(_de_bytes(estado["dados"]), _agregar(novas, df_itens))
+
+    itens_aplicados = pd.read_feather(io.BytesIO(estado["itens_recentes"]))
+    correcao = _corrigir_itens(df_mov[ja_somadas], df_itens, itens_aplicados)
+    if not correcao.empty:
+        df_cubo = _somar(df_cubo, correcao)
+        # A divisão antiga some: sobram células zeradas, que não precisam ficar no cubo
+        df_cubo = df_cubo[df_cubo["Valor_Centavos"] != 0]
+
+    return _publicar(df_cubo, novas["id"].astype("int64").tolist(), df_itens, estado)
+
+def obter(supabase):
+    """
+    O cubo atualizado, com as colunas obra_id, Categoria, Subcategoria, Mes e Valor_Centavos.
+    Reconstrói se não existir (ou a cada RECONSTRUCAO) e soma as linhas novas depois de gravações.
+    """
+    estado = cache_compartilhado.obter(CHAVE)
+    agora = time.time()
+    if estado is None or estado.get("versao") != VERSAO or agora - estado["completo_em"] > RECONSTRUCAO:
+        estado = reconstruir(supabase)
+    elif (
+        cache_compartilhado.obter(painel.CHAVE_DESATUALIZADO, 0) > estado["atualizado_em"]
+        or agora - estado["atualizado_em"] > INTERVALO
+    ):
+        estado = atualizar(supabase, estado)
+    return _de_bytes(estado["dados"])
+
+# --- Fatias ---
+
+def fatiar(cubo, inicio=None, fim=None, obra_id=None, categoria=None):
+    """
+    Células do cubo no período e, opcionalmente, de uma obra e/ou categoria.
+    O cubo é mensal: um período é arredondado para os meses que ele toca.
+    """
+    mascara = pd.Series(True, index=cubo.index)
+    if inicio is not None:
+        mascara &= cubo["Mes"] >= pd.Timestamp(inicio.replace(day=1))
+    if fim is not None:
+        mascara &= cubo["Mes"] <= pd.Timestamp(fim)
+    if obra_id is not None:
+        mascara &= cubo["obra_id"] == obra_id
+    if categoria is not None:
+        mascara &= (cubo["Categoria"] == categoria).fillna(False)
+    return cubo[mascara]
+
+def somar_por(fatia, *dimensoes):
+    """Total em reais da fatia agrupada pelas dimensões (coluna "Valor")."""
+    totais = fatia.groupby(list(dimensoes), dropna=False)["Valor_Centavos"].sum().reset_index()
+    totais["Valor"] = dados.para_reais(totais.pop("Valor_Centavos"))
+    return totais
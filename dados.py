@@ -0,0 +1,344 @@
+import pandas as pd
+import unicodedata
+import difflib
+import json
+import re
+import io
+
+import pyarrow.csv as pa_csv
+import pyarrow as pa
+
+from concurrent.futures import ThreadPoolExecutor
+
+import cache_compartilhado
+
+# --- Execução Concorrente de Consultas ---
+
+# Pool compartilhado entre as páginas: as consultas são I/O de rede, então
+# threads bastam e evitamos recriar o pool a cada rerun.
+_executor_consultas = ThreadPoolExecutor(max_workers=8, thread_name_prefix="mino-consulta")
+
+def buscar_em_paralelo(*consultas):
+    """
+    Executa consultas independentes ao mesmo tempo e junta os resultados.
+    Aceita query builders do Supabase (sem o .execute()) ou funções sem argumentos.
+    Retorna as respostas na mesma ordem em que as consultas foram passadas,
+    de modo que a latência da página passa a ser a da consulta mais lenta.
+    """
+    tarefas = [c.execute if hasattr(c, "execute") else c for c in consultas]
+
+    # Uma única consulta não precisa passar pelo pool
+    if len(tarefas) == 1:
+        return [tarefas[0]()]
+
+    futuros = [_executor_consultas.submit(tarefa) for tarefa in tarefas]
+    return [futuro.result() for futuro in futuros]
+
+# --- Índice de Nomes de Obras ---
+
+def normalizar_nome(nome):
+    """
+    Reduz o nome de uma obra a uma chave de comparação:
+    sem acentos, em maiúsculas e com os espaços colapsados.
+    """
+    if not isinstance(nome, str):
+        return ""
+    decomposto = unicodedata.normalize("NFKD", nome)
+    sem_acentos = "".join(c for c in decomposto if not unicodedata.combining(c))
+    return " ".join(sem_acentos.upper().split())
+
+class IndiceObras:
+    """
+    Índice em memória dos nomes de obras cadastradas.
+    Resolve nomes digitados ignorando acentos, caixa e espaços extras,
+    e sugere as obras mais parecidas quando não há correspondência exata.
+    """
+
+    def __init__(self, obras):
+        # obras: lista de dicts com "id" e "Nome", como retornado pelo Supabase
+        self.ids = {row["Nome"]: row["id"] for row in obras}  # {Nome canônico: ID}
+        self._por_chave = {normalizar_nome(nome): nome for nome in self.ids}
+
+    @property
+    def nomes(self):
+        return sorted(self.ids)
+
+    def resolver(self, nome):
+        """Retorna o nome canônico da obra, ou None se ela não estiver cadastrada."""
+        return self._por_chave.get(normalizar_nome(nome))
+
+    def id_obra(self, nome):
+        nome_canonico = self.resolver(nome)
+        return self.ids[nome_canonico] if nome_canonico is not None else None
+
+    def sugerir(self, nome, limite=3, corte=0.6):
+        """Lista os nomes canônicos mais próximos do nome digitado."""
+        chaves = difflib.get_close_matches(normalizar_nome(nome), self._por_chave.keys(), n=limite, cutoff=corte)
+        return [self._por_chave[chave] for chave in chaves]
+
+# --- Carregamento Compacto de Movimentações ---
+
+# Colunas repetitivas guardadas como categorias (um código inteiro por linha)
+COLUNAS_CATEGORICAS = ["Categoria", "Descrição", "Detalhes", "obra_id"]
+
+def carregar_movimentacoes(registros):
+    """
+    Monta o DataFrame de movimentações em formato compacto:
+    colunas de texto repetitivas como categorias, "Data" já convertida para data
+    e o dinheiro em centavos inteiros na coluna "Valor_Centavos" (sem "Valor" em float).
+    Aceita a lista de registros retornada pelo Supabase ou um DataFrame.
+    """
+    df = registros.copy() if isinstance(registros, pd.DataFrame) else pd.DataFrame(registros)
+    if df.empty:
+        return df
+
+    df["Data"] = pd.to_datetime(df["Data"])
+    for coluna in COLUNAS_CATEGORICAS:
+        if coluna in df.columns:
+            df[coluna] = df[coluna].astype("category")
+
+    df["Valor_Centavos"] = para_centavos(df["Valor"])
+    return df.drop(columns="Valor")
+
+def para_centavos(valores):
+    """Converte valores em reais (números ou texto) para centavos inteiros, arredondando."""
+    reais = pd.to_numeric(valores, errors="coerce").fillna(0)
+    return (reais * 100).round().astype("int64")
+
+def para_reais(centavos):
+    """Converte centavos inteiros de volta para reais, apenas para exibição."""
+    return centavos / 100
+
+# --- Leitura em Massa via CSV ---
+
+# Colunas de texto das tabelas: forçamos texto para não perder zeros à esquerda
+# (ex.: "Detalhes" com número de documento) nem converter códigos em números
+COLUNAS_TEXTO = ["Nome", "Endereço", "Cliente_Nome", "Cliente_CPF", "Detalhes", "Categoria", "Descrição", "Data", "Itens", "Item", "Subcategoria"]
+
+# Colunas JSON que chegam como texto no CSV
+COLUNAS_JSON = ["Itens"]
+
+def ler_tabela(consulta):
+    """
+    Executa uma leitura em massa pedindo ao PostgREST o resultado em text/csv
+    e monta o DataFrame direto das colunas, sem decodificar JSON nem criar um dict por linha.
+    Recebe o query builder já com select/filtros (sem o .execute()).
+    """
+    # Clientes sem suporte a CSV seguem pelo caminho JSON
+    if not hasattr(consulta, "csv"):
+        return pd.DataFrame(consulta.execute().data)
+
+    texto = consulta.csv().execute().data
+    if not texto:
+        return pd.DataFrame()
+
+    # Leitor CSV do Arrow (já instalado junto com o Streamlit), com os tipos das colunas de texto fixados
+    tabela = pa_csv.read_csv(
+        io.BytesIO(texto.encode("utf-8")),
+        convert_options=pa_csv.ConvertOptions(
+            column_types={coluna: pa.string() for coluna in COLUNAS_TEXTO},
+            strings_can_be_null=True,
+        ),
+    )
+    df = tabela.to_pandas()
+
+    for coluna in COLUNAS_JSON:
+        if coluna in df.columns:
+            df[coluna] = df[coluna].map(lambda valor: json.loads(valor) if isinstance(valor, str) else None)
+
+    return df
+
+# --- Consultas com Cache Compartilhado ---
+# Resultados guardados no cache entre processos (ver cache_compartilhado.py)
+# e invalidados pelas funções de gravação de utils.py.
+
+@cache_compartilhado.memoizar(tabelas=["obras"])
+def consultar_obras(supabase):
+    """Lista de obras com ID e Nome (para selectboxes e para o índice de nomes)."""
+    return supabase.table("obras").select("id, Nome").execute().data
+
+@cache_compartilhado.memoizar(tabelas=["obras"])
+def consultar_obra(supabase, obra_id):
+    """Todos os campos de uma obra."""
+    return supabase.table("obras").select("*").eq("id", obra_id).execute().data[0]
+
+# Colunas lidas de movimentacoes: sem o JSON legado "Itens" (os itens ficam em movimentacao_itens)
+COLUNAS_MOVIMENTACOES = "id, obra_id, Data, Detalhes, Valor, Categoria, Descrição"
+
+def filtrar_periodo(consulta, inicio=None, fim=None):
+    """Aplica o período (datas inclusive) como filtros gte/lte em "Data", resolvidos no banco."""
+    if inicio is not None:
+        consulta = consulta.gte("Data", inicio.isoformat())
+    if fim is not None:
+        consulta = consulta.lte("Data", fim.isoformat())
+    return consulta
+
+@cache_compartilhado.memoizar(tabelas=["movimentacoes"])
+def consultar_movimentacoes(supabase, obra_id=None, categoria=None, inicio=None, fim=None):
+    """
+    Movimentações (opcionalmente de uma obra, categoria e/ou período) já no formato compacto.
+    O período é filtrado no banco: só as linhas dele são transferidas.
+    """
+    consulta = supabase.table("movimentacoes").select(COLUNAS_MOVIMENTACOES)
+    if obra_id is not None:
+        consulta = consulta.eq("obra_id", obra_id)
+    if categoria is not None:
+        consulta = consulta.eq("Categoria", categoria)
+    consulta = filtrar_periodo(consulta, inicio, fim)
+    return carregar_movimentacoes(ler_tabela(consulta))
+
+@cache_compartilhado.memoizar(tabelas=["movimentacoes"])
+def consultar_lancamentos_manuais(supabase, obra_ids, inicio=None, fim=None):
+    """
+    Movimentações lançadas à mão (sem "Detalhes" do extrato) das obras e do período,
+    no formato compacto: as candidatas da conciliação do extrato (ver conciliacao.py).
+    """
+    consulta = (
+        supabase.table("movimentacoes")
+        .select(COLUNAS_MOVIMENTACOES)
+        .is_("Detalhes", "null")
+        .in_("obra_id", list(obra_ids))
+    )
+    consulta = filtrar_periodo(consulta, inicio, fim)
+    return carregar_movimentacoes(ler_tabela(consulta))
+
+@cache_compartilhado.memoizar(tabelas=["movimentacao_itens"])
+def consultar_itens(supabase, movimentacao_id):
+    """Itens de uma compra de Material, na ordem em que foram lançados."""
+    return (
+        supabase.table("movimentacao_itens")
+        .select("Item, Subcategoria, Quantidade, Valor")
+        .eq("movimentacao_id", movimentacao_id)
+        .order("id")
+        .execute()
+        .data
+    )
+
+@cache_compartilhado.memoizar(tabelas=["movimentacoes", "movimentacao_itens"])
+def consultar_itens_material(supabase, subcategoria=None):
+    """
+    Itens de material, um por linha, com a obra e a data da compra (view materiais_itens).
+    Filtrar pela subcategoria usa o índice de movimentacao_itens e só traz as linhas dela.
+    """
+    consulta = supabase.table("materiais_itens").select("*")
+    if subcategoria is not None:
+        consulta = consulta.eq("Subcategoria", subcategoria)
+    df = carregar_movimentacoes(ler_tabela(consulta))
+    if df.empty:
+        return df
+
+    df[["Item", "Subcategoria"]] = df[["Item", "Subcategoria"]].astype("category")
+    df["Quantidade"] = pd.to_numeric(df["Quantidade"])
+    return df
+
+@cache_compartilhado.memoizar(tabelas=["movimentacoes", "movimentacao_itens"])
+def materiais_por_obra(supabase, subcategoria):
+    """Quantidade, gasto (em centavos) e nº de itens por obra na subcategoria, agregados no banco."""
+    df = ler_tabela(supabase.table("materiais_por_obra").select("*").eq("Subcategoria", subcategoria))
+    if df.empty:
+        return df
+
+    df["Quantidade"] = pd.to_numeric(df["Quantidade"]).fillna(0)
+    df["Valor_Centavos"] = para_centavos(df.pop("Valor"))
+    return df
+
+@cache_compartilhado.memoizar(tabelas=["movimentacoes", "movimentacao_itens"])
+def buscar_movimentacoes(supabase, termo, pagina=0, por_pagina=25):
+    """
+    Busca textual em Detalhes, Descrição e nos itens de material de todas as obras
+    (função buscar_movimentacoes no banco, com índices de trigramas).
+    Retorna (df, total): a página pedida, da mais para a menos relevante, no formato
+    compacto, e quantas movimentações casaram com o termo no total.
+    """
+    resposta = supabase.rpc(
+        "buscar_movimentacoes",
+        {"termo": termo, "limite": por_pagina, "deslocamento": pagina * por_pagina},
+    ).execute()
+    df = carregar_movimentacoes(resposta.data)
+    if df.empty:
+        return df, 0
+
+    total = int(df.pop("total").iloc[0])
+    df["Itens"] = df["Itens"].astype("string")
+    return df, total
+
+# Caracteres com significado no Markdown do Streamlit (escapados no texto destacado)
+_MARKDOWN = re.compile(r"([\\`*_{}\[\]()#+\-.!|$~<>:])")
+
+def _escapar_markdown(texto):
+    return _MARKDOWN.sub(r"\\\1", texto)
+
+def destacar(texto, termo):
+    """
+    Markdown do texto com as ocorrências do termo destacadas,
+    ignorando acentos e maiúsculas como a busca do banco.
+    """
+    if not isinstance(texto, str) or not texto:
+        return ""
+
+    # Normalizado caractere a caractere, para as posições baterem com as do texto original
+    normalizado = "".join((normalizar_nome(c) or c)[:1].lower() for c in texto)
+    alvo = normalizar_nome(termo).lower()
+    if not alvo:
+        return _escapar_markdown(texto)
+
+    partes, inicio = [], 0
+    posicao = normalizado.find(alvo)
+    while posicao >= 0:
+        fim = posicao + len(alvo)
+        partes.append(_escapar_markdown(texto[inicio:posicao]))
+        partes.append(f"**{_escapar_markdown(texto[posicao:fim])}**")
+        inicio = fim
+        posicao = normalizado.find(alvo, inicio)
+    partes.append(_escapar_markdown(texto[inicio:]))
+    return "".join(partes)
+
+@cache_compartilhado.memoizar(tabelas=["obras", "movimentacoes"])
+def resumo_obras(supabase, inicio=None, fim=None):
+    """
+    Agregados do painel da empresa, de todo o histórico ou do período (datas inclusive).
+    Retorna (df_resumo, gastos_por_categoria): orçamento, gasto, saldo e % por obra,
+    e o total gasto por categoria (valores em reais).
+    """
+    # Busca Obras e Movimentações em paralelo (as consultas são independentes)
+    tab_obras, df_mov = buscar_em_paralelo(
+        supabase.table("obras").select("*"),
+        lambda: consultar_movimentacoes(supabase, inicio=inicio, fim=fim),
+    )
+    df_obras = pd.DataFrame(tab_obras.data)
+    if df_obras.empty:
+        return df_obras, pd.DataFrame(columns=["Categoria", "Valor"])
+
+    # Garantir tipos numéricos
+    df_obras["Orçamento"] = pd.to_numeric(df_obras["Orçamento"], errors="coerce").fillna(0)
+
+    if not df_mov.empty:
+        # Somas em centavos inteiros (sem acúmulo de arredondamento), convertidas para reais no final
+        # Agrupar gastos por Obra
+        gastos_por_obra = df_mov.groupby("obra_id", observed=True)["Valor_Centavos"].sum().reset_index()
+        gastos_por_obra["obra_id"] = gastos_por_obra["obra_id"].astype(df_obras["id"].dtype)
+        gastos_por_obra["total_gasto"] = para_reais(gastos_por_obra.pop("Valor_Centavos"))
+
+        # Agrupar gastos por Categoria (Visão Empresa)
+        gastos_por_categoria = df_mov.groupby("Categoria", observed=True)["Valor_Centavos"].sum().reset_index()
+        gastos_por_categoria["Valor"] = para_reais(gastos_por_categoria.pop("Valor_Centavos"))
+        gastos_por_categoria["Categoria"] = gastos_por_categoria["Categoria"].astype("string")
+    else:
+        # Se não tiver gastos ainda, cria dataframes vazios com as colunas certas
+        gastos_por_obra = pd.DataFrame(columns=["obra_id", "total_gasto"])
+        gastos_por_categoria = pd.DataFrame(columns=["Categoria", "Valor"])
+
+    # Juntar (Merge) os dados das obras com os gastos
+    # Left Join: Queremos todas as obras, mesmo as que não têm gastos
+    df_resumo = pd.merge(df_obras, gastos_por_obra, left_on="id", right_on="obra_id", how="left")
+
+    # Preencher obras sem gastos com 0
+    df_resumo["total_gasto"] = df_resumo["total_gasto"].fillna(0)
+
+    # Calcular Saldo e Percentual
+    df_resumo["saldo"] = df_resumo["Orçamento"] - df_resumo["total_gasto"]
+    df_resumo["percentual_uso"] = (df_resumo["total_gasto"] / df_resumo["Orçamento"]) * 100
+    # Evitar divisão por zero ou infinitos
+    df_resumo["percentual_uso"] = df_resumo["percentual_uso"].fillna(0)
+
+    return df_resumo, gastos_por_categoria
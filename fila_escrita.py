@@ -0,0 +1,385 @@
+import streamlit as st
+import threading
+import logging
+import sqlite3
+import json
+import time
+import uuid
+import os
+
+import cliente_servico
+
+# --- Fila de Gravação (write-behind) ---
+# Os lançamentos são gravados primeiro em um diário local (SQLite, com fsync) e a
+# tela volta na hora; uma thread do processo descarrega o diário no Supabase em
+# upserts agrupados. Se a conexão cair, as linhas continuam no diário e são
+# reenviadas com espera crescente, em vez de se perderem com um erro na tela.
+# Réplicas que apontam para o mesmo arquivo dividem a fila: cada lote é reservado
+# por um único processo. A gravação usa o cliente de serviço (cliente_servico.py),
+# e não o da sessão que enfileirou: as linhas de todos os usuários são gravadas
+# mesmo depois que cada um sai do app.
+
+CAMINHO_PADRAO = os.path.join(os.path.dirname(__file__), ".cache", "mino_fila.sqlite3")
+
+# Máximo de linhas em cada upsert do descarregamento
+TAMANHO_LOTE = 500
+
+# Intervalo entre as varreduras da fila (segundos)
+INTERVALO = 1.0
+
+# Tentativas antes de uma linha ser marcada como falha (erros de rede/servidor/credencial)
+MAX_TENTATIVAS = 8
+
+# Linhas "gravando" há mais tempo que isso são de um processo que morreu: voltam para a fila
+PRAZO_GRAVANDO = 120
+
+# Por quanto tempo o andamento de um lote fica disponível para consulta (segundos)
+TTL_LOTE = 24 * 60 * 60
+
+_local = threading.local()
+_lock = threading.Lock()
+_acordar = threading.Event()
+_flusher = None
+
+# Último erro do cliente de serviço (secret ausente/inválido, credencial recusada): mostrado
+# no indicador da barra lateral até uma gravação dar certo
+_erro_cliente = None
+
+logger = logging.getLogger(__name__)
+
+def _caminho():
+    return os.environ.get("MINO_FILA_PATH", CAMINHO_PADRAO)
+
+def _conexao():
+    # Uma conexão por thread (e por arquivo), como no cache_compartilhado
+    caminho = _caminho()
+    conexao = getattr(_local, "conexao", None)
+    if conexao is None or _local.caminho != caminho:
+        os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+        conexao = sqlite3.connect(caminho, timeout=30, isolation_level=None)
+        conexao.execute("PRAGMA journal_mode=WAL")
+        # O diário é a única cópia do lançamento até ele chegar ao banco: fsync a cada commit
+        conexao.execute("PRAGMA synchronous=FULL")
+        conexao.execute("""
+            CREATE TABLE IF NOT EXISTS fila (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                lote TEXT NOT NULL,
+                linha TEXT NOT NULL,
+                estado TEXT NOT NULL DEFAULT 'pendente',
+                tentativas INTEGER NOT NULL DEFAULT 0,
+                proxima_tentativa REAL NOT NULL DEFAULT 0,
+                erro TEXT,
+                criada_em REAL NOT NULL,
+                atualizada_em REAL NOT NULL
+            )
+        """)
+        conexao.execute("CREATE INDEX IF NOT EXISTS fila_estado ON fila (estado, proxima_tentativa)")
+        conexao.execute("CREATE INDEX IF NOT EXISTS fila_lote ON fila (lote)")
+        # Linhas de um lote que falhou por erro de dados: reenviadas uma a uma para achar a culpada
+        colunas = {coluna for _, coluna, *_ in conexao.execute("PRAGMA table_info(fila)")}
+        if "isolada" not in colunas:
+            conexao.execute("ALTER TABLE fila ADD COLUMN isolada INTEGER NOT NULL DEFAULT 0")
+        # Andamento de cada lote (as linhas saem da fila quando são gravadas)
+        conexao.execute("""
+            CREATE TABLE IF NOT EXISTS lotes (
+                lote TEXT PRIMARY KEY,
+                total INTEGER NOT NULL,
+                gravadas INTEGER NOT NULL DEFAULT 0,
+                duplicadas INTEGER NOT NULL DEFAULT 0,
+                criado_em REAL NOT NULL
+            )
+        """)
+        _local.conexao = conexao
+        _local.caminho = caminho
+    return conexao
+
+def _json_padrao(valor):
+    # Tipos do numpy/pandas que sobram nos dicts montados a partir de DataFrames
+    return valor.item() if hasattr(valor, "item") else str(valor)
+
+# --- Enfileiramento ---
+
+def enfileirar(lista_envio):
+    """
+    Registra as movimentações no diário e retorna imediatamente (o ID do lote).
+    A gravação no Supabase é feita em segundo plano por descarregar();
+    o andamento do lote pode ser acompanhado com andamento().
+    """
+    lote = uuid.uuid4().hex
+    agora = time.time()
+    conexao = _conexao()
+    conexao.execute("BEGIN IMMEDIATE")
+    conexao.executemany(
+        "INSERT INTO fila (lote, linha, criada_em, atualizada_em) VALUES (?, ?, ?, ?)",
+        [(lote, json.dumps(linha, ensure_ascii=False, default=_json_padrao), agora, agora) for linha in lista_envio],
+    )
+    conexao.execute("INSERT INTO lotes (lote, total, criado_em) VALUES (?, ?, ?)", (lote, len(lista_envio), agora))
+    conexao.execute("DELETE FROM lotes WHERE criado_em < ?", (agora - TTL_LOTE,))
+    conexao.execute("COMMIT")
+
+    # Mantém o indicador da barra lateral atualizando até a fila esvaziar
+    st.session_state["fila_escrita_ativa"] = True
+
+    iniciar()
+    _acordar.set()
+    return lote
+
+# --- Descarregamento ---
+
+def _reservar(limite):
+    """Marca até 'limite' linhas prontas como "gravando" e as retorna (id, lote, linha, isolada)."""
+    agora = time.time()
+    conexao = _conexao()
+    conexao.execute("BEGIN IMMEDIATE")
+    try:
+        conexao.execute(
+            "UPDATE fila SET estado = 'pendente' WHERE estado = 'gravando' AND atualizada_em < ?",
+            (agora - PRAZO_GRAVANDO,),
+        )
+        linhas = conexao.execute("""
+            UPDATE fila SET estado = 'gravando', atualizada_em = ?
+            WHERE id IN (
+                SELECT id FROM fila
+                WHERE estado = 'pendente' AND proxima_tentativa <= ?
+                ORDER BY id LIMIT ?
+            )
+            RETURNING id, lote, linha, isolada
+        """, (agora, agora, limite)).fetchall()
+        conexao.execute("COMMIT")
+    except Exception:
+        conexao.execute("ROLLBACK")
+        raise
+    return sorted(linhas)
+
+# Permissão negada (42501) e erros de autenticação do PostgREST (PGRST3xx, ex.: JWT expirado)
+# dependem da credencial, não da linha: podem dar certo em uma nova tentativa
+CODIGOS_AUTENTICACAO = ("42501", "PGRST3")
+
+def _erro_permanente(erro):
+    # Erros de dados/constraint/esquema do Postgres (classes 22, 23, 42) e do PostgREST (PGRST2xx):
+    # reenviar a mesma linha não vai adiantar
+    codigo = str(getattr(erro, "code", "") or "")
+    if codigo.startswith(CODIGOS_AUTENTICACAO):
+        return False
+    return codigo.startswith(("22", "23", "42", "PGRST2"))
+
+def _erro_credencial(erro):
+    return str(getattr(erro, "code", "") or "").startswith(CODIGOS_AUTENTICACAO)
+
+def _registrar_falha(ids, erro, individual, permanente=None):
+    agora = time.time()
+    mensagem = getattr(erro, "message", None) or str(erro)
+    if permanente is None:
+        permanente = _erro_permanente(erro)
+    conexao = _conexao()
+    for id_, tentativas in conexao.execute(
+        f"SELECT id, tentativas FROM fila WHERE id IN ({', '.join('?' * len(ids))})", ids
+    ).fetchall():
+        tentativas += 1
+        # Esgotadas as tentativas, a linha falha mesmo dentro de um lote: o usuário vê o erro
+        # no indicador (e pode reenviar) em vez de ela ficar "aguardando gravação" para sempre
+        if (individual and permanente) or tentativas >= MAX_TENTATIVAS:
+            conexao.execute(
+                "UPDATE fila SET estado = 'falhou', tentativas = ?, erro = ?, atualizada_em = ? WHERE id = ?",
+                (tentativas, mensagem, agora, id_),
+            )
+        elif permanente:
+            # Erro de dados em um lote: as linhas dele são reenviadas uma a uma, já na próxima
+            # varredura, para só a linha com problema falhar
+            conexao.execute(
+                "UPDATE fila SET estado = 'pendente', isolada = 1, tentativas = ?, erro = ?, proxima_tentativa = ?, atualizada_em = ? WHERE id = ?",
+                (tentativas, mensagem, agora, agora, id_),
+            )
+        else:
+            # Rede, servidor ou credencial: o lote inteiro espera e volta junto (sem se dividir em linhas)
+            conexao.execute(
+                "UPDATE fila SET estado = 'pendente', tentativas = ?, erro = ?, proxima_tentativa = ?, atualizada_em = ? WHERE id = ?",
+                (tentativas, mensagem, agora + min(60, 2 ** (tentativas - 1)), agora, id_),
+            )
+
+def descarregar(supabase):
+    """
+    Grava no Supabase um lote de linhas prontas da fila.
+    As linhas de cada lote vão juntas em um único upsert (inclusive as que voltaram
+    de uma falha de rede); só as isoladas por um erro de dados vão uma a uma.
+    Retorna quantas linhas foram processadas (0 quando não há nada pronto).
+    """
+    import utils
+
+    reservadas = _reservar(TAMANHO_LOTE)
+    if not reservadas:
+        return 0
+
+    grupos = {}
+    for id_, lote, linha, isolada in reservadas:
+        grupos.setdefault((lote, id_ if isolada else None), []).append((id_, linha))
+
+    conexao = _conexao()
+    for (lote, isolada), grupo in grupos.items():
+        ids = [id_ for id_, _ in grupo]
+        try:
+            inseridas = utils.gravar_movimentacoes(supabase, [json.loads(linha) for _, linha in grupo])
+        except Exception as e:
+            if _erro_credencial(e):
+                _definir_erro_cliente(e)
+            _registrar_falha(ids, e, individual=isolada is not None)
+        else:
+            _definir_erro_cliente(None)
+            conexao.execute("BEGIN IMMEDIATE")
+            conexao.execute(f"DELETE FROM fila WHERE id IN ({', '.join('?' * len(ids))})", ids)
+            conexao.execute(
+                "UPDATE lotes SET gravadas = gravadas + ?, duplicadas = duplicadas + ? WHERE lote = ?",
+                (inseridas, len(grupo) - inseridas, lote),
+            )
+            conexao.execute("COMMIT")
+
+    return len(reservadas)
+
+def _definir_erro_cliente(erro):
+    global _erro_cliente
+    mensagem = None if erro is None else (getattr(erro, "message", None) or str(erro))
+    if mensagem and mensagem != _erro_cliente:
+        logger.error("Fila de gravação: cliente de serviço com erro: %s", mensagem)
+    _erro_cliente = mensagem
+
+def _falhar_prontas(erro):
+    """Sem cliente de serviço não há o que tentar: as linhas prontas falham já, com o motivo."""
+    while True:
+        reservadas = _reservar(TAMANHO_LOTE)
+        if not reservadas:
+            return
+        _registrar_falha([id_ for id_, *_ in reservadas], erro, individual=True, permanente=True)
+
+def _executar():
+    while True:
+        _acordar.wait(INTERVALO)
+        _acordar.clear()
+        try:
+            try:
+                supabase = cliente_servico.obter()
+            except Exception as e:
+                # Secret ausente ou inválido: as linhas falham (com o erro no indicador, e o
+                # botão Reenviar) em vez de ficarem na fila sem aviso
+                _definir_erro_cliente(e)
+                _falhar_prontas(e)
+                continue
+            while descarregar(supabase):
+                pass
+        except Exception:
+            # Falha no próprio diário (ex.: disco): tenta de novo na próxima varredura
+            logger.exception("Fila de gravação: falha ao descarregar o diário")
+            time.sleep(INTERVALO)
+
+def erro_cliente():
+    """O erro que impede as gravações (configuração ou credencial do cliente de serviço), ou None."""
+    return cliente_servico.erro_configuracao() or _erro_cliente
+
+def iniciar():
+    """
+    Garante a thread de descarregamento deste processo.
+    Chamado pelo app.py após o login, para que linhas que ficaram no diário
+    (ex.: o servidor reiniciou) sejam gravadas mesmo sem novos lançamentos.
+    Retorna o erro de configuração do cliente de serviço (None se estiver ok).
+    """
+    global _flusher
+    erro = cliente_servico.erro_configuracao()
+    if erro:
+        _definir_erro_cliente(RuntimeError(erro))
+    with _lock:
+        if _flusher is None or not _flusher.is_alive():
+            _flusher = threading.Thread(target=_executar, name="mino-fila-escrita", daemon=True)
+            _flusher.start()
+    return erro
+
+# --- Consulta e Manutenção ---
+
+def andamento(lote):
+    """
+    Andamento de um lote enfileirado (ou None se ele não existir mais): total, gravadas,
+    duplicadas, pendentes, falhas, erro (o último, se houver) e criado_em (timestamp).
+    """
+    conexao = _conexao()
+    registro = conexao.execute(
+        "SELECT total, gravadas, duplicadas, criado_em FROM lotes WHERE lote = ?", (lote,)
+    ).fetchone()
+    if registro is None:
+        return None
+
+    total, gravadas, duplicadas, criado_em = registro
+    contagem = dict(conexao.execute(
+        "SELECT estado, COUNT(*) FROM fila WHERE lote = ? GROUP BY estado", (lote,)
+    ).fetchall())
+    erro = conexao.execute(
+        "SELECT erro FROM fila WHERE lote = ? AND erro IS NOT NULL ORDER BY atualizada_em DESC LIMIT 1", (lote,)
+    ).fetchone()
+    return {
+        "total": total,
+        "gravadas": gravadas,
+        "duplicadas": duplicadas,
+        "pendentes": contagem.get("pendente", 0) + contagem.get("gravando", 0),
+        "falhas": contagem.get("falhou", 0),
+        "erro": erro[0] if erro else None,
+        "criado_em": criado_em,
+    }
+
+def contar():
+    """Quantas linhas estão pendentes (incluindo as em gravação) e quantas falharam."""
+    contagem = dict(_conexao().execute("SELECT estado, COUNT(*) FROM fila GROUP BY estado").fetchall())
+    return {
+        "pendentes": contagem.get("pendente", 0) + contagem.get("gravando", 0),
+        "falhas": contagem.get("falhou", 0),
+    }
+
+def listar_falhas():
+    return [
+        dict(json.loads(linha), id_fila=id_, erro=erro, tentativas=tentativas)
+        for id_, linha, erro, tentativas in _conexao().execute(
+            "SELECT id, linha, erro, tentativas FROM fila WHERE estado = 'falhou' ORDER BY id"
+        ).fetchall()
+    ]
+
+def reenviar_falhas():
+    _conexao().execute(
+        "UPDATE fila SET estado = 'pendente', tentativas = 0, proxima_tentativa = 0, erro = NULL WHERE estado = 'falhou'"
+    )
+    _acordar.set()
+
+def descartar_falhas():
+    _conexao().execute("DELETE FROM fila WHERE estado = 'falhou'")
+
+# --- Indicador na Barra Lateral ---
+
+def indicador():
+    """Mostra na barra lateral as gravações pendentes e as que falharam (se houver)."""
+    ativa = st.session_state.get("fila_escrita_ativa", False) or any(contar().values())
+
+    @st.fragment(run_every=2 if ativa else None)
+    def _indicador():
+        erro = erro_cliente()
+        if erro:
+            st.error(f":material/cloud_off: Gravações paradas: {erro}")
+
+        contagem = contar()
+        if contagem["pendentes"]:
+            st.caption(f":material/sync: {contagem['pendentes']} lançamento(s) aguardando gravação")
+        elif not contagem["falhas"]:
+            st.session_state["fila_escrita_ativa"] = False
+
+        if contagem["falhas"]:
+            with st.popover(f":material/error: {contagem['falhas']} gravação(ões) com falha", width="stretch"):
+                falhas = listar_falhas()
+                st.dataframe(
+                    [{c: f.get(c) for c in ("Data", "Descrição", "Valor", "Categoria", "erro")} for f in falhas],
+                    hide_index=True,
+                )
+                col1, col2 = st.columns(2)
+                if col1.button("Reenviar", key="fila_reenviar", width="stretch"):
+                    reenviar_falhas()
+                    st.session_state["fila_escrita_ativa"] = True
+                    st.rerun(scope="fragment")
+                if col2.button("Descartar", key="fila_descartar", width="stretch"):
+                    descartar_falhas()
+                    st.rerun(scope="fragment")
+
+    with st.sidebar:
+        _indicador()
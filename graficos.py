@@ -0,0 +1,77 @@
+import streamlit as st
+
+# O plotly é importado só quando um gráfico é de fato construído:
+# páginas sem gráfico (e a tela de login) não pagam pela importação.
+
+# --- Tema dos Gráficos ---
+
+def _plotly_express():
+    """Importa o plotly.express, registrando o tema da aplicação na primeira chamada."""
+    import plotly.graph_objects as go
+    import plotly.express as px
+    import plotly.io as pio
+
+    if "mino" not in pio.templates:
+        # Fundo e legenda transparentes para a marca d'água aparecer atrás dos gráficos
+        pio.templates["mino"] = go.layout.Template(
+            layout=dict(
+                plot_bgcolor="rgba(0, 0, 0, 0)",
+                paper_bgcolor="rgba(0, 0, 0, 0)",
+                legend=dict(bgcolor="rgba(0, 0, 0, 0)"),
+            )
+        )
+        pio.templates.default = "plotly+mino"
+    return px
+
+def _aplicar_tema(fig):
+    import plotly.io as pio
+
+    # O tema do Streamlit substitui o template da figura no navegador,
+    # então copiamos o layout do tema para a própria figura
+    fig.update_layout(pio.templates["mino"].layout)
+    return fig
+
+# --- Cache de Figuras ---
+# As figuras ficam em cache pelo hash dos dados recebidos: enquanto os agregados
+# não mudarem, os reruns não reconstroem a figura pelo plotly.express.
+# Passe apenas as colunas usadas no gráfico, para o hash ser barato.
+# st.cache_data e não cache_resource: o go.Figure é mutável, e o cache_data entrega a
+# cada chamada uma cópia própria (desserializada), então uma sessão que altere a figura
+# não muda a das outras. A cópia custa bem menos que montar a figura de novo.
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def barras_orcamento(df_resumo):
+    """Comparativo Orçamento x Gasto por obra (espera as colunas Nome, Orçamento e total_gasto)."""
+    px = _plotly_express()
+    fig = px.bar(
+        df_resumo,
+        x="Nome",
+        y=["Orçamento", "total_gasto"],
+        barmode="group",
+        title="Comparativo Financeiro por Obra",
+        labels={"value": "Valor (R$)", "Nome": "Obra", "variable": "Tipo"},
+        color_discrete_map={"Orçamento": "#2E86C1", "total_gasto": "#E74C3C"} # Azul e Vermelho
+    )
+    # Ajuste de nomes na legenda
+    new_names = {"Orçamento": "Orçamento Total", "total_gasto": "Já Gasto"}
+    fig.for_each_trace(lambda t: t.update(name = new_names[t.name]))
+    return _aplicar_tema(fig)
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def pizza(df, valores, nomes, titulo, buraco=None):
+    """Gráfico de pizza (ou rosca, se 'buraco' for informado)."""
+    px = _plotly_express()
+    fig = px.pie(df, values=valores, names=nomes, title=titulo, hole=buraco)
+    return _aplicar_tema(fig)
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def barras(df, x, y, titulo, cor=None, texto_auto=False):
+    px = _plotly_express()
+    fig = px.bar(df, x=x, y=y, color=cor, title=titulo, text_auto=texto_auto)
+    return _aplicar_tema(fig)
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def dispersao(df, x, y, cor, tamanho, titulo, hover_data=None):
+    px = _plotly_express()
+    fig = px.scatter(df, x=x, y=y, color=cor, size=tamanho, title=titulo, hover_data=hover_data)
+    return _aplicar_tema(fig)
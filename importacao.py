@@ -0,0 +1,210 @@
+import streamlit as st
+import pandas as pd
+import datetime
+import hashlib
+import io
+import os
+
+from concurrent.futures import ThreadPoolExecutor
+
+import dados
+import fila_escrita
+
+# --- Importações em Segundo Plano ---
+
+ESTADOS = {
+    "na_fila": "Na fila",
+    "executando": "Em andamento",
+    "concluida": "Concluída",
+    "falhou": "Falhou",
+}
+
+# As linhas do extrato vão para o diário da fila de gravação (fila_escrita.py), que as grava
+# em upserts agrupados e as reenvia se a conexão cair: uma importação enviada não se perde
+# com a queda do servidor ou do banco. O andamento é o do lote no diário, que qualquer
+# réplica que use o mesmo arquivo consegue mostrar.
+
+def enviar_importacao(lista_envio):
+    """
+    Enfileira a gravação das movimentações e retorna o ID da tarefa (o lote da fila),
+    que também fica guardado na sessão para acompanhamento.
+    """
+    tarefa_id = fila_escrita.enfileirar(lista_envio)
+    st.session_state.setdefault("importacoes", []).append(tarefa_id)
+    return tarefa_id
+
+def consultar_importacao(tarefa_id):
+    """Retorna o estado atual da tarefa (ou None se ela não existir mais)."""
+    lote = fila_escrita.andamento(tarefa_id)
+    if lote is None:
+        return None
+
+    processadas = lote["gravadas"] + lote["duplicadas"]
+    if lote["pendentes"]:
+        estado = "executando" if processadas or lote["falhas"] else "na_fila"
+    elif lote["falhas"]:
+        estado = "falhou"
+    else:
+        estado = "concluida"
+
+    return {
+        "id": tarefa_id,
+        "estado": estado,
+        "total": lote["total"],
+        "gravadas": lote["gravadas"],
+        "duplicadas": lote["duplicadas"],
+        "falhas": lote["falhas"],
+        "erro": lote["erro"],
+        "criada_em": datetime.datetime.fromtimestamp(lote["criado_em"]),
+    }
+
+def painel_importacoes():
+    """Mostra o andamento das importações desta sessão, atualizando enquanto houver tarefas ativas."""
+    tarefas = [consultar_importacao(t) for t in st.session_state.get("importacoes", [])]
+    tarefas = [t for t in tarefas if t is not None]
+    if not tarefas:
+        return
+
+    ativas = any(t["estado"] in ("na_fila", "executando") for t in tarefas)
+
+    @st.fragment(run_every=1 if ativas else None)
+    def _painel():
+        with st.container(border=True):
+            st.markdown("**Importações**")
+            ainda_ativas = False
+            for tarefa_id in st.session_state.get("importacoes", []):
+                tarefa = consultar_importacao(tarefa_id)
+                if tarefa is None:
+                    continue
+                ainda_ativas = ainda_ativas or tarefa["estado"] in ("na_fila", "executando")
+
+                processadas = tarefa["gravadas"] + tarefa["duplicadas"]
+                rotulo = (
+                    f"{tarefa['criada_em']:%H:%M:%S} · {ESTADOS[tarefa['estado']]} · "
+                    f"{tarefa['gravadas']} gravadas, {tarefa['duplicadas']} duplicadas de {tarefa['total']}"
+                )
+                st.progress(processadas / tarefa["total"] if tarefa["total"] else 1.0, text=rotulo)
+
+                if tarefa["estado"] == "falhou":
+                    st.error(f"{tarefa['falhas']} linha(s) não foram gravadas: {tarefa['erro']}")
+
+        # O run_every só é reavaliado em um rerun completo: quando a última tarefa termina,
+        # roda o app inteiro para parar a atualização e mostrar as linhas gravadas no resto da página
+        if ativas and not ainda_ativas:
+            st.rerun(scope="app")
+
+    _painel()
+
+# --- Leitura do Extrato ---
+
+# Colunas obrigatórias da planilha do banco
+COLUNAS_ESPERADAS = ["Data", "Detalhes", "Valor"]
+
+def normalizar_extrato(conteudo, nome_arquivo=None):
+    """
+    Lê e normaliza o conteúdo (bytes) de uma planilha de extrato.
+    Função de módulo e sem estado, para poder rodar nas threads do pool de leitura.
+    """
+    df_raw = pd.read_excel(io.BytesIO(conteudo))
+
+    # Verifica se as colunas esperadas existem
+    df_cols = [c.lower() for c in df_raw.columns]
+    if not all(col.lower() in df_cols for col in COLUNAS_ESPERADAS):
+        origem = f"O arquivo '{nome_arquivo}'" if nome_arquivo else "O arquivo"
+        raise ValueError(f"{origem} precisa ter as colunas: {COLUNAS_ESPERADAS}. Colunas encontradas: {list(df_raw.columns)}")
+
+    # Remove linhas desnecessárias
+    df_extrato = df_raw.copy()[df_raw["Detalhes"] != " "]
+
+    # Coluna de Obra opcional na planilha (o nome é resolvido depois, pelo índice de obras)
+    coluna_obra = next((c for c in df_raw.columns if dados.normalizar_nome(c) == "OBRA"), None)
+    if coluna_obra is not None:
+        obras = df_extrato[coluna_obra].astype("string").str.strip().replace("", pd.NA)
+    else:
+        obras = pd.Series(dtype="string")
+
+    coluna_conta = next((c for c in df_raw.columns if dados.normalizar_nome(c) == "CONTA"), None)
+    if coluna_conta is not None:
+        contas = df_extrato[coluna_conta].astype("string").str.strip().replace("", pd.NA)
+    else:
+        contas = pd.Series(dtype="string")
+
+    # Remove colunas desnecessárias
+    # Formata as colunas
+    # Adiciona colunas vazias para Categoria e Descrição
+    df_extrato = pd.DataFrame({
+        "Data": pd.to_datetime(df_extrato["Data"], dayfirst=True).dt.date,
+        "Detalhes": df_extrato["Detalhes"].astype("string"),
+        "Obra": obras,
+        "Categoria": pd.Series(dtype="string"),
+        "Valor": df_extrato["Valor"].astype(str).str.replace(".", "", regex=False).str.replace(",", ".", regex=False).astype(float),
+        "Descrição": pd.Series(dtype="string"),
+    })
+
+    # Preenche Categoria automaticamente com "Depósito" para valores positivos
+    df_extrato.loc[df_extrato["Valor"] > 0, "Categoria"] = "Depósito"
+
+    # Transforma todos os valores em positivos
+    df_extrato.loc[:, "Valor"] = df_extrato["Valor"].abs()
+
+    # Arquivo de origem de cada linha (para o extrato de várias contas)
+    df_extrato["Arquivo"] = pd.Series(nome_arquivo, index=df_extrato.index, dtype="string")
+
+    # Conta de cada linha: a coluna de Conta opcional da planilha. A exportação padrão do
+    # banco (só Data, Detalhes e Valor) não diz a conta: fica vazia, e os arquivos sem
+    # conta são comparados entre si, como exportações sobrepostas da mesma conta
+    df_extrato["Conta"] = contas.reindex(df_extrato.index).fillna("").astype("string")
+
+    return df_extrato
+
+# Threads para normalizar vários extratos ao mesmo tempo. Não são processos: com "fork",
+# o filho copia o servidor do Streamlit no meio das threads dele (tornado, fila de gravação,
+# painel) e pode herdar um lock preso; com "spawn"/"forkserver", cada filho reexecuta o
+# __main__, que no Streamlit é o script da página. A leitura do openpyxl segura o GIL, então
+# o ganho fica na descompactação e na montagem das tabelas do pandas.
+def _pool_leitura(quantidade):
+    return ThreadPoolExecutor(
+        max_workers=min(quantidade, 4, os.cpu_count() or 1),
+        thread_name_prefix="mino-extrato",
+    )
+
+# Colunas que identificam a mesma linha de extrato em arquivos diferentes. A conta entra na
+# chave quando a planilha a informa: duas contas podem ter lançamentos idênticos (mesma
+# data, histórico e valor)
+CHAVE_LINHA = ["Conta", "Data", "Detalhes", "Valor", "Categoria"]
+
+def ler_extratos(arquivos):
+    """
+    Lê e normaliza as planilhas enviadas no st.file_uploader (accept_multiple_files),
+    em paralelo, e junta tudo em um único DataFrame com a coluna "Arquivo".
+    Linhas repetidas entre arquivos (exportações com períodos sobrepostos) aparecem uma vez
+    só. Com a coluna "Conta" na planilha, só se comparam arquivos da mesma conta.
+    Retorna (df_extrato, quantidade de duplicadas removidas).
+    O resultado fica em cache pelo hash dos conteúdos, então os reruns causados
+    pelas edições na tabela reaproveitam os extratos já processados.
+    """
+    conteudos = [arquivo.getvalue() for arquivo in arquivos]
+    nomes = [arquivo.name for arquivo in arquivos]
+    hashes = tuple(hashlib.sha256(conteudo).hexdigest() for conteudo in conteudos)
+    return _ler_extratos(hashes, tuple(nomes), _conteudos=conteudos)
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def _ler_extratos(hashes, nomes, _conteudos):
+    if len(_conteudos) == 1:
+        extratos = [normalizar_extrato(_conteudos[0], nomes[0])]
+    else:
+        with _pool_leitura(len(_conteudos)) as pool:
+            extratos = list(pool.map(normalizar_extrato, _conteudos, nomes))
+
+    # A conta só serve para a remoção das repetidas; não vai para a tabela da página
+    df = pd.concat(extratos, ignore_index=True)
+    if len(extratos) == 1:
+        return df.drop(columns="Conta"), 0
+
+    # Dentro de um arquivo, linhas iguais podem ser lançamentos legítimos (dois pagamentos
+    # idênticos no mesmo dia): numeramos as repetições por arquivo e só removemos a mesma
+    # ocorrência vinda de outro arquivo
+    chave = df[CHAVE_LINHA].astype("string").fillna("")
+    ocorrencia = chave.groupby([df["Arquivo"], *[chave[c] for c in CHAVE_LINHA]], dropna=False).cumcount()
+    duplicada = pd.concat([chave, ocorrencia.rename("ocorrencia")], axis=1).duplicated()
+    return df[~duplicada].drop(columns="Conta").reset_index(drop=True), int(duplicada.sum())
@@ -0,0 +1,199 @@
+import threading
+import time
+import sys
+
+import streamlit as st
+
+# O id da sessão e a lista das sessões conectadas só existem em módulos internos do Streamlit
+# (fora da API pública, testados até a 1.66): se mudarem, o acompanhamento é desligado e o
+# app segue sem ele, em vez de quebrar em todas as páginas
+try:
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    from streamlit.runtime import Runtime
+except ImportError:
+    get_script_run_ctx = None
+    Runtime = None
+
+# --- Memória das Sessões ---
+# Cada sessão do Streamlit guarda seus objetos em st.session_state, no processo do
+# servidor, enquanto a aba estiver aberta. Este módulo acompanha as sessões do
+# processo e mede quanto cada chave ocupa (relatorio(), usado na página de
+# Instrumentação). Os objetos de dados grandes das sessões paradas há muito tempo
+# são liberados.
+#
+# Cada sessão só mexe no próprio estado, de dentro do próprio run e pela API pública
+# (st.session_state): registrar() no início do run (chamado pelo app.py) aplica a
+# liberação pendente, e medir() no fim guarda o tamanho das chaves. A varredura das
+# sessões inativas só as marca; os objetos saem no próximo run de cada uma.
+
+# Sessão sem rerun há mais que isso é considerada inativa (segundos)
+INATIVIDADE = 15 * 60
+
+# Só objetos de dados (DataFrames, Series, arrays, bytes) acima deste tamanho são liberados
+LIMITE_BYTES = 1024 * 1024
+
+# Intervalo mínimo entre duas varreduras das sessões inativas (segundos)
+VARREDURA = 60
+
+# Nunca liberadas: conexão, login e cookies (pequenas, mas a sessão não funciona sem elas)
+PROTEGIDAS = {"supabase", "cookie_manager", "usuario_logado"}
+
+# Chaves que perdem o sentido sem a chave liberada (ex.: o modal de detalhamento sem as linhas)
+DEPENDENTES = {"df_selecionado": ["modal"]}
+
+_lock = threading.Lock()
+# {session_id: {"ultimo_acesso": float, "liberar": bool, "liberados": int,
+#               "chaves": {chave: (id do valor, tipo, bytes)}}}
+_sessoes = {}
+_ultima_varredura = 0.0
+
+def tamanho(valor, _profundidade=0):
+    """Tamanho aproximado do objeto em bytes (profundo para DataFrames, arrays e coleções)."""
+    uso = getattr(valor, "memory_usage", None)
+    if callable(uso) and hasattr(valor, "ndim"):
+        # DataFrame/Series: inclui o conteúdo das strings
+        total = uso(deep=True)
+        return int(total.sum() if hasattr(total, "sum") else total)
+    if hasattr(valor, "nbytes") and hasattr(valor, "dtype"):
+        return int(valor.nbytes)
+    if _profundidade < 4:
+        if isinstance(valor, dict):
+            return sys.getsizeof(valor) + sum(
+                tamanho(k, _profundidade + 1) + tamanho(v, _profundidade + 1) for k, v in valor.items()
+            )
+        if isinstance(valor, (list, tuple, set, frozenset)):
+            return sys.getsizeof(valor) + sum(tamanho(v, _profundidade + 1) for v in valor)
+    return sys.getsizeof(valor)
+
+def _liberavel(chave, valor):
+    if chave in PROTEGIDAS:
+        return False
+    dados = hasattr(valor, "memory_usage") or hasattr(valor, "nbytes") or isinstance(valor, (bytes, bytearray))
+    return dados and tamanho(valor) >= LIMITE_BYTES
+
+def _sessao_atual():
+    if get_script_run_ctx is None:
+        return None
+    contexto = get_script_run_ctx()
+    return getattr(contexto, "session_id", None)
+
+def registrar():
+    """
+    Marca a sessão atual como ativa (chamado no início de cada rerun), libera os objetos
+    grandes dela se a varredura a marcou e, no máximo a cada VARREDURA segundos,
+    marca as sessões inativas.
+    """
+    global _ultima_varredura
+
+    session_id = _sessao_atual()
+    if session_id is None:
+        return
+
+    agora = time.time()
+    with _lock:
+        sessao = _sessoes.get(session_id)
+        if sessao is None:
+            sessao = _sessoes[session_id] = {"liberar": False, "liberados": 0, "chaves": {}}
+        sessao["ultimo_acesso"] = agora
+        liberar, sessao["liberar"] = sessao["liberar"], False
+
+        varrer = agora - _ultima_varredura >= VARREDURA
+        if varrer:
+            _ultima_varredura = agora
+
+    if liberar:
+        liberados = _liberar_sessao_atual()
+        with _lock:
+            sessao["liberados"] += liberados
+    if varrer:
+        marcar_inativas(agora)
+
+def _liberar_sessao_atual():
+    # No run da própria sessão: nenhum outro script mexe neste estado ao mesmo tempo
+    total = 0
+    for chave, valor in st.session_state.to_dict().items():
+        if not _liberavel(chave, valor):
+            continue
+        total += tamanho(valor)
+        for removida in [chave] + DEPENDENTES.get(chave, []):
+            if removida in st.session_state:
+                del st.session_state[removida]
+    return total
+
+def _medir(anteriores):
+    # Mede de novo só as chaves cujo objeto mudou desde o último run (DataFrames grandes custam)
+    chaves = {}
+    for chave, valor in st.session_state.to_dict().items():
+        anterior = anteriores.get(chave)
+        if anterior is not None and anterior[0] == id(valor) and anterior[1] == type(valor).__name__:
+            chaves[chave] = anterior
+        else:
+            chaves[chave] = (id(valor), type(valor).__name__, tamanho(valor))
+    return chaves
+
+def medir():
+    """Guarda o tamanho das chaves da sessão atual (chamado no fim de cada rerun, pelo app.py)."""
+    session_id = _sessao_atual()
+    with _lock:
+        sessao = _sessoes.get(session_id)
+    if sessao is not None:
+        chaves = _medir(sessao["chaves"])
+        with _lock:
+            sessao["chaves"] = chaves
+
+def _encerrada(session_id):
+    # Sem o Runtime (ex.: AppTest) ou se a API interna mudar, não há como saber:
+    # a sessão continua acompanhada (só com os tamanhos, sem segurar o estado dela)
+    if Runtime is None:
+        return False
+    try:
+        return Runtime.exists() and not Runtime.instance().is_active_session(session_id)
+    except AttributeError:
+        return False
+
+def _sessoes_vivas():
+    # Deixa de acompanhar as sessões desconectadas ou encerradas
+    with _lock:
+        for session_id in [s for s in _sessoes if _encerrada(s)]:
+            del _sessoes[session_id]
+        return list(_sessoes.items())
+
+def marcar_inativas(agora=None, inatividade=None):
+    """
+    Marca as sessões sem rerun há mais de 'inatividade' segundos: os objetos de dados grandes
+    delas são liberados no próximo run de cada uma. Retorna quantas sessões foram marcadas.
+    """
+    agora = agora or time.time()
+    inatividade = INATIVIDADE if inatividade is None else inatividade
+    marcadas = 0
+    vivas = _sessoes_vivas()
+    with _lock:
+        for _, sessao in vivas:
+            if agora - sessao["ultimo_acesso"] >= inatividade and not sessao["liberar"]:
+                sessao["liberar"] = True
+                marcadas += 1
+    return marcadas
+
+def relatorio():
+    """
+    Uma linha por chave de cada sessão viva deste processo, com os tamanhos medidos no fim
+    do último run dela (a sessão atual é medida agora): sessao, inativa_ha (segundos), chave,
+    tipo, bytes e liberados (bytes já liberados da sessão).
+    """
+    agora = time.time()
+    atual = _sessao_atual()
+    if atual is not None:
+        medir()
+
+    linhas = []
+    for session_id, sessao in _sessoes_vivas():
+        for chave, (_, tipo, bytes_chave) in sessao["chaves"].items():
+            linhas.append({
+                "sessao": session_id[:8] + (" (esta)" if session_id == atual else ""),
+                "inativa_ha": int(agora - sessao["ultimo_acesso"]),
+                "chave": chave,
+                "tipo": tipo,
+                "bytes": bytes_chave,
+                "liberados": sessao["liberados"],
+            })
+    return linhas
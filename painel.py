@@ -0,0 +1,180 @@
+import threading
+import datetime
+import logging
+import time
+import io
+
+import cache_compartilhado
+import cliente_servico
+
+# pandas e dados são importados só na construção/leitura do snapshot:
+# utils chama marcar_desatualizado() e não deve puxar a pilha de dados para a tela de login.
+
+# --- Snapshot do Painel de Controle ---
+# Os números do 1_home.py (KPIs, resumo por obra e gastos por categoria) ficam
+# prontos no cache compartilhado, em um artefato compacto (tabelas em Feather/zstd).
+# A página só lê o snapshot; quem o reconstrói é uma thread de segundo plano,
+# periodicamente e logo depois de qualquer gravação (marcar_desatualizado).
+
+CHAVE = "painel:snapshot"
+CHAVE_DESATUALIZADO = "painel:desatualizado_em"
+# Última falha da reconstrução em segundo plano ({"mensagem", "em"}); apagada no próximo sucesso
+CHAVE_ERRO = "painel:erro"
+
+# Muda quando o formato do snapshot mudar (snapshots antigos são reconstruídos)
+VERSAO = 1
+
+# Reconstrução periódica, mesmo sem gravações pelo app (segundos)
+INTERVALO = 15 * 60
+
+# De quanto em quanto tempo a thread confere se precisa reconstruir (segundos).
+# Também agrupa rajadas de gravações em uma única reconstrução.
+VERIFICACAO = 5
+
+# O snapshot não expira junto com as consultas: continua servindo até ser substituído
+TTL = 7 * 24 * 60 * 60
+
+COLUNAS_OBRAS = ["id", "Nome", "Cliente_Nome", "Data_Início", "Orçamento", "total_gasto", "saldo", "percentual_uso"]
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_acordar = threading.Event()
+_agendador = None
+
+def _para_bytes(df):
+    import pandas as pd
+
+    buffer = io.BytesIO()
+    pd.DataFrame(df).reset_index(drop=True).to_feather(buffer, compression="zstd")
+    return buffer.getvalue()
+
+def _de_bytes(conteudo):
+    import pandas as pd
+
+    return pd.read_feather(io.BytesIO(conteudo))
+
+def construir(supabase, recarregar=False):
+    """
+    Recalcula o snapshot a partir do banco e o publica no cache compartilhado.
+    Com recarregar=True, descarta antes as consultas em cache (atualização manual).
+    """
+    # Marcado no início: gravações feitas durante a construção deixam o snapshot desatualizado
+    gerado_em = time.time()
+    if recarregar:
+        cache_compartilhado.invalidar("obras", "movimentacoes")
+
+    kpis, df_resumo, gastos_por_categoria = _calcular(supabase)
+    snapshot = {
+        "versao": VERSAO,
+        "gerado_em": gerado_em,
+        "kpis": kpis,
+        "obras": _para_bytes(df_resumo),
+        "categorias": _para_bytes(gastos_por_categoria),
+    }
+    cache_compartilhado.gravar(CHAVE, snapshot, ttl=TTL)
+    if cache_compartilhado.obter(CHAVE_ERRO) is not None:
+        cache_compartilhado.gravar(CHAVE_ERRO, None, ttl=TTL)
+    return snapshot
+
+def _calcular(supabase, inicio=None, fim=None):
+    # KPIs, resumo por obra e gastos por categoria (de todo o histórico ou do período)
+    import dados
+
+    df_resumo, gastos_por_categoria = dados.resumo_obras(supabase, inicio=inicio, fim=fim)
+    if not df_resumo.empty:
+        df_resumo = df_resumo[COLUNAS_OBRAS]
+
+    total_orcado = float(df_resumo["Orçamento"].sum()) if not df_resumo.empty else 0.0
+    total_gasto = float(df_resumo["total_gasto"].sum()) if not df_resumo.empty else 0.0
+
+    kpis = {
+        "obras": len(df_resumo),
+        "orcamento": total_orcado,
+        "gasto": total_gasto,
+        "saldo": total_orcado - total_gasto,
+    }
+    return kpis, df_resumo, gastos_por_categoria
+
+def obter(supabase, inicio=None, fim=None):
+    """
+    Dados prontos para a página: KPIs, DataFrames do resumo por obra e por categoria,
+    data de geração e se há gravações ainda não refletidas neles.
+    Todo o histórico vem do snapshot (construído aqui só no primeiro acesso); um período
+    (inicio/fim) é calculado na hora, com as movimentações dele filtradas no banco
+    e as consultas no cache compartilhado.
+    """
+    if inicio is not None or fim is not None:
+        kpis, df_resumo, gastos_por_categoria = _calcular(supabase, inicio, fim)
+        return {
+            "kpis": kpis,
+            "obras": df_resumo,
+            "categorias": gastos_por_categoria,
+            "gerado_em": datetime.datetime.now(),
+            "desatualizado": False,
+            "erro": None,
+        }
+
+    snapshot = cache_compartilhado.obter(CHAVE)
+    if snapshot is None or snapshot.get("versao") != VERSAO:
+        snapshot = construir(supabase)
+
+    return {
+        "kpis": snapshot["kpis"],
+        "obras": _de_bytes(snapshot["obras"]),
+        "categorias": _de_bytes(snapshot["categorias"]),
+        "gerado_em": datetime.datetime.fromtimestamp(snapshot["gerado_em"]),
+        "desatualizado": cache_compartilhado.obter(CHAVE_DESATUALIZADO, 0) > snapshot["gerado_em"],
+        "erro": cache_compartilhado.obter(CHAVE_ERRO),
+    }
+
+def marcar_desatualizado():
+    """Sinaliza (para todas as réplicas) que houve gravação e o snapshot precisa ser refeito."""
+    cache_compartilhado.gravar(CHAVE_DESATUALIZADO, time.time(), ttl=TTL)
+    _acordar.set()
+
+def _precisa_reconstruir():
+    snapshot = cache_compartilhado.obter(CHAVE)
+    if snapshot is None or snapshot.get("versao") != VERSAO:
+        return True
+    desatualizado_em = cache_compartilhado.obter(CHAVE_DESATUALIZADO, 0)
+    return desatualizado_em > snapshot["gerado_em"] or time.time() - snapshot["gerado_em"] > INTERVALO
+
+def _executar():
+    while True:
+        _acordar.wait(VERIFICACAO)
+        _acordar.clear()
+        try:
+            if _precisa_reconstruir():
+                # Cliente de serviço: o snapshot não depende do login da última sessão
+                cliente = cliente_servico.obter()
+                construir(cliente)
+                # Aproveita para somar as linhas novas ao cubo de gastos (análises do painel)
+                import cubo
+                cubo.obter(cliente)
+        except Exception as e:
+            # Banco fora do ar: a página continua com o último snapshot e tentamos na próxima
+            # verificação; a falha fica registrada para a página avisar que os números estão parados
+            mensagem = str(e) or type(e).__name__
+            anterior = cache_compartilhado.obter(CHAVE_ERRO)
+            if anterior is None or anterior["mensagem"] != mensagem:
+                # Só a primeira ocorrência de cada falha vai para o log (a verificação é a cada poucos segundos)
+                logger.exception("Painel: falha ao reconstruir o snapshot")
+                cache_compartilhado.gravar(CHAVE_ERRO, {"mensagem": mensagem, "em": time.time()}, ttl=TTL)
+
+def agendar():
+    """Garante a thread de reconstrução deste processo (chamado pelo app.py após o login)."""
+    global _agendador
+    with _lock:
+        if _agendador is None or not _agendador.is_alive():
+            _agendador = threading.Thread(target=_executar, name="mino-painel", daemon=True)
+            _agendador.start()
+
+def idade(gerado_em):
+    """Texto curto com a idade do snapshot ("há 40 s", "há 3 min", "há 2 h")."""
+    segundos = max(0, int((datetime.datetime.now() - gerado_em).total_seconds()))
+    if segundos < 60:
+        return f"há {segundos} s"
+    if segundos < 3600:
+        return f"há {segundos // 60} min"
+    return f"há {segundos // 3600} h"
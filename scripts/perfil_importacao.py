@@ -0,0 +1,106 @@
+"""
+Perfil de inicialização da tela de login.
+
+Renderiza o app.py uma vez, em um processo Python novo (importações a frio), usando o
+streamlit.testing.v1.AppTest, e mostra:
+    - o tempo até o primeiro render da tela de login;
+    - as importações feitas pelo script, ordenadas pelo tempo acumulado (python -X importtime).
+
+Também serve como verificação de regressão no CI: sai com código 1 se o primeiro render
+passar do --limite ou se a tela de login voltar a importar algum módulo pesado.
+
+Uso:
+    python scripts/perfil_importacao.py [--top 20] [--limite 3.0]
+"""
+import subprocess
+import argparse
+import json
+import sys
+import os
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Módulos que a tela de login não deve carregar. pandas e pyarrow ficam de fora:
+# o próprio Streamlit os importa ao montar o componente de cookies do login.
+MODULOS_PESADOS = ["plotly", "PIL", "dados", "graficos", "importacao"]
+
+MARCADOR = "--- inicio do script ---"
+
+# Executado no processo filho: importa o AppTest antes do marcador, para que só as
+# importações feitas pelo app.py apareçam depois dele no relatório do -X importtime
+MEDICAO = f"""
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+
+at = AppTest.from_file("app.py", default_timeout=60)
+at.secrets["supabase"] = {{"url": "http://localhost:54321", "key": "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.local"}}
+# Sem cookies no AppTest: vai direto para a tela de login
+at.session_state["logout_flag"] = True
+
+antes = set(sys.modules)
+print({MARCADOR!r}, file=sys.stderr, flush=True)
+inicio = time.perf_counter()
+at.run()
+duracao = time.perf_counter() - inicio
+
+print(json.dumps({{
+    "duracao": duracao,
+    "login": any(t.value.endswith("Login") for t in at.title),
+    "excecoes": [e.message for e in at.exception],
+    "modulos": sorted(set(sys.modules) - antes),
+}}))
+"""
+
+def medir():
+    resultado = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", MEDICAO],
+        cwd=RAIZ, capture_output=True, text=True,
+    )
+    if resultado.returncode != 0:
+        raise RuntimeError(resultado.stderr)
+
+    medicao = json.loads(resultado.stdout.strip().splitlines()[-1])
+
+    # Linhas do -X importtime: "import time: self [us] | cumulative | imported package"
+    importacoes = []
+    depois_do_marcador = False
+    for linha in resultado.stderr.splitlines():
+        if linha.strip() == MARCADOR:
+            depois_do_marcador = True
+        elif depois_do_marcador and linha.startswith("import time:") and "|" in linha:
+            proprio, acumulado, modulo = linha.removeprefix("import time:").split("|")
+            if proprio.strip().isdigit():
+                importacoes.append((int(acumulado), int(proprio), modulo.rstrip()))
+
+    return medicao, importacoes
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=20, help="Quantas importações mostrar")
+    parser.add_argument("--limite", type=float, default=None, help="Tempo máximo (s) até o primeiro render")
+    args = parser.parse_args()
+
+    medicao, importacoes = medir()
+
+    print(f"{'acumulado (ms)':>15} {'próprio (ms)':>13}  módulo")
+    for acumulado, proprio, modulo in sorted(importacoes, reverse=True)[:args.top]:
+        print(f"{acumulado / 1000:>15.1f} {proprio / 1000:>13.1f}  {modulo}")
+
+    print()
+    print(f"Módulos importados pelo script: {len(medicao['modulos'])}")
+    print(f"Tempo até o primeiro render da tela de login: {medicao['duracao']:.2f} s")
+
+    falhas = []
+    if medicao["excecoes"]:
+        falhas.append(f"exceções na renderização: {medicao['excecoes']}")
+    if not medicao["login"]:
+        falhas.append("a tela de login não foi renderizada")
+    pesados = sorted({m.split(".")[0] for m in medicao["modulos"]} & set(MODULOS_PESADOS))
+    if pesados:
+        falhas.append(f"a tela de login importou módulos pesados: {', '.join(pesados)}")
+    if args.limite is not None and medicao["duracao"] > args.limite:
+        falhas.append(f"primeiro render levou {medicao['duracao']:.2f} s (limite: {args.limite:.2f} s)")
+
+    for falha in falhas:
+        print(f"FALHA: {falha}")
+    sys.exit(1 if falhas else 0)
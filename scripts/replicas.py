@@ -0,0 +1,102 @@
+"""
+Ambiente local com várias réplicas do Mino Manager compartilhando o mesmo cache.
+
+Uso:
+    python scripts/replicas.py iniciar --replicas 3 --porta 8501
+        Sobe N processos do Streamlit (portas 8501, 8502, ...) apontando para o mesmo
+        arquivo de cache. Coloque um balanceador com sessões fixas (sticky) na frente:
+        o websocket de uma sessão precisa ficar sempre na mesma réplica.
+
+    python scripts/replicas.py verificar --replicas 4
+        Teste rápido do cache entre processos: cada processo grava uma chave, todos
+        leem as chaves dos outros e uma invalidação feita em um deles vale para todos.
+"""
+import multiprocessing
+import subprocess
+import argparse
+import tempfile
+import secrets
+import sys
+import os
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(RAIZ)
+import cache_compartilhado
+
+def iniciar(replicas, porta, caminho_cache):
+    ambiente = dict(os.environ, MINO_CACHE_PATH=caminho_cache)
+    # O cookie de XSRF precisa ser assinado com o mesmo segredo em todas as réplicas
+    segredo = secrets.token_hex(32)
+
+    processos = []
+    for i in range(replicas):
+        comando = [
+            sys.executable, "-m", "streamlit", "run", os.path.join(RAIZ, "app.py"),
+            "--server.port", str(porta + i),
+            "--server.headless", "true",
+            "--server.runOnSave", "false",
+            "--server.cookieSecret", segredo,
+        ]
+        processos.append(subprocess.Popen(comando, cwd=RAIZ, env=ambiente))
+        print(f"Réplica {i + 1}: http://localhost:{porta + i}")
+
+    print(f"Cache compartilhado em {caminho_cache}. Ctrl+C para encerrar.")
+    try:
+        for processo in processos:
+            processo.wait()
+    except KeyboardInterrupt:
+        for processo in processos:
+            processo.terminate()
+
+def _processo_verificacao(indice, replicas, caminho_cache, barreira, resultados):
+    os.environ["MINO_CACHE_PATH"] = caminho_cache
+
+    cache_compartilhado.gravar(f"replica:{indice}", indice, tabelas=["obras"])
+    barreira.wait()
+    vistas = [cache_compartilhado.obter(f"replica:{i}") for i in range(replicas)]
+
+    # A réplica 0 invalida; depois disso nenhuma deve enxergar as chaves de "obras"
+    barreira.wait()
+    if indice == 0:
+        cache_compartilhado.invalidar("obras")
+    barreira.wait()
+    apos_invalidar = [cache_compartilhado.obter(f"replica:{i}") for i in range(replicas)]
+
+    resultados[indice] = (vistas == list(range(replicas)), all(v is None for v in apos_invalidar))
+
+def verificar(replicas, caminho_cache):
+    os.environ["MINO_CACHE_PATH"] = caminho_cache
+    cache_compartilhado.limpar()
+
+    gerenciador = multiprocessing.Manager()
+    barreira = gerenciador.Barrier(replicas)
+    resultados = gerenciador.dict()
+    processos = [
+        multiprocessing.Process(target=_processo_verificacao, args=(i, replicas, caminho_cache, barreira, resultados))
+        for i in range(replicas)
+    ]
+    for processo in processos:
+        processo.start()
+    for processo in processos:
+        processo.join()
+
+    ok = len(resultados) == replicas and all(leu and invalidou for leu, invalidou in resultados.values())
+    for indice in sorted(resultados.keys()):
+        leu, invalidou = resultados[indice]
+        print(f"Réplica {indice}: leu as outras={'sim' if leu else 'NÃO'}, viu a invalidação={'sim' if invalidou else 'NÃO'}")
+    print("OK" if ok else "FALHOU")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("acao", choices=["iniciar", "verificar"])
+    parser.add_argument("--replicas", type=int, default=3)
+    parser.add_argument("--porta", type=int, default=8501)
+    parser.add_argument("--cache", default=None, help="Arquivo SQLite do cache (padrão: MINO_CACHE_PATH ou .cache/)")
+    args = parser.parse_args()
+
+    if args.acao == "iniciar":
+        iniciar(args.replicas, args.porta, args.cache or os.environ.get("MINO_CACHE_PATH", cache_compartilhado.CAMINHO_PADRAO))
+    else:
+        caminho = args.cache or os.path.join(tempfile.mkdtemp(prefix="mino-cache-"), "cache.sqlite3")
+        sys.exit(verificar(args.replicas, caminho))
@@ -0,0 +1,233 @@
+"""
+Capacidade de um servidor: latência e memória com N sessões em um único `streamlit run`.
+
+Para cada nível de concorrência, sobe um `streamlit run` do app.py de verdade (um servidor
+novo por nível, para a memória de um nível não contar no seguinte) e conecta N clientes
+websocket a ele, como N abas de navegador. Cada cliente percorre as páginas do app
+(painel, consulta de obra, consulta de material, importação de extrato e busca) e o relatório
+mostra a latência dos reruns (do pedido até o fim do script, p50/p95/p99) e a memória
+residente (RSS) do processo do servidor: antes das sessões, no pico e com as N sessões
+conectadas, e quanto isso dá por sessão.
+
+O app roda contra o Supabase local em SQLite (supabase_local.py), já logado: o script de
+entrada coloca o cliente local e o usuário na session_state e executa o app.py. Os clientes
+só navegam entre as páginas (não mexem em widgets nem enviam arquivos); o custo do upload
+de extrato está em scripts/teste_carga_apptest.py. O banco local serializa as consultas de
+um processo (uma conexão SQLite), enquanto o Supabase de verdade atende em paralelo pela
+rede: com muitas sessões, parte da latência medida aqui é fila no banco local.
+
+Usa o mesmo harness de scripts/verificar_sessoes.py (porta livre, servidor e conexão).
+
+Uso:
+    python scripts/teste_carga.py --concorrencia 1,5,10,20 --repeticoes 3
+"""
+import collections
+import statistics
+import argparse
+import asyncio
+import tempfile
+import time
+import os
+import sys
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(RAIZ)
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+import supabase_local
+from verificar_sessoes import porta_livre, conectar, iniciar_servidor
+
+EMAIL = "teste@mino.local"
+SENHA = "senha"
+
+# Páginas visitadas por cada sessão, na ordem: nome no relatório e url no st.navigation do app.py
+# (a página padrão, a Home, tem a url vazia)
+PAGINAS = [
+    ("painel", ""),
+    ("consulta de obra", "consulta_obra"),
+    ("consulta de material", "consulta_material"),
+    ("extrato", "extrato"),
+    ("busca", "busca"),
+]
+
+# Script de entrada do servidor: cliente local e usuário logado na sessão, depois o app.py
+APP = '''
+import runpy, os, sys
+sys.path.insert(0, os.environ["MINO_RAIZ"])
+import streamlit as st
+import supabase_local
+import cliente_servico
+
+@st.cache_resource
+def banco():
+    banco = supabase_local.criar_banco(os.environ["MINO_BANCO"])
+    # As threads de segundo plano (fila de gravação, painel) usam o mesmo banco local
+    cliente_servico.definir(supabase_local.criar_cliente(banco))
+    return banco
+
+if "supabase" not in st.session_state:
+    cliente = supabase_local.criar_cliente(banco())
+    st.session_state["supabase"] = cliente
+    st.session_state["usuario_logado"] = cliente.auth.sign_in_with_password(
+        {"email": os.environ["MINO_EMAIL"], "password": os.environ["MINO_SENHA"]}
+    ).user
+
+runpy.run_path(os.path.join(os.environ["MINO_RAIZ"], "app.py"), run_name="__main__")
+'''
+
+def memoria_rss(pid):
+    """Memória residente do processo, em bytes (Linux)."""
+    with open(f"/proc/{pid}/status") as status:
+        for linha in status:
+            if linha.startswith("VmRSS:"):
+                return int(linha.split()[1]) * 1024
+    return 0
+
+def preparar(pasta, args):
+    """Banco local populado e o script de entrada, com as páginas do app ao lado dele."""
+    caminho_banco = os.path.join(pasta, "banco.sqlite3")
+    cliente = supabase_local.criar_cliente(supabase_local.criar_banco(caminho_banco))
+    supabase_local.popular(cliente, obras=args.obras, movimentacoes=args.movimentacoes)
+
+    # O st.navigation procura as páginas na pasta do script principal
+    for nome in os.listdir(RAIZ):
+        if nome[0].isdigit() and nome.endswith(".py"):
+            os.symlink(os.path.join(RAIZ, nome), os.path.join(pasta, nome))
+    caminho_app = os.path.join(pasta, "app_carga.py")
+    with open(caminho_app, "w") as arquivo:
+        arquivo.write(APP)
+    return caminho_app, caminho_banco
+
+async def navegar(websocket, pagina):
+    """Roda uma página e espera o fim do script; retorna a latência e os erros exibidos."""
+    mensagem = BackMsg()
+    mensagem.rerun_script.query_string = ""
+    mensagem.rerun_script.page_name = pagina
+    inicio = time.perf_counter()
+    await websocket.send(mensagem.SerializeToString())
+
+    erros = []
+    while True:
+        resposta = ForwardMsg()
+        resposta.ParseFromString(await websocket.recv())
+        tipo = resposta.WhichOneof("type")
+        if tipo == "page_not_found":
+            erros.append(f"página não encontrada: {pagina!r}")
+        elif tipo == "delta" and resposta.delta.WhichOneof("type") == "new_element":
+            elemento = resposta.delta.new_element
+            if elemento.WhichOneof("type") == "exception":
+                erros.append(f"{pagina or 'home'}: {elemento.exception.type}: {elemento.exception.message}")
+        elif tipo == "script_finished":
+            # Reruns de fragmentos (run_every) também terminam com script_finished
+            if resposta.script_finished == ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY:
+                continue
+            return time.perf_counter() - inicio, erros
+
+async def sessao(porta, repeticoes, latencias, erros):
+    websocket = await conectar(porta)
+    for _ in range(repeticoes):
+        for nome, pagina in PAGINAS:
+            duracao, erros_pagina = await navegar(websocket, pagina)
+            latencias[nome].append(duracao)
+            erros.extend(erros_pagina)
+    return websocket
+
+async def medir_nivel(porta, pid, concorrencia, repeticoes):
+    # Aquecimento: importações e caches do processo não entram na conta das sessões
+    latencias_aquecimento = collections.defaultdict(list)
+    aquecimento = await sessao(porta, 1, latencias_aquecimento, [])
+    await aquecimento.close()
+    await asyncio.sleep(1)
+    memoria_antes = memoria_rss(pid)
+
+    pico = memoria_antes
+    medindo = True
+
+    async def amostrar():
+        nonlocal pico
+        while medindo:
+            pico = max(pico, memoria_rss(pid))
+            await asyncio.sleep(0.2)
+
+    amostragem = asyncio.create_task(amostrar())
+    latencias = collections.defaultdict(list)
+    erros = []
+    inicio = time.perf_counter()
+    clientes = await asyncio.gather(*(sessao(porta, repeticoes, latencias, erros) for _ in range(concorrencia)))
+    duracao = time.perf_counter() - inicio
+
+    # Com as N sessões ainda conectadas (a session_state delas continua no servidor)
+    memoria_conectadas = memoria_rss(pid)
+    medindo = False
+    await amostragem
+    for cliente in clientes:
+        await cliente.close()
+    return latencias, erros, duracao, memoria_antes, max(pico, memoria_conectadas), memoria_conectadas
+
+def percentis(valores):
+    if len(valores) == 1:
+        return valores * 3
+    cortes = statistics.quantiles(valores, n=100, method="inclusive")
+    return cortes[49], cortes[94], cortes[98]
+
+def rodar_nivel(concorrencia, caminho_app, ambiente, args):
+    porta = porta_livre()
+    servidor = iniciar_servidor(caminho_app, porta, ambiente)
+    try:
+        latencias, erros, duracao, antes, pico, conectadas = asyncio.run(
+            medir_nivel(porta, servidor.pid, concorrencia, args.repeticoes)
+        )
+    finally:
+        servidor.terminate()
+        servidor.wait()
+
+    todas = [valor for valores in latencias.values() for valor in valores]
+    print(
+        f"\n=== {concorrencia} sessão(ões) em um servidor · {duracao:.1f} s · {len(todas) / duracao:.1f} reruns/s ===\n"
+        f"RSS do servidor: {antes / 2**20:.0f} MiB antes, {pico / 2**20:.0f} MiB no pico, "
+        f"{conectadas / 2**20:.0f} MiB com as sessões conectadas "
+        f"({(conectadas - antes) / concorrencia / 2**20:.1f} MiB por sessão)"
+    )
+    print(f"{'página':<28}{'reruns':>8}{'p50 (ms)':>12}{'p95 (ms)':>12}{'p99 (ms)':>12}")
+    for pagina, valores in latencias.items():
+        p50, p95, p99 = percentis(valores)
+        print(f"{pagina:<28}{len(valores):>8}{p50 * 1000:>12.0f}{p95 * 1000:>12.0f}{p99 * 1000:>12.0f}")
+    p50, p95, p99 = percentis(todas)
+    print(f"{'(todas)':<28}{len(todas):>8}{p50 * 1000:>12.0f}{p95 * 1000:>12.0f}{p99 * 1000:>12.0f}")
+
+    for erro in sorted(set(erros)):
+        print(f"ERRO: {erro}")
+    return not erros
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concorrencia", default="1,5,10,20", help="Níveis de sessões simultâneas, separados por vírgula")
+    parser.add_argument("--repeticoes", type=int, default=3, help="Quantas vezes cada sessão percorre as páginas")
+    parser.add_argument("--obras", type=int, default=20)
+    parser.add_argument("--movimentacoes", type=int, default=5000)
+    args = parser.parse_args()
+
+    pasta = tempfile.mkdtemp(prefix="mino-carga-")
+    caminho_app, caminho_banco = preparar(pasta, args)
+
+    ok = True
+    for concorrencia in [int(n) for n in args.concorrencia.split(",")]:
+        # Cache compartilhado e fila de gravação novos em cada nível
+        nivel = os.path.join(pasta, f"nivel-{concorrencia}")
+        os.makedirs(nivel)
+        ambiente = dict(
+            os.environ,
+            MINO_RAIZ=RAIZ,
+            MINO_BANCO=caminho_banco,
+            MINO_EMAIL=EMAIL,
+            MINO_SENHA=SENHA,
+            MINO_CACHE_PATH=os.path.join(nivel, "cache.sqlite3"),
+            MINO_FILA_PATH=os.path.join(nivel, "fila.sqlite3"),
+        )
+        ok = rodar_nivel(concorrencia, caminho_app, ambiente, args) and ok
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
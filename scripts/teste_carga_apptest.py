@@ -0,0 +1,223 @@
+"""
+Custo dos reruns do app com sessões simuladas do Streamlit (streamlit.testing.v1.AppTest).
+
+NÃO mede a capacidade de um servidor: para isso use scripts/teste_carga.py, que sobe um
+`streamlit run` de verdade e conecta N clientes websocket a ele.
+
+Aqui cada sessão percorre um fluxo realista contra o Supabase local em SQLite (supabase_local.py):
+login, painel da empresa, consulta de obra (com troca de obra) e importação de extrato
+(com upload, que o teste por websocket não faz). Cada sessão roda em um processo próprio
+(fork), porque o AppTest usa um Runtime global do Streamlit e não suporta várias instâncias
+no mesmo processo: N sessões são N processos, cada um com o seu Runtime, o seu GIL e os seus
+caches em memória, disputando a CPU e o cache compartilhado (cache_compartilhado.py).
+
+O que os números medem: o custo de cada etapa do fluxo (p50/p95/p99 dos reruns) e quanto ele
+piora com a CPU dividida, para comparar versões do app. A "memória adicional por processo" é
+a de um processo inteiro, não a de uma sessão dentro de um servidor.
+
+Uso:
+    python scripts/teste_carga_apptest.py --concorrencia 1,2,4,8 --repeticoes 2
+    python scripts/teste_carga_apptest.py --pular-login   # sem as pausas da tela de login
+"""
+import collections
+import statistics
+import logging
+import argparse
+import multiprocessing
+import tempfile
+import time
+import io
+import os
+import sys
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(RAIZ)
+
+# Cache compartilhado e fila de gravação isolados para o teste (precisa vir antes de importar os módulos do app)
+PASTA_TEMPORARIA = tempfile.mkdtemp(prefix="mino-carga-")
+os.environ.setdefault("MINO_CACHE_PATH", os.path.join(PASTA_TEMPORARIA, "cache.sqlite3"))
+os.environ.setdefault("MINO_FILA_PATH", os.path.join(PASTA_TEMPORARIA, "fila.sqlite3"))
+
+import pandas as pd
+import cache_compartilhado
+import cliente_servico
+import supabase_local
+
+from streamlit.testing.v1 import AppTest
+
+# Sem os avisos de "missing ScriptRunContext" ao preparar a session_state fora de um rerun
+# (um filtro, porque o Streamlit redefine o nível dos loggers a cada run)
+logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").addFilter(
+    lambda registro: "missing ScriptRunContext" not in registro.getMessage()
+)
+
+EMAIL = "teste@mino.local"
+SENHA = "senha"
+
+def memoria_rss():
+    """Memória residente do processo, em bytes (Linux)."""
+    with open("/proc/self/status") as status:
+        for linha in status:
+            if linha.startswith("VmRSS:"):
+                return int(linha.split()[1]) * 1024
+    return 0
+
+def gerar_extrato(linhas=200, semente=0):
+    """Planilha no formato do banco, com Data, Detalhes e Valor."""
+    hoje = pd.Timestamp.today().normalize()
+    df = pd.DataFrame({
+        "Data": [(hoje - pd.Timedelta(days=i % 60)).strftime("%d/%m/%Y") for i in range(linhas)],
+        "Detalhes": [f"PIX {semente}-{i:05d}" for i in range(linhas)],
+        "Valor": [f"{(-1) ** i * (100 + i):.2f}".replace(".", ",") for i in range(linhas)],
+    })
+    arquivo = io.BytesIO()
+    df.to_excel(arquivo, index=False)
+    return arquivo.getvalue()
+
+class Sessao:
+    """Uma sessão simulada: um AppTest com o cliente local na session_state."""
+
+    def __init__(self, cliente, extrato, timeout, pular_login):
+        self.app = AppTest.from_file(os.path.join(RAIZ, "app.py"), default_timeout=timeout)
+        self.app.session_state["supabase"] = cliente
+        self.extrato = extrato
+        self.pular_login = pular_login
+        self.latencias = collections.defaultdict(list)
+        self.erros = []
+
+    def _medir(self, etapa, acao):
+        inicio = time.perf_counter()
+        acao()
+        self.latencias[etapa].append(time.perf_counter() - inicio)
+        self.erros.extend(f"{etapa}: {e.message}" for e in self.app.exception)
+
+    def login(self):
+        if self.pular_login:
+            usuario = self.app.session_state["supabase"].auth.sign_in_with_password({"email": EMAIL, "password": SENHA}).user
+            self.app.session_state["usuario_logado"] = usuario
+        else:
+            # Sem cookies no AppTest: a flag leva direto para a tela de login
+            self.app.session_state["logout_flag"] = True
+            self._medir("login (tela)", self.app.run)
+            self.app.text_input[0].input(EMAIL)
+            self.app.text_input[1].input(SENHA)
+            self._medir("login (entrar)", self.app.button[0].click().run)
+
+        # No navegador o componente de cookies dispara este rerun; aqui ele é feito
+        # à mão, para o st.navigation registrar as páginas do usuário logado
+        self._medir("entrada", self.app.run)
+
+    def painel(self):
+        self._medir("painel", self.app.switch_page("1_home.py").run)
+
+    def consulta_obra(self):
+        self._medir("consulta de obra", self.app.switch_page("5_consulta_obra.py").run)
+        if self.app.selectbox:
+            opcoes = self.app.selectbox[0].options
+            self._medir("consulta de obra (troca)", self.app.selectbox[0].select(opcoes[-1]).run)
+
+    def importar_extrato(self):
+        self._medir("extrato", self.app.switch_page("4_extrato.py").run)
+        arquivo = ("extrato.xlsx", self.extrato, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+        self._medir("extrato (upload)", self.app.file_uploader[0].set_value(arquivo).run)
+
+    def fluxo(self, repeticoes):
+        self.login()
+        for _ in range(repeticoes):
+            self.painel()
+            self.consulta_obra()
+            self.importar_extrato()
+        return self
+
+def percentis(valores):
+    if len(valores) == 1:
+        return valores * 3
+    cortes = statistics.quantiles(valores, n=100, method="inclusive")
+    return cortes[49], cortes[94], cortes[98]
+
+def _rodar_sessao(cliente, extrato, args, largada, resultados):
+    sessao = Sessao(cliente, extrato, args.timeout, args.pular_login)
+    memoria_antes = memoria_rss()
+    largada.wait()
+    try:
+        sessao.fluxo(args.repeticoes)
+    except Exception as e:
+        sessao.erros.append(f"{type(e).__name__}: {e}")
+    resultados.put((dict(sessao.latencias), sessao.erros, memoria_rss() - memoria_antes))
+
+def rodar_nivel(concorrencia, cliente, extrato, args):
+    cache_compartilhado.limpar()
+
+    contexto = multiprocessing.get_context("fork")
+    largada = contexto.Barrier(concorrencia + 1)
+    resultados = contexto.Queue()
+    processos = [
+        contexto.Process(target=_rodar_sessao, args=(cliente, extrato, args, largada, resultados))
+        for _ in range(concorrencia)
+    ]
+    for processo in processos:
+        processo.start()
+
+    # Todas as sessões começam juntas
+    largada.wait()
+    inicio = time.perf_counter()
+    sessoes = [resultados.get() for _ in processos]
+    duracao = time.perf_counter() - inicio
+    for processo in processos:
+        processo.join()
+
+    memoria_por_sessao = statistics.mean(memoria for _, _, memoria in sessoes)
+
+    latencias = collections.defaultdict(list)
+    erros = []
+    for latencias_sessao, erros_sessao, _ in sessoes:
+        for etapa, valores in latencias_sessao.items():
+            latencias[etapa].extend(valores)
+        erros.extend(erros_sessao)
+
+    print(f"\n=== {concorrencia} processo(s) simultâneo(s), uma sessão em cada · {duracao:.1f} s · memória adicional por processo: {memoria_por_sessao / 2**20:.1f} MiB ===")
+    print(f"{'etapa':<28}{'reruns':>8}{'p50 (ms)':>12}{'p95 (ms)':>12}{'p99 (ms)':>12}")
+    todas = []
+    for etapa, valores in latencias.items():
+        todas.extend(valores)
+        p50, p95, p99 = percentis(valores)
+        print(f"{etapa:<28}{len(valores):>8}{p50 * 1000:>12.0f}{p95 * 1000:>12.0f}{p99 * 1000:>12.0f}")
+    p50, p95, p99 = percentis(todas)
+    print(f"{'(todas)':<28}{len(todas):>8}{p50 * 1000:>12.0f}{p95 * 1000:>12.0f}{p99 * 1000:>12.0f}")
+
+    for erro in sorted(set(erros)):
+        print(f"ERRO: {erro}")
+    return not erros
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concorrencia", default="1,2,4,8", help="Níveis de sessões simultâneas, separados por vírgula")
+    parser.add_argument("--repeticoes", type=int, default=2, help="Quantas vezes cada sessão repete o fluxo")
+    parser.add_argument("--obras", type=int, default=20)
+    parser.add_argument("--movimentacoes", type=int, default=5000)
+    parser.add_argument("--linhas-extrato", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=120, help="Tempo máximo de um rerun (s)")
+    parser.add_argument("--pular-login", action="store_true", help="Entra direto, sem a tela de login (e suas pausas)")
+    args = parser.parse_args()
+
+    # Servidor já aquecido: os módulos do app são importados uma vez, antes do fork,
+    # para a latência medida ser a dos reruns e não a das importações a frio
+    import extra_streamlit_components, plotly.express, dados, graficos, importacao
+
+    # Um único banco local em arquivo, compartilhado por todas as sessões (como o Supabase real)
+    cliente = supabase_local.criar_cliente(supabase_local.criar_banco(os.path.join(PASTA_TEMPORARIA, "banco.sqlite3")))
+    supabase_local.popular(cliente, obras=args.obras, movimentacoes=args.movimentacoes)
+    # As threads de segundo plano (fila de gravação, painel) usam o mesmo banco local
+    cliente_servico.definir(cliente)
+    extrato = gerar_extrato(args.linhas_extrato)
+
+    print(
+        "AVISO: cada sessão roda em um processo próprio (AppTest), e não em um único servidor.\n"
+        "As latências e a memória abaixo servem para comparar versões do app; a capacidade\n"
+        "(sessões por réplica) de um `streamlit run` é medida por scripts/teste_carga.py."
+    )
+
+    ok = True
+    for concorrencia in [int(n) for n in args.concorrencia.split(",")]:
+        ok = rodar_nivel(concorrencia, cliente, extrato, args) and ok
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,75 @@
+"""
+Verificação da remoção de linhas repetidas entre extratos (importacao.ler_extratos).
+
+Monta planilhas em memória e confere:
+  1. dois arquivos no formato padrão do banco (só Data, Detalhes e Valor) com um período
+     sobreposto: a linha em comum aparece uma vez só;
+  2. a mesma linha duas vezes em um arquivo (dois pagamentos idênticos) e uma vez no outro:
+     as duas do primeiro ficam;
+  3. arquivos com a coluna Conta, de contas diferentes: linhas idênticas não são removidas.
+
+Sai com código 1 se alguma das conferências falhar.
+
+Uso:
+    python scripts/verificar_extratos.py
+"""
+import types
+import sys
+import io
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pandas as pd
+import importacao
+
+def planilha(linhas, conta=None):
+    """Bytes de um .xlsx com as linhas (Data, Detalhes, Valor) e, opcionalmente, a Conta."""
+    df = pd.DataFrame(linhas, columns=["Data", "Detalhes", "Valor"])
+    if conta is not None:
+        df["Conta"] = conta
+    buffer = io.BytesIO()
+    df.to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+def arquivos(*conteudos):
+    """Imita os arquivos do st.file_uploader."""
+    return [
+        types.SimpleNamespace(name=f"extrato_{i}.xlsx", getvalue=lambda conteudo=conteudo: conteudo)
+        for i, conteudo in enumerate(conteudos)
+    ]
+
+def conferir(descricao, arquivos_enviados, linhas_esperadas, duplicadas_esperadas):
+    df, duplicadas = importacao.ler_extratos(arquivos_enviados)
+    ok = len(df) == linhas_esperadas and duplicadas == duplicadas_esperadas
+    print(f"{'OK   ' if ok else 'FALHA'} {descricao}: {len(df)} linha(s), {duplicadas} duplicada(s)"
+          f" (esperado: {linhas_esperadas} e {duplicadas_esperadas})")
+    return ok
+
+def main():
+    setembro = [("30/09/2026", "PIX A", "-100,00"), ("02/10/2026", "PIX B", "-50,00")]
+    outubro = [("02/10/2026", "PIX B", "-50,00"), ("05/10/2026", "TED C", "1.200,00")]
+
+    resultados = [
+        conferir(
+            "exportações sobrepostas (Data, Detalhes e Valor)",
+            arquivos(planilha(setembro), planilha(outubro)),
+            linhas_esperadas=3, duplicadas_esperadas=1,
+        ),
+        conferir(
+            "pagamento repetido no mesmo arquivo",
+            arquivos(planilha(setembro + [setembro[1]]), planilha(outubro)),
+            linhas_esperadas=4, duplicadas_esperadas=1,
+        ),
+        conferir(
+            "contas diferentes (coluna Conta)",
+            arquivos(planilha(setembro, conta="001"), planilha(outubro, conta="002")),
+            linhas_esperadas=4, duplicadas_esperadas=0,
+        ),
+    ]
+    if not all(resultados):
+        sys.exit(1)
+    print("OK")
+
+if __name__ == "__main__":
+    main()
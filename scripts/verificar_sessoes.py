@@ -0,0 +1,151 @@
+"""
+Verificação do acompanhamento das sessões (memoria_sessao.py) em um servidor real.
+
+Sobe um `streamlit run` com um app mínimo que chama memoria_sessao.registrar() e medir() e grava
+as sessões do relatório em um arquivo, e conecta dois clientes websocket:
+  1. A roda o app uma vez (guardando um objeto grande) e fica parado, ainda conectado;
+  2. depois de --espera segundos, B roda o app: A (parada, mas conectada) precisa aparecer,
+     ainda com o objeto grande (a varredura de B só marca A, não mexe no estado dela);
+  3. B desconecta e A roda de novo: B não pode mais aparecer, e A liberou o objeto grande
+     no próprio run.
+
+Sai com código 1 se alguma das conferências falhar.
+
+Uso:
+    python scripts/verificar_sessoes.py --espera 5
+"""
+import subprocess
+import argparse
+import asyncio
+import tempfile
+import socket
+import json
+import sys
+import os
+
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+APP = '''
+import json, os, sys
+sys.path.append(os.environ["MINO_RAIZ"])
+import streamlit as st
+import memoria_sessao
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# Parada por mais da metade da espera já é inativa; a varredura roda a cada registrar()
+memoria_sessao.INATIVIDADE = float(os.environ["MINO_INATIVIDADE"])
+memoria_sessao.VARREDURA = 0
+
+memoria_sessao.registrar()
+# O relatório tem uma linha por chave: a sessão precisa de ao menos uma
+st.session_state["execucoes"] = st.session_state.get("execucoes", 0) + 1
+if st.session_state["execucoes"] == 1:
+    st.session_state["grande"] = bytes(2 * memoria_sessao.LIMITE_BYTES)
+memoria_sessao.medir()
+
+chaves = {}
+for linha in memoria_sessao.relatorio():
+    chaves.setdefault(linha["sessao"].split()[0], []).append(linha["chave"])
+with open(os.environ["MINO_SAIDA"], "w") as saida:
+    json.dump({"esta": get_script_run_ctx().session_id[:8], "chaves": chaves}, saida)
+'''
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+async def conectar(porta, tentativas=100):
+    for _ in range(tentativas):
+        try:
+            # Sem limite de tamanho: as páginas do app mandam tabelas inteiras em uma mensagem
+            return await websockets.connect(
+                f"ws://127.0.0.1:{porta}/_stcore/stream", subprotocols=["streamlit"], max_size=None
+            )
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError("O servidor do Streamlit não respondeu.")
+
+async def rodar(websocket, caminho_saida):
+    """Pede um rerun e espera o fim do script; retorna o que o app gravou."""
+    mensagem = BackMsg()
+    mensagem.rerun_script.query_string = ""
+    await websocket.send(mensagem.SerializeToString())
+    while True:
+        resposta = ForwardMsg()
+        resposta.ParseFromString(await websocket.recv())
+        if resposta.WhichOneof("type") == "script_finished":
+            with open(caminho_saida) as saida:
+                return json.load(saida)
+
+async def verificar(porta, caminho_saida, espera):
+    falhas = []
+
+    cliente_a = await conectar(porta)
+    sessao_a = (await rodar(cliente_a, caminho_saida))["esta"]
+
+    await asyncio.sleep(espera)
+    cliente_b = await conectar(porta)
+    relatorio = await rodar(cliente_b, caminho_saida)
+    sessao_b = relatorio["esta"]
+    print(f"Após {espera}s parada, chaves das sessões acompanhadas: {relatorio['chaves']}")
+    if sessao_a not in relatorio["chaves"]:
+        falhas.append("a sessão parada (ainda conectada) deixou de ser acompanhada")
+    elif "grande" not in relatorio["chaves"][sessao_a]:
+        falhas.append("o objeto grande da sessão parada foi removido por outra sessão")
+
+    await cliente_b.close()
+    await asyncio.sleep(1)
+    relatorio = await rodar(cliente_a, caminho_saida)
+    print(f"Após a desconexão de B, chaves das sessões acompanhadas: {relatorio['chaves']}")
+    if sessao_b in relatorio["chaves"]:
+        falhas.append("a sessão desconectada continua acompanhada")
+    if "grande" in relatorio["chaves"].get(sessao_a, []):
+        falhas.append("a sessão marcada como inativa não liberou o objeto grande no próprio run")
+
+    await cliente_a.close()
+    return falhas
+
+def iniciar_servidor(caminho_app, porta, ambiente):
+    comando = [
+        sys.executable, "-m", "streamlit", "run", caminho_app,
+        "--server.port", str(porta),
+        "--server.headless", "true",
+        "--server.runOnSave", "false",
+        "--browser.gatherUsageStats", "false",
+    ]
+    return subprocess.Popen(comando, env=ambiente, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--espera", type=float, default=5, help="Tempo que a sessão A fica parada (segundos)")
+    args = parser.parse_args()
+
+    pasta = tempfile.mkdtemp(prefix="mino-sessoes-")
+    caminho_app = os.path.join(pasta, "app_sessoes.py")
+    caminho_saida = os.path.join(pasta, "saida.json")
+    with open(caminho_app, "w") as arquivo:
+        arquivo.write(APP)
+
+    porta = porta_livre()
+    servidor = iniciar_servidor(caminho_app, porta, dict(
+        os.environ, MINO_RAIZ=RAIZ, MINO_SAIDA=caminho_saida, MINO_INATIVIDADE=str(args.espera / 2)
+    ))
+    try:
+        falhas = asyncio.run(verificar(porta, caminho_saida, args.espera))
+    finally:
+        servidor.terminate()
+        servidor.wait()
+
+    for falha in falhas:
+        print(f"FALHA: {falha}")
+    if falhas:
+        sys.exit(1)
+    print("OK")
+
+if __name__ == "__main__":
+    main()
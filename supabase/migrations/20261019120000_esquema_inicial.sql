@@ -0,0 +1,61 @@
+-- Esquema inicial do Mino Manager: obras e movimentações.
+-- Cria o esquema do zero em um banco local. No projeto hospedado as tabelas já
+-- existem, e "create table if not exists" não confere colunas nem tipos: antes de
+-- aplicar lá, compare com o esquema hospedado (supabase db diff --linked).
+
+create table if not exists public.obras (
+    id bigint generated by default as identity primary key,
+    "Nome" text not null,
+    "Endereço" text,
+    "Cliente_Nome" text,
+    "Cliente_CPF" text,
+    "Orçamento" numeric(14, 2) not null default 0,
+    "Data_Início" date,
+    "Data_Fim" date
+);
+
+create table if not exists public.movimentacoes (
+    id bigint generated by default as identity primary key,
+    obra_id bigint not null references public.obras (id),
+    "Data" date not null,
+    "Detalhes" text,
+    "Valor" numeric(14, 2) not null,
+    "Categoria" text,
+    "Descrição" text,
+    "Itens" jsonb
+);
+
+-- Chave do upsert de utils.gravar_movimentacoes
+-- (on_conflict="obra_id,Data,Detalhes,Valor,Categoria,Descrição", ignore_duplicates=True).
+-- O PostgREST exige uma constraint única com exatamente essas colunas.
+-- NULLS NOT DISTINCT (Postgres 15+): lançamentos manuais têm "Detalhes" vazio, e com a
+-- unique padrão (NULLs distintos) a mesma linha manual poderia ser gravada sem limite.
+-- A constraint é conferida pela definição, não pelo nome: uma chave com o mesmo nome e
+-- outras colunas (ou sem NULLS NOT DISTINCT) é substituída.
+do $$
+declare
+    repetidas bigint;
+begin
+    if not exists (
+        select 1 from pg_constraint
+        where conrelid = 'public.movimentacoes'::regclass
+          and contype = 'u'
+          and pg_get_constraintdef(oid) = 'UNIQUE NULLS NOT DISTINCT (obra_id, "Data", "Detalhes", "Valor", "Categoria", "Descrição")'
+    ) then
+        -- Linhas que a chave nova recusaria: a migração para aqui em vez de apagar dados
+        select count(*) into repetidas from (
+            select 1 from public.movimentacoes
+            group by obra_id, "Data", "Detalhes", "Valor", "Categoria", "Descrição"
+            having count(*) > 1
+        ) g;
+        if repetidas > 0 then
+            raise exception 'movimentacoes tem % grupo(s) de linhas repetidas na chave do upsert; resolva-os antes de aplicar a migração', repetidas;
+        end if;
+
+        alter table public.movimentacoes drop constraint if exists movimentacoes_chave_unica;
+        alter table public.movimentacoes
+            add constraint movimentacoes_chave_unica
+            unique nulls not distinct (obra_id, "Data", "Detalhes", "Valor", "Categoria", "Descrição");
+    end if;
+end
+$$;
@@ -0,0 +1,16 @@
+-- Índices para as consultas mais frequentes do app.
+-- Conferidos com scripts/verificar_planos.py.
+
+-- Consulta de Obra e filtros de período: movimentacoes?obra_id=eq.X (&Data=gte/lte).
+-- A constraint única também começa por (obra_id, "Data"), mas carrega as outras
+-- quatro colunas; este índice é bem menor e mais barato de percorrer.
+create index if not exists movimentacoes_obra_data
+    on public.movimentacoes (obra_id, "Data");
+
+-- Consulta de Material: movimentacoes?Categoria=eq.Material
+create index if not exists movimentacoes_categoria
+    on public.movimentacoes ("Categoria");
+
+-- Buscas dentro dos itens de material: "Itens" @> '[{"Item": "..."}]'
+create index if not exists movimentacoes_itens
+    on public.movimentacoes using gin ("Itens" jsonb_path_ops);
@@ -0,0 +1,66 @@
+-- Itens das compras de Material em uma tabela própria, no lugar do array JSON
+-- em movimentacoes."Itens": com colunas tipadas e índices, as análises por Item
+-- e Subcategoria viram GROUP BYs no banco.
+
+create table if not exists public.movimentacao_itens (
+    id bigint generated by default as identity primary key,
+    movimentacao_id bigint not null references public.movimentacoes (id) on delete cascade,
+    "Item" text not null,
+    "Subcategoria" text,
+    "Quantidade" numeric(14, 3),
+    "Valor" numeric(14, 2) not null default 0
+);
+
+create index if not exists movimentacao_itens_movimentacao
+    on public.movimentacao_itens (movimentacao_id);
+create index if not exists movimentacao_itens_subcategoria
+    on public.movimentacao_itens ("Subcategoria");
+create index if not exists movimentacao_itens_item
+    on public.movimentacao_itens ("Item");
+
+-- Backfill a partir do JSON, na ordem original dos itens.
+-- Idempotente: movimentações que já têm itens na tabela nova são puladas.
+insert into public.movimentacao_itens (movimentacao_id, "Item", "Subcategoria", "Quantidade", "Valor")
+select
+    m.id,
+    coalesce(e.item ->> 'Item', ''),
+    e.item ->> 'Subcategoria',
+    (e.item ->> 'Quantidade')::numeric,
+    coalesce((e.item ->> 'Valor')::numeric, 0)
+from public.movimentacoes m
+cross join lateral jsonb_array_elements(m."Itens") with ordinality as e (item, posicao)
+where jsonb_typeof(m."Itens") = 'array'
+  and not exists (select 1 from public.movimentacao_itens i where i.movimentacao_id = m.id)
+order by m.id, e.posicao;
+
+-- A coluna "Itens" deixa de ser escrita pelo app (utils.gravar_movimentacoes grava
+-- na tabela nova) e fica só como cópia do histórico até ser removida.
+comment on column public.movimentacoes."Itens" is
+    'Obsoleta: os itens ficam em movimentacao_itens (backfill em 20261019120200).';
+
+-- Uma linha por item, com a obra e a data da compra (Consulta de Material)
+create or replace view public.materiais_itens with (security_invoker = true) as
+select
+    i.id,
+    i.movimentacao_id,
+    m.obra_id,
+    m."Data",
+    m."Descrição",
+    i."Item",
+    i."Subcategoria",
+    i."Quantidade",
+    i."Valor"
+from public.movimentacao_itens i
+join public.movimentacoes m on m.id = i.movimentacao_id;
+
+-- Consumo e gasto por obra e subcategoria, agregados no banco
+create or replace view public.materiais_por_obra with (security_invoker = true) as
+select
+    m.obra_id,
+    i."Subcategoria",
+    sum(i."Quantidade") as "Quantidade",
+    sum(i."Valor") as "Valor",
+    count(*) as "Compras"
+from public.movimentacao_itens i
+join public.movimentacoes m on m.id = i.movimentacao_id
+group by m.obra_id, i."Subcategoria";
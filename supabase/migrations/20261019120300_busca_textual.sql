@@ -0,0 +1,101 @@
+-- Busca textual em todas as movimentações (página Busca): "Detalhes", "Descrição"
+-- e nomes dos itens de material, sem diferenciar acentos e maiúsculas.
+-- Índices de trigramas (pg_trgm) atendem tanto trechos no meio do texto
+-- (número de documento, parte de um nome) quanto erros de digitação.
+
+create extension if not exists pg_trgm with schema extensions;
+create extension if not exists unaccent with schema extensions;
+
+-- Forma normalizada do texto usada nos índices e na busca (sem acentos, minúscula).
+-- O unaccent() de um argumento não é imutável (depende do search_path); com o
+-- dicionário explícito a função pode ser declarada imutável e usada em índices.
+create or replace function public.texto_busca(texto text)
+returns text
+language sql
+immutable
+parallel safe
+strict
+as $$
+    select lower(extensions.unaccent('extensions.unaccent'::regdictionary, texto))
+$$;
+
+create index if not exists movimentacoes_busca_detalhes
+    on public.movimentacoes using gin (public.texto_busca("Detalhes") extensions.gin_trgm_ops);
+create index if not exists movimentacoes_busca_descricao
+    on public.movimentacoes using gin (public.texto_busca("Descrição") extensions.gin_trgm_ops);
+create index if not exists movimentacao_itens_busca_item
+    on public.movimentacao_itens using gin (public.texto_busca("Item") extensions.gin_trgm_ops);
+
+-- Movimentações que contêm o termo (ou algo parecido) em algum dos campos, da mais para a
+-- menos relevante, uma página por chamada. Chamada pelo app via supabase.rpc("buscar_movimentacoes").
+--   relevancia: 1 + similaridade quando o termo aparece inteiro, só a similaridade quando é parecido
+--   "Itens":    nomes dos itens de material que casaram com o termo
+--   total:      quantidade de movimentações encontradas (para a paginação)
+create or replace function public.buscar_movimentacoes(termo text, limite integer default 25, deslocamento integer default 0)
+returns table (
+    id bigint,
+    obra_id bigint,
+    "Data" date,
+    "Categoria" text,
+    "Valor" numeric,
+    "Detalhes" text,
+    "Descrição" text,
+    "Itens" text,
+    relevancia real,
+    total bigint
+)
+language sql
+stable
+security invoker
+set search_path = public, extensions
+as $$
+    with consulta as (
+        select
+            t,
+            -- Termo escapado para o LIKE (%, _ e \ digitados são literais)
+            '%' || replace(replace(replace(t, '\', '\\'), '%', '\%'), '_', '\_') || '%' as padrao
+        from (select public.texto_busca(btrim(termo)) as t) normalizado
+    ),
+    encontradas as (
+        select
+            m.id,
+            greatest(
+                case when public.texto_busca(m."Detalhes") like c.padrao then 1 else 0 end
+                    + word_similarity(c.t, coalesce(public.texto_busca(m."Detalhes"), '')),
+                case when public.texto_busca(m."Descrição") like c.padrao then 1 else 0 end
+                    + word_similarity(c.t, coalesce(public.texto_busca(m."Descrição"), ''))
+            ) as relevancia,
+            null::text as item
+        from public.movimentacoes m, consulta c
+        where public.texto_busca(m."Detalhes") like c.padrao
+           or public.texto_busca(m."Descrição") like c.padrao
+           or c.t <% public.texto_busca(m."Detalhes")
+           or c.t <% public.texto_busca(m."Descrição")
+
+        union all
+
+        select
+            i.movimentacao_id,
+            case when public.texto_busca(i."Item") like c.padrao then 1 else 0 end
+                + word_similarity(c.t, public.texto_busca(i."Item")),
+            i."Item"
+        from public.movimentacao_itens i, consulta c
+        where public.texto_busca(i."Item") like c.padrao
+           or c.t <% public.texto_busca(i."Item")
+    ),
+    por_movimentacao as (
+        select
+            e.id,
+            max(e.relevancia)::real as relevancia,
+            string_agg(distinct e.item, ', ') as itens,
+            count(*) over () as total
+        from encontradas e
+        group by e.id
+    )
+    select m.id, m.obra_id, m."Data", m."Categoria", m."Valor", m."Detalhes", m."Descrição", p.itens, p.relevancia, p.total
+    from por_movimentacao p
+    join public.movimentacoes m on m.id = p.id
+    order by p.relevancia desc, m."Data" desc, m.id desc
+    limit greatest(limite, 0)
+    offset greatest(deslocamento, 0)
+$$;
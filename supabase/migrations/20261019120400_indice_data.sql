@@ -0,0 +1,5 @@
+-- Filtro de período do Painel de Controle (todas as obras): movimentacoes?Data=gte.X&Data=lte.Y.
+-- O índice (obra_id, "Data") só atende o período de uma obra; sem obra_id o banco
+-- teria de ler a tabela inteira para devolver um mês.
+create index if not exists movimentacoes_data
+    on public.movimentacoes ("Data");
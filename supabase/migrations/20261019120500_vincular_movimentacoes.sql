@@ -0,0 +1,16 @@
+-- Conciliação do extrato (4_extrato.py): vincula de uma vez os lançamentos manuais
+-- às linhas do extrato que os pagaram, gravando nelas o "Detalhes" do extrato.
+-- vinculos: [{"id": 1, "Detalhes": "PIX ..."}, ...]. Só lançamentos ainda sem "Detalhes"
+-- são alterados (um vínculo já feito por outra sessão não é sobrescrito).
+-- Retorna os ids efetivamente vinculados.
+create or replace function public.vincular_movimentacoes(vinculos jsonb)
+returns setof bigint
+language sql
+as $$
+    update public.movimentacoes m
+    set "Detalhes" = v."Detalhes"
+    from jsonb_to_recordset(vinculos) as v (id bigint, "Detalhes" text)
+    where m.id = v.id
+      and m."Detalhes" is null
+    returning m.id
+$$;
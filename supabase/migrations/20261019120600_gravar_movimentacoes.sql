@@ -0,0 +1,62 @@
+-- Gravação das movimentações e dos itens de material em uma única transação.
+-- Antes, utils.gravar_movimentacoes fazia o upsert das movimentações e depois o
+-- insert dos itens em outro request; se o segundo falhasse, as movimentações já
+-- gravadas eram apagadas à mão, e uma queda entre os dois deixava compras sem itens.
+-- Uma chamada RPC roda inteira em uma transação: ou grava tudo, ou nada.
+--
+-- linhas: [{"obra_id": 1, "Data": "2026-10-19", "Detalhes": null, "Valor": 10.5,
+--           "Categoria": "Material", "Descrição": "...", "Itens": [{"Item": ..., ...}]}, ...]
+-- Linhas que já existem (mesma chave única) são ignoradas, sem itens.
+-- Retorna os ids das movimentações efetivamente inseridas.
+create or replace function public.gravar_movimentacoes(linhas jsonb)
+returns setof bigint
+language plpgsql
+as $$
+declare
+    linha jsonb;
+    novo_id bigint;
+begin
+    for linha in select value from jsonb_array_elements(linhas) loop
+        insert into public.movimentacoes (obra_id, "Data", "Detalhes", "Valor", "Categoria", "Descrição")
+        values (
+            (linha ->> 'obra_id')::bigint,
+            (linha ->> 'Data')::date,
+            linha ->> 'Detalhes',
+            (linha ->> 'Valor')::numeric,
+            linha ->> 'Categoria',
+            linha ->> 'Descrição'
+        )
+        on conflict on constraint movimentacoes_chave_unica do nothing
+        returning id into novo_id;
+
+        if novo_id is not null then
+            -- Itens na ordem em que foram lançados
+            insert into public.movimentacao_itens (movimentacao_id, "Item", "Subcategoria", "Quantidade", "Valor")
+            select
+                novo_id,
+                coalesce(e.item ->> 'Item', ''),
+                e.item ->> 'Subcategoria',
+                (e.item ->> 'Quantidade')::numeric,
+                coalesce((e.item ->> 'Valor')::numeric, 0)
+            from jsonb_array_elements(coalesce(linha -> 'Itens', '[]'::jsonb)) with ordinality as e (item, posicao)
+            order by e.posicao;
+
+            return next novo_id;
+        end if;
+    end loop;
+end
+$$;
+
+-- "Compras" era count(*) sobre os itens, não sobre as compras: a coluna passa a se
+-- chamar "Itens". Renomear coluna de view exige recriá-la.
+drop view if exists public.materiais_por_obra;
+create view public.materiais_por_obra with (security_invoker = true) as
+select
+    m.obra_id,
+    i."Subcategoria",
+    sum(i."Quantidade") as "Quantidade",
+    sum(i."Valor") as "Valor",
+    count(*) as "Itens"
+from public.movimentacao_itens i
+join public.movimentacoes m on m.id = i.movimentacao_id
+group by m.obra_id, i."Subcategoria";
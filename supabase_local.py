@@ -0,0 +1,557 @@
+import unicodedata
+import threading
+import datetime
+import sqlite3
+import random
+import json
+import uuid
+import csv
+import re
+import io
+import os
+
+from types import SimpleNamespace
+
+from postgrest.exceptions import APIError
+
+# --- Supabase Local (SQLite) ---
+# Substituto do cliente do Supabase para testes e benchmarks sem rede.
+# Implementa o subconjunto do query builder (PostgREST) e do auth usado pelo app,
+# sobre um banco SQLite com o esquema de supabase/migrations (traduzido para SQLite):
+# upsert com on_conflict/ignore_duplicates, colunas JSON e leitura em CSV.
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS obras (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    "Nome" TEXT NOT NULL,
+    "Endereço" TEXT,
+    "Cliente_Nome" TEXT,
+    "Cliente_CPF" TEXT,
+    "Orçamento" REAL,
+    "Data_Início" TEXT,
+    "Data_Fim" TEXT
+);
+
+CREATE TABLE IF NOT EXISTS movimentacoes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    obra_id INTEGER NOT NULL REFERENCES obras (id),
+    "Data" TEXT NOT NULL,
+    "Detalhes" TEXT,
+    "Valor" REAL NOT NULL,
+    "Categoria" TEXT,
+    "Descrição" TEXT,
+    "Itens" TEXT,
+    UNIQUE (obra_id, "Data", "Detalhes", "Valor", "Categoria", "Descrição")
+);
+
+-- UNIQUE NULLS NOT DISTINCT do Postgres: o SQLite não tem, e a UNIQUE acima (alvo do
+-- ON CONFLICT) deixa passar NULLs repetidos. Este índice compara NULL como um valor
+-- (X'' é um blob, diferente de qualquer texto, inclusive do vazio).
+CREATE UNIQUE INDEX IF NOT EXISTS movimentacoes_chave_unica ON movimentacoes (
+    obra_id, "Data", coalesce("Detalhes", X''), "Valor", coalesce("Categoria", X''), coalesce("Descrição", X'')
+);
+
+CREATE INDEX IF NOT EXISTS movimentacoes_obra_data ON movimentacoes (obra_id, "Data");
+CREATE INDEX IF NOT EXISTS movimentacoes_categoria ON movimentacoes ("Categoria");
+CREATE INDEX IF NOT EXISTS movimentacoes_data ON movimentacoes ("Data");
+
+CREATE TABLE IF NOT EXISTS movimentacao_itens (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    movimentacao_id INTEGER NOT NULL REFERENCES movimentacoes (id) ON DELETE CASCADE,
+    "Item" TEXT NOT NULL,
+    "Subcategoria" TEXT,
+    "Quantidade" REAL,
+    "Valor" REAL NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS movimentacao_itens_movimentacao ON movimentacao_itens (movimentacao_id);
+CREATE INDEX IF NOT EXISTS movimentacao_itens_subcategoria ON movimentacao_itens ("Subcategoria");
+CREATE INDEX IF NOT EXISTS movimentacao_itens_item ON movimentacao_itens ("Item");
+
+CREATE VIEW IF NOT EXISTS materiais_itens AS
+SELECT i.id, i.movimentacao_id, m.obra_id, m."Data", m."Descrição", i."Item", i."Subcategoria", i."Quantidade", i."Valor"
+FROM movimentacao_itens i
+JOIN movimentacoes m ON m.id = i.movimentacao_id;
+
+CREATE VIEW IF NOT EXISTS materiais_por_obra AS
+SELECT m.obra_id, i."Subcategoria", SUM(i."Quantidade") AS "Quantidade", SUM(i."Valor") AS "Valor", COUNT(*) AS "Itens"
+FROM movimentacao_itens i
+JOIN movimentacoes m ON m.id = i.movimentacao_id
+GROUP BY m.obra_id, i."Subcategoria";
+"""
+
+# Colunas guardadas como texto JSON no SQLite (jsonb no Postgres)
+COLUNAS_JSON = {"movimentacoes": {"Itens"}}
+
+# Códigos de erro do Postgres/PostgREST devolvidos no APIError, como o cliente real
+_CODIGOS_ERRO = [
+    ("UNIQUE constraint failed", "23505"),
+    ("FOREIGN KEY constraint failed", "23503"),
+    ("NOT NULL constraint failed", "23502"),
+    ("has no column named", "PGRST204"),
+    ("no such column", "42703"),
+    ("no such table", "42P01"),
+]
+
+def _q(nome):
+    """Identificador entre aspas (as colunas têm maiúsculas e acentos)."""
+    return '"' + nome.replace('"', '""') + '"'
+
+def _valor_sql(valor):
+    if isinstance(valor, (datetime.date, datetime.datetime)):
+        return valor.isoformat()
+    return valor
+
+class _Banco:
+    """
+    Banco SQLite compartilhado pelos clientes criados sobre ele.
+    Em memória (caminho=None) cada processo fica com a sua cópia; com um arquivo,
+    processos diferentes (ex.: sessões do teste de carga) enxergam as mesmas gravações.
+    """
+
+    def __init__(self, caminho=None):
+        self.caminho = caminho
+        self.rpcs = {
+            "buscar_movimentacoes": _buscar_movimentacoes,
+            "vincular_movimentacoes": _vincular_movimentacoes,
+            "gravar_movimentacoes": _gravar_movimentacoes,
+        }
+        self._lock = threading.RLock()
+        self._pid = None
+        self._conexao = None
+        self._abrir()
+
+    def _abrir(self):
+        conexao = sqlite3.connect(self.caminho or ":memory:", timeout=30, isolation_level=None, check_same_thread=False)
+        conexao.row_factory = sqlite3.Row
+        conexao.execute("PRAGMA foreign_keys=ON")
+        conexao.create_function("relevancia_busca", 2, _relevancia_busca, deterministic=True)
+        if self.caminho:
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("PRAGMA synchronous=NORMAL")
+        conexao.executescript(ESQUEMA)
+        self._conexao = conexao
+        self._pid = os.getpid()
+
+    def executar(self, sql, parametros=()):
+        """Executa um comando e retorna as linhas como dicts."""
+        with self._lock:
+            # Conexões SQLite não atravessam um fork: o processo filho abre a sua
+            if self.caminho and self._pid != os.getpid():
+                self._abrir()
+            try:
+                return [dict(linha) for linha in self._conexao.execute(sql, parametros).fetchall()]
+            except sqlite3.Error as e:
+                mensagem = str(e)
+                codigo = next((c for trecho, c in _CODIGOS_ERRO if trecho in mensagem), None)
+                raise APIError({"message": mensagem, "code": codigo, "details": None, "hint": None}) from e
+
+    def colunas(self, tabela):
+        return [linha["name"] for linha in self.executar(f"PRAGMA table_info({_q(tabela)})")]
+
+class _Consulta:
+    """Query builder no formato do postgrest-py: table(...).select(...).eq(...).execute()."""
+
+    def __init__(self, banco, tabela):
+        self._banco = banco
+        self._tabela = tabela
+        self._colunas = "*"
+        self._filtros = []
+        self._parametros = []
+        self._ordem = []
+        self._limite = None
+        self._deslocamento = None
+        self._formato_csv = False
+        self._operacao = ("select", None)
+
+    # --- Operações ---
+
+    def select(self, colunas="*"):
+        self._colunas = colunas
+        return self
+
+    def insert(self, linhas):
+        self._operacao = ("insert", {"linhas": linhas, "on_conflict": None, "ignore_duplicates": False, "upsert": False})
+        return self
+
+    def upsert(self, linhas, on_conflict=None, ignore_duplicates=False):
+        self._operacao = ("insert", {"linhas": linhas, "on_conflict": on_conflict, "ignore_duplicates": ignore_duplicates, "upsert": True})
+        return self
+
+    def update(self, valores):
+        self._operacao = ("update", valores)
+        return self
+
+    def delete(self):
+        self._operacao = ("delete", None)
+        return self
+
+    # --- Filtros ---
+
+    def _filtro(self, coluna, operador, valor):
+        self._filtros.append(f"{_q(coluna)} {operador} ?")
+        self._parametros.append(_valor_sql(valor))
+        return self
+
+    def eq(self, coluna, valor):
+        return self._filtro(coluna, "=", valor)
+
+    def neq(self, coluna, valor):
+        return self._filtro(coluna, "<>", valor)
+
+    def gt(self, coluna, valor):
+        return self._filtro(coluna, ">", valor)
+
+    def gte(self, coluna, valor):
+        return self._filtro(coluna, ">=", valor)
+
+    def lt(self, coluna, valor):
+        return self._filtro(coluna, "<", valor)
+
+    def lte(self, coluna, valor):
+        return self._filtro(coluna, "<=", valor)
+
+    def like(self, coluna, padrao):
+        # O PostgREST aceita * como curinga além de %
+        return self._filtro(coluna, "LIKE", padrao.replace("*", "%"))
+
+    def ilike(self, coluna, padrao):
+        self._filtros.append(f"LOWER({_q(coluna)}) LIKE LOWER(?)")
+        self._parametros.append(padrao.replace("*", "%"))
+        return self
+
+    def in_(self, coluna, valores):
+        valores = [_valor_sql(v) for v in valores]
+        self._filtros.append(f"{_q(coluna)} IN ({', '.join('?' * len(valores))})" if valores else "0")
+        self._parametros.extend(valores)
+        return self
+
+    def is_(self, coluna, valor):
+        # is_("coluna", "null") / is_("coluna", "not.null")
+        self._filtros.append(f"{_q(coluna)} IS {'NOT ' if str(valor).startswith('not') else ''}NULL")
+        return self
+
+    # --- Modificadores ---
+
+    def order(self, coluna, desc=False):
+        self._ordem.append(f"{_q(coluna)} {'DESC' if desc else 'ASC'}")
+        return self
+
+    def limit(self, quantidade):
+        self._limite = quantidade
+        return self
+
+    def range(self, inicio, fim):
+        self._deslocamento = inicio
+        self._limite = fim - inicio + 1
+        return self
+
+    def csv(self):
+        """Resultado em text/csv, como o Accept: text/csv do PostgREST."""
+        self._formato_csv = True
+        return self
+
+    # --- Execução ---
+
+    def _colunas_sql(self):
+        if self._colunas.strip() == "*":
+            return "*"
+        return ", ".join(_q(c.strip().strip('"')) for c in self._colunas.split(","))
+
+    def _where(self):
+        return f" WHERE {' AND '.join(self._filtros)}" if self._filtros else ""
+
+    def _decodificar(self, linhas):
+        for coluna in COLUNAS_JSON.get(self._tabela, ()):
+            for linha in linhas:
+                if linha.get(coluna) is not None:
+                    linha[coluna] = json.loads(linha[coluna])
+        return linhas
+
+    def _codificar(self, linha):
+        colunas_json = COLUNAS_JSON.get(self._tabela, ())
+        return {
+            coluna: json.dumps(valor, ensure_ascii=False) if coluna in colunas_json and valor is not None else _valor_sql(valor)
+            for coluna, valor in linha.items()
+        }
+
+    def _inserir(self, linhas, on_conflict, ignore_duplicates, upsert):
+        linhas = [self._codificar(linha) for linha in (linhas if isinstance(linhas, list) else [linhas])]
+        if not linhas:
+            return []
+
+        # Como o PostgREST em lote: a união das chaves, com NULL onde a linha não tem a coluna
+        colunas = list(dict.fromkeys(coluna for linha in linhas for coluna in linha))
+        sql = f"INSERT INTO {_q(self._tabela)} ({', '.join(map(_q, colunas))}) VALUES ({', '.join('?' * len(colunas))})"
+
+        if upsert:
+            chave = [c.strip() for c in on_conflict.split(",")] if on_conflict else ["id"]
+            if ignore_duplicates:
+                # Sem alvo: também ignora o que o índice NULLS NOT DISTINCT recusar
+                sql += " ON CONFLICT DO NOTHING"
+            else:
+                atualizar = [c for c in colunas if c not in chave]
+                sql += f" ON CONFLICT ({', '.join(map(_q, chave))}) DO " + (
+                    f"UPDATE SET {', '.join(f'{_q(c)} = excluded.{_q(c)}' for c in atualizar)}" if atualizar else "NOTHING"
+                )
+        sql += " RETURNING *"
+
+        # Uma transação por chamada, como um request do PostgREST
+        inseridas = []
+        with self._banco._lock:
+            self._banco.executar("BEGIN")
+            try:
+                for linha in linhas:
+                    inseridas.extend(self._banco.executar(sql, [linha.get(c) for c in colunas]))
+                self._banco.executar("COMMIT")
+            except Exception:
+                self._banco.executar("ROLLBACK")
+                raise
+        return self._decodificar(inseridas)
+
+    def execute(self):
+        operacao, argumentos = self._operacao
+        tabela = _q(self._tabela)
+
+        if operacao == "insert":
+            dados = self._inserir(**argumentos)
+        elif operacao == "update":
+            valores = self._codificar(argumentos)
+            sql = f"UPDATE {tabela} SET {', '.join(f'{_q(c)} = ?' for c in valores)}{self._where()} RETURNING *"
+            dados = self._decodificar(self._banco.executar(sql, list(valores.values()) + self._parametros))
+        elif operacao == "delete":
+            dados = self._decodificar(self._banco.executar(f"DELETE FROM {tabela}{self._where()} RETURNING *", self._parametros))
+        else:
+            sql = f"SELECT {self._colunas_sql()} FROM {tabela}{self._where()}"
+            if self._ordem:
+                sql += f" ORDER BY {', '.join(self._ordem)}"
+            if self._limite is not None:
+                sql += f" LIMIT {int(self._limite)}"
+                if self._deslocamento:
+                    sql += f" OFFSET {int(self._deslocamento)}"
+            linhas = self._banco.executar(sql, self._parametros)
+            dados = self._para_csv(linhas) if self._formato_csv else self._decodificar(linhas)
+
+        return SimpleNamespace(data=dados, count=None)
+
+    def _para_csv(self, linhas):
+        # As colunas JSON já estão como texto no SQLite, igual ao CSV do PostgREST; NULL vira campo vazio
+        if not linhas:
+            return ""
+        saida = io.StringIO()
+        escritor = csv.writer(saida, lineterminator="\n")
+        escritor.writerow(linhas[0].keys())
+        escritor.writerows(["" if v is None else v for v in linha.values()] for linha in linhas)
+        return saida.getvalue()
+
+class _Rpc:
+    def __init__(self, banco, nome, parametros):
+        self._banco = banco
+        self._nome = nome
+        self._parametros = parametros or {}
+
+    def execute(self):
+        if self._nome not in self._banco.rpcs:
+            raise APIError({"message": f"Could not find the function public.{self._nome}", "code": "PGRST202", "details": None, "hint": None})
+        return SimpleNamespace(data=self._banco.rpcs[self._nome](self._banco, **self._parametros), count=None)
+
+# --- Busca Textual ---
+# Equivalente da função buscar_movimentacoes de supabase/migrations (pg_trgm + unaccent).
+# Sem índice de trigramas no SQLite: a busca percorre as tabelas, o que basta para testes.
+
+# Similaridade mínima para um texto parecido contar como resultado (pg_trgm.word_similarity_threshold)
+LIMIAR_SIMILARIDADE = 0.6
+
+def _texto_busca(texto):
+    decomposto = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in decomposto if not unicodedata.combining(c)).lower()
+
+def _trigramas(texto):
+    # Como no pg_trgm: cada palavra com dois espaços antes e um depois
+    return {
+        f"  {palavra} "[i:i + 3]
+        for palavra in re.findall(r"\w+", texto)
+        for i in range(len(palavra) + 1)
+    }
+
+def _relevancia_busca(termo, texto):
+    """1 + similaridade se o termo aparece no texto, a similaridade se é parecido, senão 0."""
+    if not termo or not texto:
+        return 0.0
+    texto = _texto_busca(texto)
+    trigramas_termo = _trigramas(termo)
+    similaridade = len(trigramas_termo & _trigramas(texto)) / len(trigramas_termo) if trigramas_termo else 0.0
+    if termo in texto:
+        return 1.0 + similaridade
+    return similaridade if similaridade >= LIMIAR_SIMILARIDADE else 0.0
+
+def _buscar_movimentacoes(banco, termo, limite=25, deslocamento=0):
+    return banco.executar("""
+        WITH encontradas AS (
+            SELECT id, MAX(relevancia_busca(:termo, "Detalhes"), relevancia_busca(:termo, "Descrição")) AS relevancia, NULL AS item
+            FROM movimentacoes
+            UNION ALL
+            SELECT movimentacao_id, relevancia_busca(:termo, "Item"), "Item"
+            FROM movimentacao_itens
+        ),
+        por_movimentacao AS (
+            SELECT id, MAX(relevancia) AS relevancia, GROUP_CONCAT(DISTINCT item) AS itens
+            FROM encontradas
+            WHERE relevancia > 0
+            GROUP BY id
+        )
+        SELECT m.id, m.obra_id, m."Data", m."Categoria", m."Valor", m."Detalhes", m."Descrição",
+               REPLACE(p.itens, ',', ', ') AS "Itens", p.relevancia, COUNT(*) OVER () AS total
+        FROM por_movimentacao p
+        JOIN movimentacoes m ON m.id = p.id
+        ORDER BY p.relevancia DESC, m."Data" DESC, m.id DESC
+        LIMIT :limite OFFSET :deslocamento
+    """, {"termo": _texto_busca(termo.strip()), "limite": max(limite, 0), "deslocamento": max(deslocamento, 0)})
+
+# --- Conciliação do Extrato ---
+# Equivalente da função vincular_movimentacoes de supabase/migrations: um único UPDATE.
+
+def _vincular_movimentacoes(banco, vinculos):
+    if not vinculos:
+        return []
+    linhas = banco.executar("""
+        UPDATE movimentacoes
+        SET "Detalhes" = vinculos."Detalhes"
+        FROM (SELECT json_extract(value, '$.id') AS id, json_extract(value, '$.Detalhes') AS "Detalhes" FROM json_each(?)) AS vinculos
+        WHERE movimentacoes.id = vinculos.id
+          AND movimentacoes."Detalhes" IS NULL
+        RETURNING movimentacoes.id
+    """, (json.dumps(vinculos, ensure_ascii=False),))
+    return [linha["id"] for linha in linhas]
+
+# --- Gravação de Movimentações ---
+# Equivalente da função gravar_movimentacoes de supabase/migrations: movimentações e
+# itens na mesma transação (um erro nos itens desfaz também as movimentações).
+
+COLUNAS_MOVIMENTACAO = ["obra_id", "Data", "Detalhes", "Valor", "Categoria", "Descrição"]
+COLUNAS_ITEM = ["Item", "Subcategoria", "Quantidade", "Valor"]
+
+def _gravar_movimentacoes(banco, linhas):
+    inseridos = []
+    with banco._lock:
+        banco.executar("BEGIN")
+        try:
+            for linha in linhas:
+                novas = banco.executar(
+                    f"INSERT INTO movimentacoes ({', '.join(map(_q, COLUNAS_MOVIMENTACAO))}) "
+                    f"VALUES ({', '.join('?' * len(COLUNAS_MOVIMENTACAO))}) ON CONFLICT DO NOTHING RETURNING id",
+                    [_valor_sql(linha.get(c)) for c in COLUNAS_MOVIMENTACAO],
+                )
+                if not novas:
+                    continue
+                movimentacao_id = novas[0]["id"]
+                for item in linha.get("Itens") or []:
+                    banco.executar(
+                        f"INSERT INTO movimentacao_itens (movimentacao_id, {', '.join(map(_q, COLUNAS_ITEM))}) VALUES (?, ?, ?, ?, ?)",
+                        [movimentacao_id, item.get("Item") or "", item.get("Subcategoria"), item.get("Quantidade"), item.get("Valor") or 0],
+                    )
+                inseridos.append(movimentacao_id)
+            banco.executar("COMMIT")
+        except Exception:
+            banco.executar("ROLLBACK")
+            raise
+    return inseridos
+
+class _Auth:
+    def __init__(self, usuarios):
+        self._usuarios = usuarios
+
+    def _sessao(self, email):
+        usuario = SimpleNamespace(id=str(uuid.uuid5(uuid.NAMESPACE_DNS, email)), email=email)
+        sessao = SimpleNamespace(access_token=f"local-{email}", refresh_token=f"local-refresh-{email}")
+        return SimpleNamespace(user=usuario, session=sessao)
+
+    def sign_in_with_password(self, credenciais):
+        if self._usuarios.get(credenciais["email"]) != credenciais["password"]:
+            raise ValueError("Invalid login credentials")
+        return self._sessao(credenciais["email"])
+
+    def set_session(self, access_token, refresh_token):
+        email = access_token.removeprefix("local-")
+        if email not in self._usuarios:
+            raise ValueError("Invalid token")
+        return self._sessao(email)
+
+    def sign_out(self):
+        pass
+
+class ClienteLocal:
+    """Cliente no formato do supabase.Client: table(...), rpc(...) e auth."""
+
+    def __init__(self, banco, usuarios):
+        self._banco = banco
+        self.auth = _Auth(usuarios)
+
+    def table(self, nome):
+        return _Consulta(self._banco, nome)
+
+    def rpc(self, nome, parametros=None):
+        return _Rpc(self._banco, nome, parametros)
+
+def criar_banco(caminho=None):
+    """Banco em memória (padrão) ou em um arquivo SQLite, com o esquema já criado."""
+    return _Banco(caminho)
+
+def criar_cliente(banco=None, usuarios=None):
+    """Cria um cliente sobre o banco informado (ou um banco novo e vazio)."""
+    return ClienteLocal(banco or criar_banco(), usuarios or {"teste@mino.local": "senha"})
+
+# --- Dados de Exemplo ---
+
+def popular(cliente, obras=20, movimentacoes=5000, semente=0):
+    """Preenche o banco com obras e movimentações aleatórias (mas reprodutíveis)."""
+    aleatorio = random.Random(semente)
+    hoje = datetime.date.today()
+
+    cliente.table("obras").insert([{
+        "Nome": f"OBRA {i + 1:03d}",
+        "Endereço": f"Rua {i + 1}, {aleatorio.randint(1, 999)}",
+        "Cliente_Nome": f"Cliente {i + 1}",
+        "Cliente_CPF": f"{aleatorio.randint(0, 10**11 - 1):011d}",
+        "Orçamento": float(aleatorio.randint(50, 500) * 1000),
+        "Data_Início": (hoje - datetime.timedelta(days=aleatorio.randint(200, 700))).isoformat(),
+        "Data_Fim": (hoje + datetime.timedelta(days=aleatorio.randint(30, 400))).isoformat(),
+    } for i in range(obras)]).execute()
+    ids_obras = [row["id"] for row in cliente.table("obras").select("id").execute().data]
+
+    categorias = ["Depósito", "Mão de Obra", "Material", "Outros"]
+    subcategorias = ["Geral", "Elétrica", "Hidráulica", "Pintura"]
+    linhas = []
+    itens_por_documento = {}
+    for i in range(movimentacoes):
+        categoria = aleatorio.choice(categorias)
+        linha = {
+            "obra_id": aleatorio.choice(ids_obras),
+            "Data": (hoje - datetime.timedelta(days=aleatorio.randint(0, 700))).isoformat(),
+            "Detalhes": f"DOC {i:08d}",
+            "Categoria": categoria,
+            "Descrição": f"{categoria} {aleatorio.randint(1, 50)}",
+        }
+        if categoria == "Material":
+            itens = [{
+                "Item": f"Item {aleatorio.randint(1, 200)}",
+                "Subcategoria": aleatorio.choice(subcategorias),
+                "Quantidade": float(aleatorio.randint(1, 20)),
+                "Valor": round(aleatorio.uniform(10, 2000), 2),
+            } for _ in range(aleatorio.randint(1, 4))]
+            itens_por_documento[linha["Detalhes"]] = itens
+            linha["Valor"] = round(sum(item["Valor"] for item in itens), 2)
+        else:
+            linha["Valor"] = round(aleatorio.uniform(50, 20000), 2)
+        linhas.append(linha)
+
+    inseridas = cliente.table("movimentacoes").upsert(
+        linhas, on_conflict="obra_id,Data,Detalhes,Valor,Categoria,Descrição", ignore_duplicates=True
+    ).execute().data
+
+    # Itens das compras de Material na tabela filha, como grava o app
+    cliente.table("movimentacao_itens").insert([
+        dict(item, movimentacao_id=row["id"])
+        for row in inseridas
+        for item in itens_por_documento.get(row["Detalhes"], [])
+    ]).execute()
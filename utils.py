@@ -1,18 +1,24 @@
-import extra_streamlit_components as stx
 import streamlit as st
-import pandas as pd
 import datetime
 import base64
 import time
 import os
 
-from PIL import Image
+import cache_compartilhado
+import fila_escrita
+import painel
+
+# pandas, dados e extra_streamlit_components são importados dentro das funções
+# que os usam: assim a tela de login não paga pela importação da pilha de dados.
 
 # --- CONSTANTES GLOBAIS ---
+CATEGORIAS = ["Depósito", "Mão de Obra", "Material", "Outros"]
 SUBCATEGORIAS_MATERIAIS = ["Geral", "Elétrica", "Hidráulica", "Pintura"]
 
 # --- GERENCIADOR DE COOKIES ---
 def get_manager():
+    import extra_streamlit_components as stx
+
     return stx.CookieManager(key="session_cookie_manager")
 
 # --- Funções de Login ---
@@ -126,14 +132,16 @@ def sidebar_config():
     
     # Verifica se a imagem existe para não dar erro
     if os.path.exists(caminho_logo):
-        imagem = Image.open(caminho_logo)
-        # Exibe no topo da sidebar
-        st.sidebar.image(imagem, width="stretch")
+        # Exibe no topo da sidebar (o Streamlit lê o arquivo direto, sem precisar do PIL)
+        st.sidebar.image(caminho_logo, width="stretch")
     else:
         st.sidebar.warning("Logo não encontrada")
 
     botao_logout()
 
+    # Lançamentos aguardando gravação ou com falha
+    fila_escrita.indicador()
+
 def adicionar_watermark():
     # Define o caminho da imagem (usando a mesma logo da sidebar)
     caminho_imagem = os.path.join(os.path.dirname(__file__), 'marca_dagua.png')
@@ -185,47 +193,192 @@ def reduzir_espaco_topo():
         </style>
     """, unsafe_allow_html=True)
 
+# --- Seletor de Período ---
+
+PERIODOS = ["Tudo", "Mês", "Trimestre", "Ano", "Personalizado"]
+
+# Quantos períodos (do atual para trás) aparecem para escolha
+QUANTIDADE_PERIODOS = {"Mês": 24, "Trimestre": 8, "Ano": 5}
+
+def _inicio_periodo(tipo, data):
+    if tipo == "Mês":
+        return data.replace(day=1)
+    if tipo == "Trimestre":
+        return data.replace(month=3 * ((data.month - 1) // 3) + 1, day=1)
+    return data.replace(month=1, day=1)
+
+def _deslocar_periodo(tipo, inicio, quantidade):
+    # Início do período 'quantidade' períodos depois (ou antes, se negativo)
+    meses = {"Mês": 1, "Trimestre": 3, "Ano": 12}[tipo] * quantidade
+    total = inicio.year * 12 + inicio.month - 1 + meses
+    return datetime.date(total // 12, total % 12 + 1, 1)
+
+def _rotulo_periodo(tipo, inicio):
+    if tipo == "Mês":
+        return inicio.strftime("%m/%Y")
+    if tipo == "Trimestre":
+        return f"{(inicio.month - 1) // 3 + 1}º trimestre de {inicio.year}"
+    return str(inicio.year)
+
+def _lembrar_periodo(chave):
+    # O Streamlit apaga o estado dos widgets que não aparecem na página atual:
+    # guardamos a escolha em uma chave comum para ela valer em todas as páginas
+    st.session_state[chave] = st.session_state[f"_{chave}"]
+
+def seletor_periodo():
+    """
+    Seletor de período compartilhado pelas páginas de consulta (a escolha vale para todas).
+    Retorna (inicio, fim) em datas, inclusive, para filtrar "Data" no banco,
+    ou (None, None) para todo o histórico.
+    """
+    hoje = datetime.date.today()
+    st.session_state["_periodo_tipo"] = st.session_state.get("periodo_tipo", "Tudo")
+
+    col_tipo, col_valor = st.columns([3, 2], vertical_alignment="bottom")
+    tipo = col_tipo.segmented_control(
+        "Período", PERIODOS, key="_periodo_tipo", on_change=_lembrar_periodo, args=("periodo_tipo",)
+    ) or "Tudo"
+
+    if tipo == "Tudo":
+        return None, None
+
+    if tipo == "Personalizado":
+        padrao = (_inicio_periodo("Mês", hoje), hoje)
+        st.session_state["_periodo_intervalo"] = st.session_state.get("periodo_intervalo", padrao)
+        intervalo = col_valor.date_input(
+            "Intervalo", key="_periodo_intervalo", format="DD/MM/YYYY",
+            on_change=_lembrar_periodo, args=("periodo_intervalo",), label_visibility="collapsed",
+        )
+        # Enquanto só a primeira data foi escolhida, o intervalo é de um dia
+        inicio = intervalo[0] if intervalo else hoje
+        fim = intervalo[1] if len(intervalo) > 1 else inicio
+        return inicio, fim
+
+    atual = _inicio_periodo(tipo, hoje)
+    opcoes = [_deslocar_periodo(tipo, atual, -i) for i in range(QUANTIDADE_PERIODOS[tipo])]
+    escolhido = st.session_state.get("periodo_inicio")
+    st.session_state["_periodo_inicio"] = escolhido if escolhido in opcoes else atual
+    inicio = col_valor.selectbox(
+        tipo, opcoes, key="_periodo_inicio", format_func=lambda data: _rotulo_periodo(tipo, data),
+        on_change=_lembrar_periodo, args=("periodo_inicio",), label_visibility="collapsed",
+    )
+    return inicio, _deslocar_periodo(tipo, inicio, 1) - datetime.timedelta(days=1)
+
+def descrever_periodo(inicio, fim):
+    """Texto curto do período para legendas ("todo o histórico" ou "01/10/2026 a 31/10/2026")."""
+    if inicio is None:
+        return "todo o histórico"
+    return f"{inicio:%d/%m/%Y} a {fim:%d/%m/%Y}"
+
 # --- Funções de Interação com o Banco de Dados ---
                     
+def gravar_movimentacoes(supabase, lista_envio):
+    """
+    Grava as movimentações no Supabase ignorando as que já existem.
+    Os "Itens" de cada linha (compras de Material) vão para a tabela movimentacao_itens,
+    ligados às movimentações efetivamente inseridas, na mesma transação (função
+    gravar_movimentacoes no banco): ou o lote entra inteiro, ou nada é gravado.
+    Retorna quantas linhas foram efetivamente inseridas.
+    """
+    response = supabase.rpc("gravar_movimentacoes", {"linhas": lista_envio}).execute()
+
+    # As consultas e agregados em cache (em todas as réplicas) passam a estar desatualizados
+    cache_compartilhado.invalidar("movimentacoes", "movimentacao_itens")
+    painel.marcar_desatualizado()
+
+    return len(response.data)
+
 def salvar_movimentacao(supabase, lista_envio, info_container=None):
-    # -- Grava no Supabase --
-    response = supabase.table("movimentacoes").upsert(
-        lista_envio,
-        on_conflict="obra_id,Data,Detalhes,Valor,Categoria,Descrição",
-        ignore_duplicates=True
-    ).execute()
+    # -- Registra no diário local; a gravação no Supabase é feita em segundo plano --
+    # Duplicadas continuam sendo ignoradas pelo upsert quando a fila é descarregada
+    fila_escrita.enfileirar(lista_envio)
 
     if info_container is None:
         info_container = st.container()
-    with info_container:                    
+    with info_container:
         # --- Lógica de Feedback ---
-        count = len(response.data)
-
-        if count == 0:
-            st.warning("Nenhuma novidade! Todas as linhas enviadas já existiam no banco de dados.")
-        elif count < len(lista_envio):
-            st.success(f"Processamento concluído: {count} novos lançamentos inseridos.")
-            st.info(f"{len(lista_envio) - count} itens duplicados foram ignorados.")
+        if len(lista_envio) > 1:
+            st.success(f"{len(lista_envio)} movimentações registradas! A gravação no banco é feita em segundo plano.")
         else:
-            st.success(f"Movimentações salvas com sucesso!")
+            st.success("Movimentação registrada! A gravação no banco é feita em segundo plano.")
+
+def vincular_lancamentos(supabase, vinculos):
+    """
+    Vincula lançamentos manuais às linhas do extrato que os pagaram: o "Detalhes" do
+    extrato é gravado no lançamento, que deixa de ser manual (e não é lançado de novo).
+    vinculos: lista de (id do lançamento, Detalhes da linha do extrato), gravados em um
+    único comando (função vincular_movimentacoes no banco).
+    Retorna quantos lançamentos foram vinculados (um já vinculado por outra sessão fica como está).
+    """
+    response = supabase.rpc(
+        "vincular_movimentacoes",
+        {"vinculos": [{"id": movimentacao_id, "Detalhes": detalhes} for movimentacao_id, detalhes in vinculos]},
+    ).execute()
+
+    cache_compartilhado.invalidar("movimentacoes")
+    painel.marcar_desatualizado()
+
+    return len(response.data)
 
 def salvar_obra(supabase, lista_envio, info_container=None):
+    # lista_envio pode ser uma obra (dict) ou várias (lista de dicts, gravadas em um único insert)
     supabase.table("obras").insert(lista_envio).execute()
+    cache_compartilhado.invalidar("obras")
+    painel.marcar_desatualizado()
 
     if info_container is None:
         info_container = st.container()
     with info_container:
-        st.success(f"Obra '{lista_envio['Nome']}' cadastrada com sucesso!")
+        if isinstance(lista_envio, list):
+            st.success(f"{len(lista_envio)} obras cadastradas com sucesso!")
+        else:
+            st.success(f"Obra '{lista_envio['Nome']}' cadastrada com sucesso!")
+
+def editor_itens(key=None):
+    """Tabela editável com os itens de uma compra de Material."""
+    import pandas as pd
+
+    # Criamos um DataFrame vazio para servir de template
+    df_template = pd.DataFrame({
+        "Item": pd.Series(dtype="string"),
+        "Subcategoria": pd.Series(dtype="string"),
+        "Quantidade": pd.Series(dtype="float"),
+        "Valor (R$)": pd.Series(dtype="float")
+    })
+
+    return st.data_editor(
+        df_template,
+        num_rows="dynamic",
+        column_config={
+            "Item": st.column_config.TextColumn(required=True),
+            "Subcategoria": st.column_config.SelectboxColumn(options=SUBCATEGORIAS_MATERIAIS),
+            "Quantidade": st.column_config.NumberColumn(min_value=0.1, step=1.0, required=True),
+            "Valor (R$)": st.column_config.NumberColumn(min_value=0.0, format="R$ %.2f", required=True)
+        },
+        hide_index=True,
+        width="stretch",
+        key=key,
+    )
+
+def montar_itens(itens_compra):
+    """Converte a tabela de itens na lista "Itens" da movimentação (gravada em movimentacao_itens)."""
+    itens = itens_compra.rename(columns={"Valor (R$)": "Valor"})[["Item", "Subcategoria", "Quantidade", "Valor"]]
+    # Células vazias viram null no JSON
+    return itens.astype(object).where(itens.notna(), None).to_dict("records")
 
 def on_dismiss():
-    if "modal" in st.session_state:
-        del st.session_state["modal"]
+    # Fechar ou cancelar um pop-up encerra o fluxo: as linhas selecionadas
+    # (df_selecionado) não ficam presas na sessão
+    for chave in ("modal", "df_selecionado"):
+        st.session_state.pop(chave, None)
 
 # --- Funções de Pop-up ---
 
 # Modal de Cadastro de Obras
 @st.dialog(" ", width="medium", on_dismiss=on_dismiss)
 def popup_cadastro_obras(supabase, obras_desconhecidas):
+    import pandas as pd
+
     if st.session_state.get("modal") != "Cadastro":
         st.warning(f"As seguintes obras foram digitadas mas não existem no banco de dados: {', '.join(obras_desconhecidas)}")
         
@@ -235,6 +388,7 @@ def popup_cadastro_obras(supabase, obras_desconhecidas):
         
         with col_cancel:
             if st.button("Cancelar"):
+                on_dismiss()
                 st.rerun(scope="app")
                 
         with col_confirm:
@@ -242,67 +396,77 @@ def popup_cadastro_obras(supabase, obras_desconhecidas):
                 st.session_state["modal"] = "Cadastro"
                 st.rerun(scope="fragment")
     else:
-        obra = obras_desconhecidas[0]
-        # --- Formulário de Cadastro ---
-        # Usamos 'st.form' para agrupar tudo e só enviar quando clicar no botão final
-        with st.form("form_cadastro_obra"):
-            
-            # Dividindo a tela em duas colunas para ficar visualmente agradável
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                nome = st.text_input("Nome da Obra", value=obra, disabled=True)
-                endereco = st.text_input("Endereço", placeholder="Ex: Rua das Flores, 123")
-                orcamento = st.number_input("Orçamento Total (R$)", min_value=0.0, step=1000.0, format="%.2f")
-
-            with col2:
-                cliente_nome = st.text_input("Nome do Cliente")
-                cliente_cpf = st.text_input("CPF do Cliente")
-                col_data1, col_data2 = st.columns(2)
-                data_inicio = col_data1.date_input("Data de Início", datetime.date.today(), format="DD/MM/YYYY")
-                data_fim = col_data2.date_input("Previsão de Término", datetime.date.today(), format="DD/MM/YYYY")
+        # --- Grade de Cadastro ---
+        # Uma linha por obra desconhecida: tudo é validado e gravado de uma vez
+        st.info("Preencha os dados de todas as obras abaixo e confirme para cadastrá-las de uma só vez.")
+
+        hoje = datetime.date.today()
+        df_obras = pd.DataFrame({
+            "Nome": pd.Series(obras_desconhecidas, dtype="string"),
+            "Endereço": pd.Series([None] * len(obras_desconhecidas), dtype="string"),
+            "Orçamento": pd.Series([0.0] * len(obras_desconhecidas), dtype="float"),
+            "Cliente_Nome": pd.Series([None] * len(obras_desconhecidas), dtype="string"),
+            "Cliente_CPF": pd.Series([None] * len(obras_desconhecidas), dtype="string"),
+            "Data_Início": [hoje] * len(obras_desconhecidas),
+            "Data_Fim": [hoje] * len(obras_desconhecidas),
+        })
+
+        with st.form("form_cadastro_obras"):
+            grade = st.data_editor(
+                df_obras,
+                column_config={
+                    "Nome": st.column_config.TextColumn(label="Nome da Obra", disabled=True),
+                    "Endereço": st.column_config.TextColumn(label="Endereço", required=True),
+                    "Orçamento": st.column_config.NumberColumn(label="Orçamento Total (R$)", min_value=0.0, step=1000.0, format="R$ %.2f", required=True),
+                    "Cliente_Nome": st.column_config.TextColumn(label="Nome do Cliente", required=True),
+                    "Cliente_CPF": st.column_config.TextColumn(label="CPF do Cliente", required=True),
+                    "Data_Início": st.column_config.DateColumn(label="Data de Início", format="DD/MM/YYYY", required=True),
+                    "Data_Fim": st.column_config.DateColumn(label="Previsão de Término", format="DD/MM/YYYY", required=True),
+                },
+                hide_index=True,
+                width="stretch",
+                num_rows="fixed",
+            )
 
             # Botão de confirmação
-            submitted = st.form_submit_button("Criar Nova Obra")
+            submitted = st.form_submit_button("Cadastrar Obras", type="primary")
 
             if submitted:
-                # 1. Validação dos Campos
-
-                # Verificar preenchimento dos campos
-                for field in [nome, endereco, orcamento, cliente_nome, cliente_cpf]:
-                    if not field:
-                        st.error("Por favor, preencha todos os campos.")
-                        st.stop()
-                # Verificar CPF válido (11 dígitos numéricos)
-                if len(cliente_cpf) != 11 or not cliente_cpf.isdigit():
-                    st.error("CPF inválido. Deve conter 11 dígitos numéricos.")
-                    st.stop()
-                # Verificar datas lógicas
-                if data_fim < data_inicio or data_inicio == data_fim:
-                    st.error("A data de término deve ser posterior à data de início.")
+                # 1. Validação dos Campos (todas as linhas de uma vez)
+                textos = grade[["Endereço", "Cliente_Nome", "Cliente_CPF"]].replace(r"^\s*$", pd.NA, regex=True)
+                inicio = pd.to_datetime(grade["Data_Início"])
+                fim = pd.to_datetime(grade["Data_Fim"])
+
+                erros = {
+                    # Verificar preenchimento dos campos
+                    "Por favor, preencha todos os campos": textos.isna().any(axis=1) | ~(grade["Orçamento"] > 0),
+                    # Verificar CPF válido (11 dígitos numéricos)
+                    "CPF inválido. Deve conter 11 dígitos numéricos": ~grade["Cliente_CPF"].fillna("").str.fullmatch(r"\d{11}"),
+                    # Verificar datas lógicas
+                    "A data de término deve ser posterior à data de início": ~(fim > inicio),
+                }
+
+                invalidas = False
+                for mensagem, mascara in erros.items():
+                    if mascara.any():
+                        st.error(f"{mensagem}: {', '.join(grade.loc[mascara, 'Nome'])}.")
+                        invalidas = True
+                if invalidas:
                     st.stop()
 
-                # 2. Inserir no Banco de Dados
-                lista_envio = {
-                    "Nome": nome,
-                    "Endereço": endereco,
-                    "Cliente_Nome": cliente_nome,
-                    "Cliente_CPF": cliente_cpf,
-                    "Orçamento": orcamento,
-                    "Data_Início": data_inicio.isoformat(),
-                    "Data_Fim": data_fim.isoformat()
-                }
-                
+                # 2. Inserir no Banco de Dados (um único insert para todas as obras)
+                lista_envio = grade.assign(
+                    Nome=grade["Nome"].str.upper(),
+                    Data_Início=inicio.dt.date.map(datetime.date.isoformat),
+                    Data_Fim=fim.dt.date.map(datetime.date.isoformat),
+                ).to_dict("records")
+
                 try:
                     salvar_obra(supabase, lista_envio)
-                    obras_desconhecidas.pop(0)
-                    if len(obras_desconhecidas) > 0:
-                        time.sleep(1)
-                        st.rerun(scope="fragment")
-                    else:
-                        time.sleep(1)
-                        del st.session_state["modal"]
-                        st.rerun(scope="app")
+                    del st.session_state["modal"]
+                    # A página reprocessa as linhas pendentes do extrato, agora com as obras cadastradas
+                    st.session_state["reprocessar_extrato"] = True
+                    st.rerun(scope="app")
 
                 except Exception as e:
                     st.error(f"Erro ao salvar no banco de dados: {e}")
@@ -312,6 +476,9 @@ def popup_cadastro_obras(supabase, obras_desconhecidas):
 # Modal de Detalhamento de Materiais
 @st.dialog(" ", width="large", on_dismiss=on_dismiss)
 def popup_detalhar_material(supabase, lista_material):
+    import pandas as pd
+    import dados
+
     # --- Seleção das Movimentações de "Material" ---
     if st.session_state["modal"] == "Selecionar":
         st.info("Foram identificadas movimentações de 'Material'. Por favor, selecione abaixo aquelas que deseja detalhar.")
@@ -338,6 +505,7 @@ def popup_detalhar_material(supabase, lista_material):
                 "Categoria": st.column_config.TextColumn(label="Categoria", disabled=True),
                 "Valor": st.column_config.NumberColumn(label="Valor (R$)", disabled=True, format="R$ %.2f"),
                 "Descrição": st.column_config.TextColumn(label="Descrição", disabled=True),
+                "Arquivo": st.column_config.TextColumn(label="Arquivo", disabled=True),
                 "Detalhar": st.column_config.CheckboxColumn(label="Detalhar", default=False),
             },
             width="stretch",
@@ -348,20 +516,20 @@ def popup_detalhar_material(supabase, lista_material):
         
         with col_cancel:
             if st.button("Cancelar", width="stretch"):
+                on_dismiss()
                 st.rerun(scope="app")
                 
         with col_confirm:
             if st.button("Continuar", type="primary", width="stretch"):
                 if not data_editor["Detalhar"].all():
-                    # Buscar Obras para obter IDs
-                    response = supabase.table("obras").select("id, Nome").execute()
-                    obras_dict = {row["Nome"]: row["id"] for row in response.data} # Cria um mapa {Nome: ID}
+                    # IDs das obras pelo índice (cache compartilhado)
+                    indice_obras = dados.IndiceObras(dados.consultar_obras(supabase))
 
                     # Salvar apenas os não-selecionados
                     lista_envio = [{
                         "Data": row["Data"].isoformat(),
                         "Detalhes": row["Detalhes"],
-                        "obra_id": obras_dict[row["Obra"].upper()],
+                        "obra_id": indice_obras.id_obra(row["Obra"]),
                         "Categoria": row["Categoria"],
                         "Valor": row["Valor"],
                         "Descrição": row["Descrição"],
@@ -377,92 +545,127 @@ def popup_detalhar_material(supabase, lista_material):
                     st.rerun(scope="fragment")
 
     # --- Detalhamento dos Materiais ---
+    # Todas as linhas selecionadas aparecem juntas, cada uma com sua tabela de itens,
+    # e são validadas e gravadas de uma só vez
     elif st.session_state["modal"] == "Detalhar":
         df_selecionado = st.session_state["df_selecionado"]
 
-        st.info("Por favor, detalhe a movimentação selecionada abaixo.")
+        st.info(f"Por favor, detalhe as {len(df_selecionado)} movimentações selecionadas abaixo.")
 
         # Formulário visual
         with st.form("form_detalhar_material"):
-            col1, col2, col3, col4, col5 = st.columns(5)
-            data = col2.date_input(label="Data", value=df_selecionado.iloc[0]["Data"], disabled=True)
-            detalhes = col3.text_input("Detalhes", value=df_selecionado.iloc[0]["Detalhes"], disabled=True)
-            obra = col4.text_input("Obra", value=df_selecionado.iloc[0]["Obra"].upper(), disabled=True)
-            categoria = col2.text_input("Categoria", value=df_selecionado.iloc[0]["Categoria"], disabled=True)
-            valor_total = col3.number_input("Valor Total (R$)", value=df_selecionado.iloc[0]["Valor"], format="%.2f", disabled=True)
-            descricao = col4.text_input("Descrição", value=df_selecionado.iloc[0]["Descrição"], disabled=True)
-            
-            # Criamos um DataFrame vazio para servir de template
-            df_template = pd.DataFrame({
-                "Item": pd.Series(dtype="string"),
-                "Subcategoria": pd.Series(dtype="string"),
-                "Quantidade": pd.Series(dtype="float"),
-                "Valor (R$)": pd.Series(dtype="float")
-            })
-
-            itens_compra = st.data_editor(
-                df_template,
-                num_rows="dynamic",
-                column_config={
-                    "Item": st.column_config.TextColumn(required=True),
-                    "Subcategoria": st.column_config.SelectboxColumn(options=SUBCATEGORIAS_MATERIAIS),
-                    "Quantidade": st.column_config.NumberColumn(min_value=0.1, step=1.0, required=True),
-                    "Valor (R$)": st.column_config.NumberColumn(min_value=0.0, format="R$ %.2f", required=True)
-                },
-                hide_index=True,
-                width="stretch",
-            )
+            tabelas_itens = []
+            for posicao, (_, linha) in enumerate(df_selecionado.iterrows()):
+                with st.container(border=True):
+                    col1, col2, col3, col4 = st.columns([1, 2, 2, 1])
+                    col1.markdown(f"**Data:** {linha['Data']:%d/%m/%Y}")
+                    col2.markdown(f"**Detalhes:** {linha['Detalhes']}")
+                    col3.markdown(f"**Obra:** {linha['Obra']} · **Descrição:** {linha['Descrição']}")
+                    col4.markdown(f"**Total:** R\\$ {linha['Valor']:,.2f}")
+
+                    tabelas_itens.append(editor_itens(key=f"itens_material_{posicao}"))
 
             # Botão de salvar
-            if st.form_submit_button("Salvar Movimentação", type="primary"):
-                if itens_compra.empty:
-                    st.error("Por favor, adicione ao menos um item para detalhar a compra.")
-                else:
-                    # Verificar o valor total
-                    total_calculado = itens_compra["Valor (R$)"].sum()
-
-                    if abs(total_calculado - valor_total) > 0:
-                        st.error(f"A soma do valor dos itens (R\\$ {total_calculado:.2f}) é diferente do valor total do extrato (R\\$ {valor_total:.2f}).")
-                        st.stop()
-                    else:
-                        # Buscar Obras para obter IDs
-                        response = supabase.table("obras").select("id, Nome").execute()
-                        obras_dict = {row["Nome"]: row["id"] for row in response.data} # Cria um mapa {Nome: ID}
-                        obra_id = obras_dict[obra]
-                        try:
-                            # Inserir como uma única movimentação com detalhamento em JSON
-                            itens_list = []
-                            for _, row in itens_compra.iterrows():
-                                itens_list.append({
-                                    "Item": row["Item"],
-                                    "Subcategoria": row["Subcategoria"],
-                                    "Quantidade": row["Quantidade"],
-                                    "Valor": row["Valor (R$)"]
-                                })
-
-                            lista_envio = [{
-                                "obra_id": obra_id,
-                                "Data": data.isoformat(),
-                                "Detalhes": detalhes,
-                                "Categoria": categoria,
-                                "Valor": valor_total,
-                                "Descrição": descricao,
-                                "Itens": itens_list
-                            }]
-
-                            salvar_movimentacao(supabase, lista_envio)
-                            time.sleep(1)
-                            
-                            # Remover a movimentação já detalhada da lista
-                            df_selecionado = df_selecionado.drop(df_selecionado.index[0])
-                            if len(df_selecionado) > 0:
-                                st.session_state["df_selecionado"] = df_selecionado
-                                st.rerun(scope="fragment")
-                            else:
-                                del st.session_state["modal"]
-                                del st.session_state["df_selecionado"]
-                                st.rerun(scope="app")
-
-                        except Exception as e:
-                            st.error(f"Erro ao salvar no banco de dados: {e}")
-                        
\ No newline at end of file
+            if st.form_submit_button("Salvar Movimentações", type="primary"):
+                # Validação de todas as movimentações juntas
+                erros = []
+                for (_, linha), itens_compra in zip(df_selecionado.iterrows(), tabelas_itens):
+                    if itens_compra.empty:
+                        erros.append(f"{linha['Detalhes']}: adicione ao menos um item para detalhar a compra.")
+                        continue
+
+                    # Comparação em centavos, sem erro de arredondamento de float
+                    total_calculado = dados.para_centavos(itens_compra["Valor (R$)"]).sum()
+                    valor_total = dados.para_centavos(pd.Series([linha["Valor"]])).sum()
+                    if total_calculado != valor_total:
+                        erros.append(
+                            f"{linha['Detalhes']}: a soma do valor dos itens (R\\$ {total_calculado / 100:.2f}) "
+                            f"é diferente do valor total do extrato (R\\$ {valor_total / 100:.2f})."
+                        )
+
+                if erros:
+                    for erro in erros:
+                        st.error(erro)
+                    st.stop()
+
+                # IDs das obras pelo índice (cache compartilhado, sem nova consulta ao banco)
+                indice_obras = dados.IndiceObras(dados.consultar_obras(supabase))
+                try:
+                    # Cada compra vira uma movimentação com o detalhamento em JSON
+                    lista_envio = [{
+                        "obra_id": indice_obras.id_obra(linha["Obra"]),
+                        "Data": linha["Data"].isoformat(),
+                        "Detalhes": linha["Detalhes"],
+                        "Categoria": linha["Categoria"],
+                        "Valor": linha["Valor"],
+                        "Descrição": linha["Descrição"],
+                        "Itens": montar_itens(itens_compra),
+                    } for (_, linha), itens_compra in zip(df_selecionado.iterrows(), tabelas_itens)]
+
+                    # Um único upsert para todas as compras detalhadas
+                    salvar_movimentacao(supabase, lista_envio)
+                    time.sleep(1)
+
+                    del st.session_state["modal"]
+                    del st.session_state["df_selecionado"]
+                    st.rerun(scope="app")
+
+                except Exception as e:
+                    st.error(f"Erro ao salvar no banco de dados: {e}")
+
+# Modal de Conciliação do Extrato
+@st.dialog(" ", width="large", on_dismiss=on_dismiss)
+def popup_conciliacao(supabase, sugestoes, importacao):
+    import conciliacao
+
+    st.info(
+        "Algumas linhas do extrato parecem ser lançamentos já feitos à mão (mesma obra, valor e sentido, "
+        f"até {conciliacao.TOLERANCIA_DIAS} dias de diferença). As marcadas serão vinculadas ao "
+        "lançamento existente em vez de lançadas de novo."
+    )
+
+    data_editor = st.data_editor(
+        sugestoes.assign(Vincular=True),
+        column_config={
+            "Data": st.column_config.DateColumn(label="Data (Extrato)", format="DD/MM/YYYY", disabled=True),
+            "Detalhes": st.column_config.TextColumn(label="Detalhes", disabled=True),
+            "Obra": st.column_config.TextColumn(label="Obra", disabled=True),
+            "Valor": st.column_config.NumberColumn(label="Valor (R$)", disabled=True, format="R$ %.2f"),
+            "Data_Manual": st.column_config.DateColumn(label="Data (Lançamento)", format="DD/MM/YYYY", disabled=True),
+            "Categoria_Manual": st.column_config.TextColumn(label="Categoria (Lançamento)", disabled=True),
+            "Descrição_Manual": st.column_config.TextColumn(label="Descrição (Lançamento)", disabled=True),
+            "dias": st.column_config.NumberColumn(label="Diferença (dias)", disabled=True),
+            "Vincular": st.column_config.CheckboxColumn(label="Vincular", default=True),
+            "id": None,
+            "indice": None,
+        },
+        column_order=["Vincular", "Data", "Detalhes", "Obra", "Valor", "Data_Manual", "Categoria_Manual", "Descrição_Manual", "dias"],
+        width="stretch",
+        hide_index=True,
+    )
+
+    col_cancel, col_confirm = st.columns(2)
+
+    with col_cancel:
+        if st.button("Cancelar", width="stretch"):
+            on_dismiss()
+            st.rerun(scope="app")
+
+    with col_confirm:
+        if st.button("Continuar", type="primary", width="stretch"):
+            selecionadas = data_editor.loc[data_editor["Vincular"]]
+            try:
+                # Desmarcar todas lança o extrato inteiro como novo
+                if not selecionadas.empty:
+                    vincular_lancamentos(supabase, [(int(linha["id"]), linha["Detalhes"]) for _, linha in selecionadas.iterrows()])
+            except Exception as e:
+                st.error(f"Erro ao vincular os lançamentos: {e}")
+                st.stop()
+
+            # A página reprocessa o extrato sem as linhas vinculadas (e sem conciliar de novo).
+            # As linhas são guardadas pela posição na tabela e só valem para esta importação
+            anteriores = st.session_state.get("extrato_vinculadas", {}).get(importacao, set())
+            st.session_state["extrato_vinculadas"] = {importacao: anteriores | set(selecionadas["indice"])}
+            st.session_state["extrato_conciliado"] = True
+            st.session_state["reprocessar_extrato"] = True
+            st.rerun(scope="app")